@@ -1,22 +1,95 @@
-from django.http import HttpResponse, HttpResponseRedirect
-import openpyxl
+from datetime import datetime
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect
 from django import forms
 from django.contrib import admin
 from django.forms import ValidationError
 from .models import Token, Event, SumulaImortal, SumulaClassificatoria, PlayerScore, Player, Staff, Results
 from guardian.admin import GuardedModelAdmin
-from django.db.models import Count
+from django.db.models import Count, Max
+from django.template.response import TemplateResponse
 from django.urls import path
+from .exports import (PARQUET_CONTENT_TYPE, XLSX_CONTENT_TYPE, export_csv_response, export_file_response, iter_rows,
+                      write_parquet, write_xlsx)
+
+# Máximo de tokens criados de uma vez pelo admin; quantidades maiores pelo comando mint_tokens
+TOKEN_MINT_MAX_COUNT = 10_000
+
+
+class ExportActionsMixin:
+    """Ações do admin que exportam os objetos selecionados em Excel, CSV ou Parquet.
+    As linhas são lidas com values_list em blocos e escritas uma a uma, com memória constante.
+
+    export_columns: lista de (cabeçalho, campo), aceitando campos relacionados (token__token_code)
+    export_filename: nome do arquivo, sem extensão
+    """
+    export_columns: list[tuple[str, str]] = []
+    export_filename = 'export'
+    export_sheet_name = 'Export'
+
+    @property
+    def export_header(self) -> list[str]:
+        return [header for header, _ in self.export_columns]
+
+    @property
+    def export_fields(self) -> list[str]:
+        return [field for _, field in self.export_columns]
+
+    def export_field_types(self) -> list[str]:
+        types = []
+        for field_path in self.export_fields:
+            model = self.model
+            for name in field_path.split('__'):
+                field = model._meta.get_field(name)
+                model = field.related_model or model
+            types.append(field.get_internal_type())
+        return types
+
+    @staticmethod
+    def format_row(row: tuple) -> list:
+        """Formata booleanos e datas como nas planilhas entregues aos organizadores."""
+        formatted = []
+        for value in row:
+            if isinstance(value, bool):
+                value = 'Sim' if value else 'Não'
+            elif isinstance(value, datetime):
+                value = value.strftime('%d/%m/%Y %H:%M:%S')
+            formatted.append(value)
+        return formatted
+
+    def export_as_excel(self, request, queryset):
+        file = write_xlsx(self.export_header, iter_rows(queryset, self.export_fields, self.format_row),
+                          self.export_sheet_name)
+        return export_file_response(request, file, XLSX_CONTENT_TYPE, f'{self.export_filename}.xlsx')
+    export_as_excel.short_description = 'Exportar %(verbose_name_plural)s como Excel'
+
+    def export_as_csv(self, request, queryset):
+        return export_csv_response(request, self.export_header, queryset, self.export_fields,
+                                   f'{self.export_filename}.csv', self.format_row)
+    export_as_csv.short_description = 'Exportar %(verbose_name_plural)s como CSV'
+
+    def export_as_parquet(self, request, queryset):
+        file = write_parquet(self.export_header, self.export_field_types(),
+                             iter_rows(queryset, self.export_fields))
+        return export_file_response(request, file, PARQUET_CONTENT_TYPE, f'{self.export_filename}.parquet')
+    export_as_parquet.short_description = 'Exportar %(verbose_name_plural)s como Parquet'
+
+
+class MintTokensForm(forms.Form):
+    count = forms.IntegerField(label='Quantidade', min_value=1, max_value=TOKEN_MINT_MAX_COUNT)
 
 
 @admin.register(Token)
-class TokenAdmin(GuardedModelAdmin):
+class TokenAdmin(ExportActionsMixin, GuardedModelAdmin):
     def event(self, obj):
         return obj.event
     list_display = ['token_code', 'id', 'created_at', 'used', 'event']
     search_fields = ['token_code']
     fields = ['used']
-    actions = ['export_as_excel']
+    actions = ['export_as_excel', 'export_as_csv', 'export_as_parquet']
+    export_columns = [('TOKEN', 'token_code'), ('USADO', 'used'), ('CRIADO EM', 'created_at')]
+    export_filename = 'tokens'
+    export_sheet_name = 'Tokens'
     change_list_template = "admin/token_changelist.html"
 
     def get_urls(self):
@@ -24,48 +97,35 @@ class TokenAdmin(GuardedModelAdmin):
         custom_urls = [
             path('create-10-tokens/', self.admin_site.admin_view(
                 self.create_10_tokens), name='create-10-tokens'),
+            path('mint-tokens/', self.admin_site.admin_view(
+                self.mint_tokens), name='mint-tokens'),
         ]
         return custom_urls + urls
 
     def create_10_tokens(self, request):
-        for i in range(10):
-            Token.objects.create()
+        Token.mint(10)
         self.message_user(request, "10 tokens foram criados com sucesso.")
         return HttpResponseRedirect("../")
 
-    def export_as_excel(self, request, queryset):
-        # Cria um workbook e uma worksheet
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Tokens'
-
-        # Define os cabeçalhos
-        headers = ['TOKEN', 'USADO', 'CRIADO EM']
-        worksheet.append(headers)
-
-        bold_font = openpyxl.styles.Font(bold=True)
-        for cell in worksheet[1]:
-            cell.font = bold_font
-        # Adiciona os dados dos eventos
-        for token in queryset:
-            used = 'Não'
-            if token.used:
-                used = 'Sim'
-            created_at = token.created_at.strftime('%d/%m/%Y %H:%M:%S')
-            row = [token.token_code, used, created_at]
-            worksheet.append(row)
-
-        # Cria a resposta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=tokens.xlsx'
-        workbook.save(response)
-        return response
-    export_as_excel.short_description = 'Exportar tokens como Excel'
+    def mint_tokens(self, request):
+        """Cria a quantidade de tokens informada no formulário, por exemplo os de uma temporada inteira."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = MintTokensForm(request.POST or None)
+        if request.method == 'POST' and form.is_valid():
+            tokens = Token.mint(form.cleaned_data['count'])
+            self.message_user(request, f"{len(tokens)} tokens foram criados com sucesso.")
+            return HttpResponseRedirect("../")
+        return TemplateResponse(request, "admin/token_mint.html", {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Criar tokens em lote',
+            'form': form,
+        })
 
 
 @admin.register(Event)
-class EventAdmin(GuardedModelAdmin):
+class EventAdmin(ExportActionsMixin, GuardedModelAdmin):
     def final_results_published(self, obj):
         return obj.is_final_results_published
     final_results_published.short_description = 'Final Results Published?'
@@ -86,45 +146,12 @@ class EventAdmin(GuardedModelAdmin):
     ordering = ['name', 'active', 'is_final_results_published',
                 'is_imortal_results_published', 'token', 'join_token']
 
-    actions = ['export_as_excel']
-
-    def export_as_excel(self, request, queryset):
-        # Cria um workbook e uma worksheet
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Events'
-
-        # Define os cabeçalhos
-        headers = ['NOME', 'ATIVO', 'ADMIN TOKEN', 'JOIN TOKEN',
-                   'RESULTADOS IMORTAIS PUBLICADOS', 'RESULTADOS FINAIS PUBLICADOS']
-        worksheet.append(headers)
-
-        bold_font = openpyxl.styles.Font(bold=True)
-        for cell in worksheet[1]:
-            cell.font = bold_font
-        # Adiciona os dados dos eventos
-        for event in queryset:
-            token = event.token.token_code
-            active = 'Não'
-            imortal = 'Não'
-            final = 'Não'
-            if event.active:
-                active = 'Sim'
-            if event.is_imortal_results_published:
-                imortal = 'Sim'
-            if event.is_final_results_published:
-                final = 'Sim'
-            row = [event.name, active, token, event.join_token, imortal, final]
-            worksheet.append(row)
-
-        # Cria a resposta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=events.xlsx'
-        workbook.save(response)
-        return response
-
-    export_as_excel.short_description = 'Exportar eventos como Excel'
+    actions = ['export_as_excel', 'export_as_csv', 'export_as_parquet']
+    export_columns = [('NOME', 'name'), ('ATIVO', 'active'), ('ADMIN TOKEN', 'token__token_code'),
+                      ('JOIN TOKEN', 'join_token'), ('RESULTADOS IMORTAIS PUBLICADOS', 'is_imortal_results_published'),
+                      ('RESULTADOS FINAIS PUBLICADOS', 'is_final_results_published')]
+    export_filename = 'events'
+    export_sheet_name = 'Events'
 
 
 class SumulaAdmin(GuardedModelAdmin):
@@ -151,9 +178,7 @@ class SumulaAdmin(GuardedModelAdmin):
         return qs.annotate(scores_count=Count('scores'))
 
     def rounds_count(self, obj):
-        if obj.rounds is None:
-            return 0
-        return len(obj.rounds)
+        return obj.matches.aggregate(rounds=Max('round_number'))['rounds'] or 0
 
     # def pairs_count(self, obj):
     #     pairs = []
@@ -164,10 +189,10 @@ class SumulaAdmin(GuardedModelAdmin):
     player_scores.short_description = 'Player Scores'
     referees.short_description = 'Referees'
     list_display = ['name', 'event', 'referees',
-                    'id', 'player_scores', 'players_count', 'active', 'rounds_count', 'rounds']
+                    'id', 'player_scores', 'players_count', 'active', 'rounds_count']
     search_fields = ['referee__username', 'event__name', 'name']
     fields = ['referee', 'event', 'name',
-              'active', 'description', 'rounds']
+              'active', 'description']
     filter_horizontal = ['referee']
     ordering = ['event', 'name']
 
@@ -175,9 +200,9 @@ class SumulaAdmin(GuardedModelAdmin):
 @ admin.register(SumulaImortal)
 class SumulaImortalAdmin(SumulaAdmin):
     list_display = ['name', 'event', 'referees',
-                    'id', 'player_scores', 'players_count', 'active', 'rounds_count', 'rounds', 'number']
+                    'id', 'player_scores', 'players_count', 'active', 'rounds_count', 'number']
     fields = ['referee', 'event', 'name',
-              'active', 'description', 'rounds', 'number']
+              'active', 'description', 'number']
 
 
 @ admin.register(SumulaClassificatoria)
@@ -0,0 +1,65 @@
+import string
+from typing import Sequence, TypeVar
+
+T = TypeVar('T')
+
+MIN_PLAYERS = 6
+MAX_PLAYERS = 8
+LETTERS = string.ascii_uppercase  # Alfabeto para nomear as chaves
+
+
+def plan_bracket_sizes(n_players: int, min_players: int = MIN_PLAYERS, max_players: int = MAX_PLAYERS) -> list[int]:
+    """Planeja o tamanho de cada chave classificatoria para n_players jogadores.
+
+    As chaves são preenchidas com max_players jogadores e, caso a última chave fique com
+    menos de min_players, jogadores são remanejados (de 2 em 2) das chaves completas anteriores.
+    Se não houver chaves suficientes para o remanejamento, os jogadores são distribuídos igualmente.
+    """
+    if n_players <= 0:
+        return []
+    n_sumulas, resto = divmod(n_players, max_players)
+    sizes = [max_players] * n_sumulas
+    if resto == 0:
+        return sizes
+    sizes.append(resto)
+    if resto >= min_players:
+        return sizes
+
+    deficit = min_players - resto
+    for i in range(n_sumulas - 1, -1, -1):
+        if deficit == 0:
+            break
+        moved = min(2, deficit, sizes[i] - min_players)
+        sizes[i] -= moved
+        sizes[-1] += moved
+        deficit -= moved
+    if deficit > 0:
+        return balanced_bracket_sizes(n_players, len(sizes))
+    return sizes
+
+
+def balanced_bracket_sizes(n_players: int, n_sumulas: int) -> list[int]:
+    """Distribui n_players jogadores da forma mais igual possível entre n_sumulas chaves."""
+    base, extra = divmod(n_players, n_sumulas)
+    return [base + 1 if i < extra else base for i in range(n_sumulas)]
+
+
+def partition(items: Sequence[T], sizes: list[int]) -> list[list[T]]:
+    """Divide a sequência items em blocos consecutivos com os tamanhos fornecidos."""
+    if sum(sizes) != len(items):
+        raise ValueError(
+            "A soma dos tamanhos das chaves não corresponde ao número de jogadores!")
+    chunks = []
+    start = 0
+    for size in sizes:
+        chunks.append(list(items[start:start + size]))
+        start += size
+    return chunks
+
+
+def bracket_name(index: int) -> str:
+    """Retorna o nome da chave de acordo com sua posição.
+    Ex: 0 -> Chave A, 25 -> Chave Z, 26 -> Chave AA, 27 -> Chave BB
+    """
+    letter = LETTERS[index % len(LETTERS)]
+    return f"Chave {letter * (index // len(LETTERS) + 1)}"
@@ -0,0 +1,148 @@
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.http import quote_etag
+
+EVENT_CACHE_ALIAS = 'events'
+
+# Nomes dos payloads guardados em cache por evento
+RESULTS_PAYLOAD = 'results'
+SUMULAS_PAYLOAD = 'sumulas'
+ACTIVE_SUMULAS_PAYLOAD = 'sumulas-ativas'
+FINISHED_SUMULAS_PAYLOAD = 'sumulas-encerradas'
+CACHED_PAYLOADS = [RESULTS_PAYLOAD, SUMULAS_PAYLOAD,
+                   ACTIVE_SUMULAS_PAYLOAD, FINISHED_SUMULAS_PAYLOAD]
+
+
+def get_event_cache():
+    """Retorna o backend de cache das leituras por evento (settings.CACHES['events'])."""
+    return caches[EVENT_CACHE_ALIAS]
+
+
+def _version_key(event_id: int) -> str:
+    return f'event:{event_id}:version'
+
+
+def _payload_key(event_id: int, version: int, name: str) -> str:
+    return f'event:{event_id}:v{version}:{name}'
+
+
+def _stats_key(name: str, kind: str) -> str:
+    return f'event-cache:{name}:{kind}'
+
+
+def get_event_version(event_id: int) -> int:
+    """Retorna a versão atual dos dados do evento.
+    A versão inicial usa o relógio para não coincidir com versões anteriores que tenham expirado do cache.
+    """
+    cache = get_event_cache()
+    version = cache.get(_version_key(event_id))
+    if version is None:
+        cache.add(_version_key(event_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(event_id))
+    return version
+
+
+def _bump_event_version(event_id: int) -> None:
+    cache = get_event_cache()
+    try:
+        cache.incr(_version_key(event_id))
+    except ValueError:
+        cache.set(_version_key(event_id), time.time_ns(), timeout=None)
+
+
+def invalidate_event_cache(event_id: Optional[int]) -> None:
+    """Invalida os payloads em cache do evento incrementando a sua versão.
+
+    Dentro de uma transação, a versão é incrementada novamente após o commit, para descartar
+    payloads que tenham sido montados com os dados anteriores enquanto a transação estava aberta.
+    """
+    if event_id is None:
+        return
+    _bump_event_version(event_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_event_version(event_id))
+
+
+def _count(name: str, kind: str) -> None:
+    cache = get_event_cache()
+    try:
+        cache.incr(_stats_key(name, kind))
+    except ValueError:
+        cache.set(_stats_key(name, kind), 1, timeout=None)
+
+
+def get_cached_event_payload(event_id: int, name: str, build: Callable[[], Any]) -> Any:
+    """Retorna o payload do evento guardado em cache para a versão atual do evento.
+    Se não houver payload em cache, ele é montado com build() e guardado por settings.EVENT_CACHE_TIMEOUT segundos.
+    """
+    key, data = _get_payload(event_id, name)
+    if data is not None:
+        return data
+    data = build()
+    get_event_cache().set(key, data, timeout=settings.EVENT_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_cached_event_payload(event_id: int, name: str, build: Callable[[], Awaitable[Any]]) -> Any:
+    """Versão assíncrona de get_cached_event_payload, em que build é uma coroutine.
+    As operações no cache (idas e voltas de rede com o Redis) rodam fora do loop, com sync_to_async.
+    """
+    key, data = await sync_to_async(_get_payload)(event_id, name)
+    if data is not None:
+        return data
+    data = await build()
+    await get_event_cache().aset(key, data, timeout=settings.EVENT_CACHE_TIMEOUT)
+    return data
+
+
+def _get_payload(event_id: int, name: str) -> tuple[str, Any]:
+    """Retorna a chave do payload na versão atual do evento e o payload em cache (None se ausente)."""
+    key = _payload_key(event_id, get_event_version(event_id), name)
+    data = get_event_cache().get(key)
+    _count(name, 'hits' if data is not None else 'misses')
+    return key, data
+
+
+def is_event_version_shared() -> bool:
+    """Indica se a versão dos eventos é a mesma em todos os processos que servem a API.
+    O LocMemCache é de cada processo e só vale com settings.EVENT_CACHE_SINGLE_PROCESS (runserver e testes).
+    """
+    return not isinstance(get_event_cache(), LocMemCache) or settings.EVENT_CACHE_SINGLE_PROCESS
+
+
+def get_event_etag(event_id: int, name: str, *parts) -> Optional[str]:
+    """Retorna a ETag de uma leitura do evento, derivada da versão atual dos dados do evento.
+    As partes extras diferenciam leituras que dependem do usuário (ex: id do jogador).
+    Retorna None se a versão não é compartilhada entre os processos: a ETag de um processo não
+    acompanharia as alterações feitas pelos outros.
+    """
+    if not is_event_version_shared():
+        return None
+    tag = ':'.join(str(part)
+                   for part in [name, event_id, get_event_version(event_id), *parts])
+    return quote_etag(tag)
+
+
+async def aget_event_etag(event_id: int, name: str, *parts) -> Optional[str]:
+    """Versão assíncrona de get_event_etag: a leitura da versão no cache roda fora do loop."""
+    return await sync_to_async(get_event_etag)(event_id, name, *parts)
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Retorna o número de acertos (hits) e falhas (misses) do cache de cada payload."""
+    keys = [_stats_key(name, kind)
+            for name in CACHED_PAYLOADS for kind in ['hits', 'misses']]
+    values = get_event_cache().get_many(keys)
+    return {name: {kind: values.get(_stats_key(name, kind), 0) for kind in ['hits', 'misses']}
+            for name in CACHED_PAYLOADS}
+
+
+def reset_cache_stats() -> None:
+    get_event_cache().delete_many([_stats_key(name, kind)
+                                   for name in CACHED_PAYLOADS for kind in ['hits', 'misses']])
@@ -0,0 +1,169 @@
+import csv
+import io
+from itertools import islice
+import tempfile
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Iterator, Optional, Sequence
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import QuerySet
+from django.http import FileResponse, HttpRequest, StreamingHttpResponse
+import xlsxwriter
+
+# Linhas lidas do banco por vez e linhas de CSV por pedaço enviado
+EXPORT_CHUNK_SIZE = 2000
+# Bytes lidos do arquivo temporário por pedaço enviado
+EXPORT_FILE_CHUNK_SIZE = 64 * 1024
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PARQUET_CONTENT_TYPE = 'application/vnd.apache.parquet'
+
+
+def is_asgi_request(request: HttpRequest) -> bool:
+    """Indica se a requisição (do Django ou do DRF) é servida pelo ASGI.
+    O corpo das respostas em streaming deve ser um iterador assíncrono no ASGI e síncrono no WSGI:
+    no modo oposto, o Django lê o iterador inteiro para a memória antes de enviá-lo.
+    """
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def iter_rows(queryset: QuerySet, fields: Sequence[str],
+              transform: Optional[Callable[[tuple], Sequence]] = None) -> Iterable[Sequence]:
+    """Linhas da queryset lidas do banco em blocos de EXPORT_CHUNK_SIZE.
+    transform, se informado, é aplicado a cada linha.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return map(transform, rows) if transform else rows
+
+
+async def aiter_rows(queryset: QuerySet, fields: Sequence[str],
+                     transform: Optional[Callable[[tuple], Sequence]] = None) -> AsyncIterator[Sequence]:
+    """Versão assíncrona de iter_rows.
+    Usa values(): no Django 5.1, values_list().aiterator() executa a query fora de sync_to_async.
+    """
+    async for row in queryset.values(*fields).aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = tuple(row[field] for field in fields)
+        yield transform(row) if transform else row
+
+
+def _csv_writer(header: Sequence[str]) -> tuple[io.StringIO, csv.writer]:
+    """Buffer do CSV já com o cabeçalho. O BOM no início faz o Excel abrir o arquivo como UTF-8 (nomes com acentos)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    return buffer, writer
+
+
+def _flush(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def stream_csv(header: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Gera o CSV em pedaços de EXPORT_CHUNK_SIZE linhas, sem guardar o arquivo inteiro."""
+    buffer, writer = _csv_writer(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield _flush(buffer)
+    yield _flush(buffer)
+
+
+async def astream_csv(header: Sequence[str], rows: AsyncIterator[Sequence]) -> AsyncIterator[str]:
+    """Versão assíncrona de stream_csv."""
+    buffer, writer = _csv_writer(header)
+    count = 0
+    async for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield _flush(buffer)
+    yield _flush(buffer)
+
+
+def write_xlsx(header: Sequence[str], rows: Iterable[Sequence], sheet_name: str) -> BinaryIO:
+    """Escreve as linhas em um arquivo Excel temporário, linha a linha.
+    No modo constant_memory o xlsxwriter mantém apenas a linha atual em memória.
+    """
+    file = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(file, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, header, workbook.add_format({'bold': True}))
+    for index, row in enumerate(rows, start=1):
+        worksheet.write_row(index, 0, row)
+    workbook.close()
+    file.seek(0)
+    return file
+
+
+def write_parquet(header: Sequence[str], field_types: Sequence[str], rows: Iterable[Sequence]) -> BinaryIO:
+    """Escreve as linhas em um arquivo Parquet temporário, um row group a cada EXPORT_CHUNK_SIZE linhas.
+    field_types são os tipos internos dos campos do Django (get_internal_type), usados no schema.
+    """
+    # pyarrow é carregado só aqui para não pesar na inicialização dos workers
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'BooleanField': pa.bool_(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+        'DateField': pa.date32(),
+        'FloatField': pa.float64(),
+        'IntegerField': pa.int64(),
+        'BigIntegerField': pa.int64(),
+        'PositiveIntegerField': pa.int64(),
+        'AutoField': pa.int64(),
+        'BigAutoField': pa.int64(),
+    }
+    schema = pa.schema([(name, types.get(field_type, pa.string()))
+                        for name, field_type in zip(header, field_types)])
+    file = tempfile.TemporaryFile()
+    rows = iter(rows)
+    with pq.ParquetWriter(file, schema) as writer:
+        while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)],
+                schema=schema))
+    file.seek(0)
+    return file
+
+
+async def astream_file(file: BinaryIO) -> AsyncIterator[bytes]:
+    """Envia o arquivo em pedaços e o fecha ao final (ASGI)."""
+    try:
+        while chunk := await sync_to_async(file.read)(EXPORT_FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+def export_file_response(request: HttpRequest, file: BinaryIO, content_type: str,
+                         filename: str) -> StreamingHttpResponse:
+    """Envia o arquivo temporário em pedaços de EXPORT_FILE_CHUNK_SIZE bytes e o fecha ao final."""
+    if is_asgi_request(request):
+        response = StreamingHttpResponse(astream_file(file), content_type=content_type)
+    else:
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = EXPORT_FILE_CHUNK_SIZE
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def export_csv_response(request: HttpRequest, header: Sequence[str], queryset: QuerySet, fields: Sequence[str],
+                        filename: str, transform: Optional[Callable[[tuple], Sequence]] = None) -> StreamingHttpResponse:
+    """Envia as linhas da queryset como CSV, lidas do banco e escritas em pedaços."""
+    if is_asgi_request(request):
+        content = astream_csv(header, aiter_rows(queryset, fields, transform))
+    else:
+        content = stream_csv(header, iter_rows(queryset, fields, transform))
+    response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+async def axlsx_response(request: HttpRequest, header: Sequence[str], rows: Iterable[Sequence], sheet_name: str,
+                         filename: str) -> StreamingHttpResponse:
+    """Gera o arquivo Excel fora do loop de eventos e o envia em pedaços."""
+    file = await sync_to_async(write_xlsx)(header, rows, sheet_name)
+    return export_file_response(request, file, XLSX_CONTENT_TYPE, filename)
@@ -0,0 +1,75 @@
+"""Fábricas de dados para os benchmarks.
+
+create_event monta um evento completo, como se o administrador já tivesse criado o evento e
+importado as planilhas de jogadores e monitores: os jogadores e monitores ainda não entraram
+no evento, o que é feito pelos próprios usuários através da API.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from uuid import uuid4
+from django.contrib.auth.models import Group
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models import Event, LeaderboardEntry, Player, Results, Staff, Token
+from api.permissions import assign_permissions
+from users.models import User
+
+FACTORY_GROUPS = ['event_admin', 'staff_manager', 'staff_member', 'player']
+
+
+@dataclass
+class SeededEvent:
+    """Evento criado por create_event, com os usuários de cada papel."""
+    event: Event
+    admin: User
+    players: list[User]
+    staff: list[User]
+    prefix: str
+
+    @staticmethod
+    def access_token(user: User) -> str:
+        """Token de acesso JWT do usuário, o mesmo emitido no login."""
+        return str(AccessToken.for_user(user))
+
+
+def create_users(prefix: str, role: str, count: int) -> list[User]:
+    return User.objects.bulk_create([
+        User(username=f'{prefix}-{role}-{i}', email=f'{prefix}-{role}-{i}@example.com')
+        for i in range(count)])
+
+
+def create_event(players: int, staff: int, prefix: Optional[str] = None) -> SeededEvent:
+    """Cria um evento com o administrador, os resultados, os jogadores e os monitores cadastrados.
+    Os usuários são criados com o prefixo informado (ou um aleatório), que identifica os dados para delete_event.
+    """
+    prefix = prefix or f'bench-{uuid4().hex[:8]}'
+    with transaction.atomic():
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in FACTORY_GROUPS}
+        token = Token.objects.create(used=True)
+        admin = User.objects.create(username=f'{prefix}-admin', email=f'{prefix}-admin@example.com')
+        event = Event.objects.create(token=token, name=f'Evento {prefix}', admin_email=admin.email)
+        Results.objects.create(event=event)
+        assign_permissions(admin, groups['event_admin'], event)
+        admin.events.add(event)
+
+        player_users = create_users(prefix, 'player', players)
+        Player.objects.bulk_create([
+            Player(event=event, full_name=f'Jogador {i}', registration_email=user.email)
+            for i, user in enumerate(player_users)])
+        # bulk_create não dispara post_save
+        LeaderboardEntry.refresh(event.id)
+
+        staff_users = create_users(prefix, 'staff', staff)
+        Staff.objects.bulk_create([
+            Staff(event=event, full_name=f'Monitor {i}', registration_email=user.email)
+            for i, user in enumerate(staff_users)])
+    return SeededEvent(event=event, admin=admin, players=player_users, staff=staff_users, prefix=prefix)
+
+
+def delete_event(seeded: SeededEvent) -> None:
+    """Remove o evento criado por create_event e todos os usuários com o seu prefixo."""
+    with transaction.atomic():
+        token = seeded.event.token
+        seeded.event.delete()
+        token.delete()
+        User.objects.filter(username__startswith=f'{seeded.prefix}-').delete()
@@ -0,0 +1,276 @@
+import re
+from io import StringIO
+from typing import Iterable, Iterator, Optional
+
+import chardet
+import pandas as pd
+from django.core.validators import EmailValidator, validate_email
+from django.db import models, transaction
+from django.forms import ValidationError
+from openpyxl import load_workbook
+
+from .cache import invalidate_event_cache
+from .models import LeaderboardEntry, Player
+
+CHUNK_SIZE = 2000  # Linhas lidas e gravadas por vez
+SAMPLE_SIZE = 64 * 1024  # Bytes usados para detectar a codificação e o delimitador do CSV
+MAX_EMAIL_LENGTH = 320  # RFC 3696, mesmo limite usado pelo EmailValidator do Django
+MAX_ERROR_REPORTS = 1000  # Linhas com erro detalhadas no relatório; a contagem é sempre completa
+FIRST_DATA_ROW = 2  # Linha do arquivo da primeira linha de dados (a primeira é o cabeçalho)
+
+NAME_COLUMN = 'nome completo'
+EMAIL_COLUMN = 'e-mail'
+IMPORT_COLUMNS = [NAME_COLUMN, EMAIL_COLUMN]
+
+INVALID_NAME_OR_EMAIL_ERROR_MESSAGE = 'Nome ou email inválidos!'
+INVALID_EMAIL_ERROR_MESSAGE = 'E-mail inválido!'
+
+# Primeiro caractere de cada palavra separada por espaços
+WORD_START_REGEX = re.compile(r'(?<!\S)\S')
+
+
+def read_table_chunks(file, extension: str, columns: list[str], chunksize: int = CHUNK_SIZE) -> Optional[Iterator[pd.DataFrame]]:
+    """Lê um arquivo CSV, XLSX ou XLS em blocos de até chunksize linhas.
+
+    O cabeçalho é validado antes da leitura das linhas: os nomes das colunas são comparados sem
+    diferenciar maiúsculas e espaços e apenas as colunas fornecidas são mantidas, já com o nome normalizado.
+    Retorna None se a extensão não for suportada.
+    - ValueError: Se alguma das colunas fornecidas não estiver presente no arquivo.
+    """
+    if extension == 'csv':
+        return _read_csv_chunks(file, columns, chunksize)
+    if extension == 'xlsx':
+        return _read_xlsx_chunks(file, columns, chunksize)
+    if extension == 'xls':
+        return _read_xls_chunks(file, columns, chunksize)
+    return None
+
+
+def _raw_file(file):
+    """Retorna o arquivo binário por trás de um UploadedFile do Django."""
+    return getattr(file, 'file', file)
+
+
+def _column_positions(header, columns: list[str]) -> dict[str, int]:
+    """Mapeia cada coluna esperada para a sua posição no cabeçalho do arquivo."""
+    normalized = [str(column).strip().lower()
+                  if column is not None else '' for column in header]
+    missing_columns = [
+        column for column in columns if column not in normalized]
+    if missing_columns:
+        raise ValueError(
+            f"ERRO - Colunas ausentes no arquivo: {', '.join(missing_columns)}")
+    return {column: normalized.index(column) for column in columns}
+
+
+def _read_csv_chunks(file, columns: list[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Lê um CSV em blocos sem decodificar o arquivo inteiro em memória.
+    A codificação e o delimitador são detectados a partir de uma amostra do início do arquivo.
+    """
+    raw = _raw_file(file)
+    raw.seek(0)
+    sample = raw.read(SAMPLE_SIZE)
+    raw.seek(0)
+    encoding = _detect_encoding(sample)
+    lines = sample.decode(encoding, errors='ignore').splitlines()
+    first_line = lines[0] if lines else ''
+    delimiter = ';' if ';' in first_line else ','
+
+    header = pd.read_csv(StringIO(first_line), delimiter=delimiter,
+                         nrows=0).columns if first_line else []
+    positions = _column_positions(header, columns)
+
+    reader = pd.read_csv(raw, header=0, encoding=encoding, encoding_errors='replace',
+                         delimiter=delimiter, usecols=list(positions.values()),
+                         dtype=str, chunksize=chunksize)
+    return _rename_chunks(reader, positions)
+
+
+def _detect_encoding(sample: bytes) -> str:
+    """Detecta a codificação da amostra, preferindo UTF-8 quando ela é válida.
+    Um caractere multibyte cortado no fim da amostra não invalida o UTF-8.
+    """
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 3 and e.reason == 'unexpected end of data':
+            return 'utf-8'
+    return chardet.detect(sample)['encoding'] or 'utf-8'
+
+
+def _rename_chunks(reader, positions: dict[str, int]) -> Iterator[pd.DataFrame]:
+    """Renomeia as colunas de cada bloco lido pelo pandas para os nomes normalizados.
+    Com usecols, o pandas mantém as colunas na ordem em que aparecem no arquivo.
+    """
+    names = [column for column, _ in sorted(
+        positions.items(), key=lambda item: item[1])]
+    with reader:
+        for chunk in reader:
+            chunk.columns = names
+            yield chunk[list(positions.keys())]
+
+
+def _read_xlsx_chunks(file, columns: list[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Lê a primeira planilha de um XLSX em modo somente leitura, linha a linha."""
+    raw = _raw_file(file)
+    raw.seek(0)
+    workbook = load_workbook(raw, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    try:
+        positions = _column_positions(next(rows, ()), columns)
+    except ValueError:
+        workbook.close()
+        raise
+    return _xlsx_chunks(workbook, rows, positions, chunksize)
+
+
+def _xlsx_chunks(workbook, rows, positions: dict[str, int], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Agrupa as linhas da planilha em DataFrames, numerados de forma contínua entre os blocos."""
+    try:
+        buffer = []
+        start = 0
+        for row in rows:
+            buffer.append([row[i] if i < len(row) else None
+                          for i in positions.values()])
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=list(positions.keys()), index=range(start, start + len(buffer)))
+                start += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=list(positions.keys()), index=range(start, start + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def _read_xls_chunks(file, columns: list[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """O formato XLS não permite leitura em blocos: o arquivo é lido inteiro e fatiado."""
+    raw = _raw_file(file)
+    raw.seek(0)
+    df = pd.read_excel(raw, dtype=object)
+    positions = _column_positions(df.columns, columns)
+    df = df.iloc[:, list(positions.values())]
+    df.columns = list(positions.keys())
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+
+def string_mask(*series: pd.Series) -> pd.Series:
+    """Retorna uma máscara com as linhas em que todos os valores fornecidos são textos."""
+    mask = pd.Series(True, index=series[0].index)
+    for values in series:
+        mask &= values.map(lambda value: isinstance(value, str))
+    return mask
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Remove espaços das pontas e deixa a primeira letra de cada palavra maiúscula.
+    Ex: '  joão DA silva ' -> 'João Da Silva'
+    """
+    return names.str.strip().str.lower().str.replace(
+        WORD_START_REGEX, lambda match: match.group(0).upper(), regex=True)
+
+
+def normalize_emails(emails: pd.Series) -> pd.Series:
+    """Remove espaços das pontas e deixa o email em minúsculas."""
+    return emails.str.strip().str.lower()
+
+
+def valid_emails(emails: pd.Series) -> pd.Series:
+    """Valida uma série de emails com as mesmas regras do validate_email do Django.
+
+    As expressões regulares do EmailValidator são aplicadas de forma vetorizada sobre a parte do
+    usuário e do domínio. Apenas os emails recusados pelo caminho rápido (domínios internacionalizados,
+    IPs literais ou domínios da allowlist) são validados individualmente pelo validate_email.
+    """
+    validator = EmailValidator()
+    parts = emails.str.rpartition('@')
+    user_part, separator, domain_part = parts[0], parts[1], parts[2]
+    candidates = (separator == '@') & (
+        emails.str.len() <= MAX_EMAIL_LENGTH)
+
+    valid = candidates & user_part.str.match(
+        validator.user_regex.pattern, flags=validator.user_regex.flags)
+    valid &= domain_part.str.match(
+        validator.domain_regex.pattern, flags=validator.domain_regex.flags)
+
+    for index in emails.index[candidates & ~valid]:
+        try:
+            validate_email(emails[index])
+        except ValidationError:
+            continue
+        valid[index] = True
+    return valid.fillna(False).astype(bool)
+
+
+class ImportResult:
+    """Resultado de uma importação: total de linhas lidas e relatório das linhas recusadas.
+    Cada erro é um dicionário com a linha do arquivo, o email informado e o motivo.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.errors_count = 0
+        self.errors: list[dict] = []
+
+    def add_errors(self, rows: pd.Series, emails: pd.Series, message: str) -> None:
+        """Registra as linhas marcadas em rows como recusadas pelo motivo fornecido."""
+        indexes = rows.index[rows]
+        self.errors_count += len(indexes)
+        for index in indexes[:max(MAX_ERROR_REPORTS - len(self.errors), 0)]:
+            email = emails[index]
+            self.errors.append({
+                'row': int(index) + FIRST_DATA_ROW,
+                'email': email if isinstance(email, str) else None,
+                'error': message,
+            })
+
+
+class TabularImporter:
+    """Importa pessoas (nome completo e email) de uma planilha para um modelo associado a um evento.
+
+    Cada bloco do arquivo é limpo e validado de forma vetorizada e gravado com um único upsert
+    na restrição única (registration_email, event) do modelo. Registros já existentes têm os campos
+    de update_fields atualizados. Linhas inválidas entram no relatório de erros sem interromper a importação.
+    """
+
+    def __init__(self, model: type[models.Model], event, update_fields: list[str], defaults: Optional[dict] = None):
+        self.model = model
+        self.event = event
+        self.update_fields = update_fields
+        self.defaults = defaults or {}
+
+    def run(self, chunks: Iterable[pd.DataFrame]) -> ImportResult:
+        """Importa todos os blocos em uma única transação."""
+        result = ImportResult()
+        with transaction.atomic():
+            for chunk in chunks:
+                self.import_chunk(chunk, result)
+            # O upsert em lote não dispara post_save
+            invalidate_event_cache(self.event.id)
+            if self.model is Player:
+                LeaderboardEntry.refresh(self.event.id)
+        return result
+
+    def import_chunk(self, chunk: pd.DataFrame, result: ImportResult) -> None:
+        result.total += len(chunk)
+        names = chunk[NAME_COLUMN]
+        emails = chunk[EMAIL_COLUMN]
+
+        rows = string_mask(names, emails)
+        result.add_errors(~rows, emails, INVALID_NAME_OR_EMAIL_ERROR_MESSAGE)
+        names = normalize_names(names[rows])
+        emails = normalize_emails(emails[rows])
+        valid = valid_emails(emails)
+        result.add_errors(~valid, emails, INVALID_EMAIL_ERROR_MESSAGE)
+
+        records = pd.DataFrame({'name': names[valid], 'email': emails[valid]})
+        # O mesmo email repetido no arquivo mantém a última linha
+        records = records.drop_duplicates('email', keep='last')
+        if records.empty:
+            return
+        self.model.objects.bulk_create(
+            [self.model(full_name=name, registration_email=email, event=self.event, **self.defaults)
+             for name, email in zip(records['name'], records['email'])],
+            update_conflicts=True,
+            unique_fields=['registration_email', 'event'],
+            update_fields=self.update_fields)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+from typing import Any, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+QUEUE_SIZE = 100  # Mensagens pendentes por conexão antes de pedir que o cliente recarregue os dados
+RESYNC_MESSAGE = {'type': 'resync', 'data': None}
+
+
+class EventStreamBroker:
+    """Distribui as atualizações de cada evento para as conexões SSE abertas neste processo.
+
+    Cada conexão é uma fila asyncio associada ao loop que a criou. As publicações podem vir de
+    qualquer thread (as views síncronas rodam em threads separadas no ASGI) e são entregues
+    com call_soon_threadsafe. As conexões de outros processos/instâncias não são alcançadas.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id: int) -> asyncio.Queue:
+        """Cria a fila de uma nova conexão. Deve ser chamado dentro do loop que vai consumir a fila."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(event_id, set()).add(
+                (asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, event_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(event_id, set())
+            for subscriber in [subscriber for subscriber in subscribers if subscriber[1] is queue]:
+                subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(event_id, None)
+
+    def has_subscribers(self, event_id: int) -> bool:
+        return bool(self._subscribers.get(event_id))
+
+    def subscribers_count(self, event_id: int) -> int:
+        return len(self._subscribers.get(event_id, ()))
+
+    def publish(self, event_id: int, message: dict) -> None:
+        """Entrega a mensagem a todas as conexões abertas do evento."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # O loop da conexão já foi encerrado
+                self.unsubscribe(event_id, queue)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, message: dict) -> None:
+        """Coloca a mensagem na fila. Se o cliente está atrasado demais, as mensagens pendentes
+        são descartadas e ele recebe um pedido para recarregar os dados (resync).
+        """
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_MESSAGE)
+
+
+broker = EventStreamBroker()
+
+
+def publish_event_update(event_id: Optional[int], type: str, data: Any = None) -> None:
+    """Publica uma atualização do evento para as conexões SSE depois do commit da transação atual."""
+    if event_id is None or not broker.has_subscribers(event_id):
+        return
+    message = {'type': type, 'data': data}
+    transaction.on_commit(lambda: broker.publish(event_id, message))
+
+
+def format_sse(message: dict) -> str:
+    """Formata uma mensagem no formato de Server-Sent Events (campo event e dados em JSON)."""
+    data = json.dumps(message['data'], cls=DjangoJSONEncoder)
+    return f"event: {message['type']}\ndata: {data}\n\n"
@@ -0,0 +1,259 @@
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from api.factories import SeededEvent, create_event, delete_event
+
+# Endpoints consultados continuamente por cada papel enquanto as sumulas são pontuadas
+POLLING_ENDPOINTS = {
+    'player': ['api/sumula/player/'],
+    'staff': ['api/sumula/ativas/'],
+    'admin': ['api/sumula/', 'api/results/leaderboard/', 'api/players/'],
+}
+# Endpoints consultados pelos jogadores depois da publicação dos resultados
+RESULTS_ENDPOINTS = ['api/results/', 'api/results/player/', 'api/results/leaderboard/']
+
+
+def percentile(values: list[float], p: int) -> float:
+    return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    """Faz as requisições HTTP, uma sessão por thread, e guarda a latência e o status de cada uma por
+    endpoint na fase atual. Falhas de conexão são registradas com status None.
+    """
+
+    def __init__(self, url: str, event_id: int, timeout: float = 60):
+        self.url = url.rstrip('/')
+        self.event_id = event_id
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[tuple[float, Optional[int]]]] = {}
+        self.phases: list[dict] = []
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def request(self, method: str, endpoint: str, token: str, data: Optional[dict] = None) -> Optional[requests.Response]:
+        start = time.perf_counter()
+        try:
+            response = self.session().request(
+                method, f'{self.url}/{endpoint}', params={'event_id': self.event_id}, json=data,
+                headers={'Authorization': f'Bearer {token}'}, timeout=self.timeout)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, None
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.samples.setdefault(f'{method} {endpoint}', []).append((latency, status))
+        return response
+
+    @contextmanager
+    def phase(self, name: str):
+        self.samples = {}
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.phases.append({
+            'name': name,
+            'duration_s': round(elapsed, 3),
+            'endpoints': {endpoint: self.summarize(samples, elapsed) for endpoint, samples in self.samples.items()},
+        })
+
+    @staticmethod
+    def summarize(samples: list[tuple[float, Optional[int]]], elapsed: float) -> dict:
+        """Respostas 4xx fazem parte do dia (um jogador sem sumula ativa recebe 400) e são contadas à parte;
+        erros são as respostas 5xx e as falhas de conexão.
+        """
+        latencies = [latency * 1000 for latency, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, status in samples if status is None or status >= 500),
+            'client_errors': sum(1 for _, status in samples if status is not None and 400 <= status < 500),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
+
+
+class Command(BaseCommand):
+    """Este comando mede a API durante um dia de evento simulado.
+
+    Os dados são criados direto no banco por api.factories.create_event e o dia é reproduzido por HTTP
+    contra um servidor já em execução, que deve usar o mesmo banco (de preferência um Postgres local):
+
+        gunicorn core.asgi:application --workers 2 -k uvicorn_worker.UvicornWorker
+        python manage.py benchmark_event_day --players 2000 --staff 40 --output benchmarks/main.json
+
+    As fases são: entrada dos monitores e dos jogadores, geração das sumulas, escolha dos árbitros,
+    pontuação das sumulas em paralelo com as consultas dos jogadores, monitores e administrador,
+    publicação dos resultados e consulta dos resultados pelos jogadores. Para cada fase e endpoint são
+    registrados p50, p95, p99, vazão e erros, salvos em JSON para comparar commits com --compare.
+    """
+    help = 'Reproduz um dia de evento contra um servidor local e mede a latência de cada endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--players', type=int, default=2000)
+        parser.add_argument('--staff', type=int, default=40)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--pollers', type=int, default=16,
+                            help='Threads que consultam a API enquanto as sumulas são pontuadas.')
+        parser.add_argument('--polls', type=int, default=500,
+                            help='Consultas por endpoint depois da publicação dos resultados.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Arquivo JSON com os resultados.')
+        parser.add_argument('--compare', help='JSON de uma execução anterior para comparar o p95.')
+        parser.add_argument('--keep', action='store_true', help='Não remove os dados criados ao final.')
+
+    def handle(self, *args, **options):
+        if options['players'] < 6 or options['staff'] < 1:
+            raise CommandError('São necessários ao menos 6 jogadores e 1 monitor.')
+        self.random = random.Random(options['seed'])
+        self.concurrency = options['concurrency']
+        seeded = create_event(options['players'], options['staff'])
+        try:
+            recorder = Recorder(options['url'], seeded.event.id)
+            self.run_event_day(recorder, seeded, options)
+        finally:
+            if not options['keep']:
+                delete_event(seeded)
+
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'config': {key: options[key] for key in ['url', 'players', 'staff', 'concurrency', 'pollers', 'polls', 'seed']},
+            'phases': recorder.phases,
+        }
+        self.print_report(report)
+        if options['compare']:
+            self.print_comparison(json.loads(Path(options['compare']).read_text()), report)
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            self.stdout.write(self.style.SUCCESS(f'Resultados salvos em {path}'))
+
+    def run_concurrently(self, function: Callable, items: Iterable) -> list:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(function, items))
+
+    def run_event_day(self, recorder: Recorder, seeded: SeededEvent, options: dict) -> None:
+        tokens = {user.id: seeded.access_token(user) for user in [seeded.admin, *seeded.players, *seeded.staff]}
+        admin_token = tokens[seeded.admin.id]
+        join_token = seeded.event.join_token
+
+        with recorder.phase('staff_join'):
+            self.run_concurrently(lambda user: recorder.request(
+                'POST', 'api/staff/', tokens[user.id], {'join_token': join_token}), seeded.staff)
+
+        with recorder.phase('player_join'):
+            self.run_concurrently(lambda user: recorder.request(
+                'POST', 'api/players/', tokens[user.id], {'email': user.email, 'join_token': join_token}), seeded.players)
+
+        with recorder.phase('generate_sumulas'):
+            recorder.request('POST', 'api/sumula/generate/', admin_token)
+
+        response = recorder.request('GET', 'api/sumula/', admin_token)
+        if response is None or not response.ok:
+            raise CommandError('Não foi possível listar as sumulas geradas.')
+        sumulas = response.json()['sumulas_classificatoria']
+        # Cada sumula é arbitrada por um monitor, em rodízio
+        referees = {sumula['id']: seeded.staff[i % len(seeded.staff)] for i, sumula in enumerate(sumulas)}
+
+        with recorder.phase('referee_assignment'):
+            self.run_concurrently(lambda sumula: recorder.request(
+                'PUT', 'api/sumula/add-referee/', tokens[referees[sumula['id']].id],
+                {'sumula_id': sumula['id'], 'is_imortal': False}), sumulas)
+
+        # As pontuações são sorteadas antes da fase para que a execução seja reproduzível com --seed
+        points = {player_score['id']: self.random.randint(0, 30)
+                  for sumula in sumulas for player_score in sumula['players_score']}
+        with recorder.phase('scoring'):
+            stop = threading.Event()
+            users = {'player': seeded.players, 'staff': seeded.staff, 'admin': [seeded.admin]}
+
+            def poll(seed: int) -> None:
+                poller_random = random.Random(seed)
+                while not stop.is_set():
+                    role = poller_random.choice(list(POLLING_ENDPOINTS))
+                    user = poller_random.choice(users[role])
+                    recorder.request('GET', poller_random.choice(POLLING_ENDPOINTS[role]), tokens[user.id])
+
+            def score(sumula: dict) -> None:
+                recorder.request('PUT', 'api/sumula/classificatoria/', tokens[referees[sumula['id']].id], {
+                    'id': sumula['id'], 'name': sumula['name'], 'description': '',
+                    'players_score': [{**player_score, 'points': points[player_score['id']]}
+                                      for player_score in sumula['players_score']],
+                })
+
+            pollers = [threading.Thread(target=poll, args=(self.random.random(),))
+                       for _ in range(options['pollers'])]
+            for poller in pollers:
+                poller.start()
+            try:
+                self.run_concurrently(score, sumulas)
+            finally:
+                stop.set()
+                for poller in pollers:
+                    poller.join()
+
+        with recorder.phase('publishing'):
+            recorder.request('PUT', 'api/publish/results/imortals/', admin_token)
+            response = recorder.request('GET', 'api/results/leaderboard/', admin_token)
+            leaderboard = response.json()['results'] if response is not None and response.ok else []
+            recorder.request('PUT', 'api/results/', admin_token, {
+                'top4': [{'player_id': entry['player_id']} for entry in leaderboard[:4]],
+                'paladin': {'player_id': leaderboard[4]['player_id']} if len(leaderboard) > 4 else {},
+                'ambassor': {'player_id': leaderboard[5]['player_id']} if len(leaderboard) > 5 else {},
+            })
+
+        with recorder.phase('results_polling'):
+            requests_list = [(endpoint, self.random.choice(seeded.players))
+                             for endpoint in RESULTS_ENDPOINTS for _ in range(options['polls'])]
+            self.random.shuffle(requests_list)
+            self.run_concurrently(lambda item: recorder.request('GET', item[0], tokens[item[1].id]), requests_list)
+
+    def print_report(self, report: dict) -> None:
+        for phase in report['phases']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{phase['name']} ({phase['duration_s']}s)"))
+            self.stdout.write(f"  {'endpoint':<36}{'req':>7}{'req/s':>9}{'p50 ms':>9}"
+                              f"{'p95 ms':>9}{'p99 ms':>9}{'4xx':>7}{'erros':>7}")
+            for endpoint, stats in phase['endpoints'].items():
+                self.stdout.write(
+                    f"  {endpoint:<36}{stats['requests']:>7}{stats['throughput_rps']:>9}{stats['p50_ms']:>9}"
+                    f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['client_errors']:>7}{stats['errors']:>7}")
+
+    def print_comparison(self, baseline: dict, report: dict) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(f"p95 comparado com {baseline.get('commit')}"))
+        baseline_phases = {phase['name']: phase['endpoints'] for phase in baseline['phases']}
+        for phase in report['phases']:
+            for endpoint, stats in phase['endpoints'].items():
+                previous = baseline_phases.get(phase['name'], {}).get(endpoint)
+                if previous is None:
+                    continue
+                change = (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100 if previous['p95_ms'] else 0
+                line = f"  {phase['name']:<20}{endpoint:<36}{previous['p95_ms']:>9} -> {stats['p95_ms']:>9} ({change:+.1f}%)"
+                self.stdout.write(self.style.ERROR(line) if change > 10 else line)
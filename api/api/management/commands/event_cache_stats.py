@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from api.cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    """Este comando mostra os acertos (hits) e falhas (misses) do cache de leituras dos eventos.
+    Os contadores ajudam a calibrar EVENT_CACHE_TIMEOUT.
+    """
+    help = 'Mostra os acertos e falhas do cache de resultados e sumulas dos eventos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Zera os contadores após mostrá-los.')
+
+    def handle(self, *args, **options):
+        for name, stats in get_cache_stats().items():
+            total = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / total * 100 if total else 0
+            self.stdout.write(
+                f"{name}: {stats['hits']} hits, {stats['misses']} misses ({hit_rate:.1f}% de acerto)")
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados!'))
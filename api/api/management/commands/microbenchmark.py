@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from api.microbenchmarks import BASELINE_PATH, BENCHMARKS, DEFAULT_TOLERANCE, compare, run
+
+
+class Command(BaseCommand):
+    """Este comando executa os microbenchmarks de api.microbenchmarks e compara o resultado com a baseline.
+    Termina com erro se algum trecho crescer acima do expoente esperado ou ficar mais lento que a baseline,
+    para que possa ser usado na integração contínua.
+    """
+    help = 'Mede os trechos algorítmicos (chaves, rodadas, normalização de nomes e tokens) em tamanhos crescentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks a executar (padrão: todos).')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--baseline', default=str(BASELINE_PATH))
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='Fração de aumento do tempo aceita em relação à baseline.')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Salva os resultados como a nova baseline.')
+
+    def handle(self, *args, **options):
+        benchmarks = [benchmark for benchmark in BENCHMARKS
+                      if not options['names'] or benchmark.name in options['names']]
+        if not benchmarks:
+            raise CommandError(f"Nenhum benchmark encontrado. Disponíveis: {', '.join(b.name for b in BENCHMARKS)}")
+
+        results = run(benchmarks, options['repeat'])
+        for name, result in results.items():
+            times = '  '.join(f'n={size}: {time * 1e6:.1f}µs' for size, time in result['times'].items())
+            self.stdout.write(f"{name:<24}{times}  (n^{result['exponent']})")
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+            baseline.update(results)
+            baseline_path.write_text(json.dumps(baseline, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline salva em {baseline_path}'))
+            return
+
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        problems = compare(results, baseline, options['tolerance'])
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Nenhuma regressão encontrada.'))
@@ -0,0 +1,30 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from api.models import TOKEN_MINT_BATCH_SIZE, Token
+
+
+class Command(BaseCommand):
+    """Este comando cria tokens de criação de eventos em lote, por exemplo os de uma temporada inteira.
+    Os códigos criados são escritos na saída, um por linha, ou em um arquivo CSV com --output.
+    """
+    help = 'Cria a quantidade informada de tokens de criação de eventos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Quantidade de tokens.')
+        parser.add_argument('--batch-size', type=int, default=TOKEN_MINT_BATCH_SIZE,
+                            help='Tokens verificados e inseridos por query.')
+        parser.add_argument('--output', help='Arquivo CSV com os códigos criados.')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1 or options['batch_size'] < 1:
+            raise CommandError('A quantidade de tokens e o tamanho do lote devem ser maiores que 0.')
+        tokens = Token.mint(options['count'], options['batch_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(['TOKEN', 'CRIADO EM'])
+                writer.writerows((token.token_code, token.created_at.isoformat()) for token in tokens)
+        else:
+            for token in tokens:
+                self.stdout.write(token.token_code)
+        self.stderr.write(self.style.SUCCESS(f'{len(tokens)} tokens criados com sucesso!'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import LeaderboardEntry, Player
+from api.scores import drifted_players, recalculate_total_scores
+from api.cache import invalidate_event_cache
+
+
+class Command(BaseCommand):
+    """Este comando verifica e corrige a pontuação total dos jogadores.
+    A pontuação total é comparada com a soma dos PlayerScores de cada jogador.
+    """
+    help = 'Reconcilia a pontuação total dos jogadores com a soma de seus PlayerScores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int,
+                            help='ID do evento a ser verificado. Por padrão, todos os eventos.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas lista os jogadores divergentes, sem corrigir.')
+
+    def handle(self, *args, **options):
+        players = Player.objects.all()
+        if options['event'] is not None:
+            players = players.filter(event_id=options['event'])
+
+        with transaction.atomic():
+            drifted = list(drifted_players(players).values_list(
+                'id', 'event_id', 'total_score', 'expected_total_score'))
+            for player_id, _, total_score, expected in drifted:
+                self.stdout.write(
+                    f'Jogador {player_id}: pontuação total {total_score}, esperado {expected}')
+            if not drifted:
+                self.stdout.write('Nenhuma divergência encontrada!')
+                return
+            if options['dry_run']:
+                self.stdout.write(
+                    f'{len(drifted)} jogadores com pontuação divergente.')
+                return
+            updated = recalculate_total_scores(
+                players.filter(id__in=[player_id for player_id, _, _, _ in drifted]))
+            for event_id in {event_id for _, event_id, _, _ in drifted}:
+                invalidate_event_cache(event_id)
+                LeaderboardEntry.refresh(event_id, [player_id for player_id, player_event_id, _, _ in drifted
+                                                    if player_event_id == event_id])
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} jogadores tiveram a pontuação total corrigida!'))
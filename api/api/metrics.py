@@ -0,0 +1,162 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Optional
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from rest_framework.serializers import BaseSerializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+LABELS = ['view', 'method']
+REQUEST_LATENCY = Histogram(
+    'rrdd_request_duration_seconds', 'Latência total da requisição', LABELS)
+REQUEST_QUERIES = Histogram(
+    'rrdd_request_db_queries', 'Queries executadas por requisição', LABELS,
+    buckets=[1, 2, 3, 5, 8, 13, 20, 30, 50, 100, 200, 500, float('inf')])
+REQUEST_DB_TIME = Histogram(
+    'rrdd_request_db_duration_seconds', 'Tempo gasto em queries por requisição', LABELS)
+REQUEST_SERIALIZER_TIME = Histogram(
+    'rrdd_request_serializer_duration_seconds', 'Tempo gasto nos serializers por requisição', LABELS)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Uma view executou mais queries do que o orçamento declarado em query_budget."""
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_time: float = 0.0
+    serializer_time: float = 0.0
+    serializer_depth: int = 0
+
+
+# As métricas da requisição atual. O contexto é copiado para as threads de sync_to_async,
+# então as queries das views assíncronas também são contadas.
+current_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar('current_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Registra record_query em cada conexão aberta (uma por thread)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_serializer_timer():
+    """Mede o tempo de BaseSerializer.data, onde o DRF converte os objetos (to_representation).
+    Apenas o serializer mais externo é medido, para não contar duas vezes os aninhados.
+    """
+    data = BaseSerializer.data
+
+    def timed_data(serializer):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return data.fget(serializer)
+        metrics.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += perf_counter() - start
+
+    BaseSerializer.data = property(timed_data)
+
+
+def install():
+    connection_created.connect(install_query_recorder, dispatch_uid='metrics_query_recorder')
+    install_serializer_timer()
+
+
+def get_query_budget(view_class, method: str) -> Optional[int]:
+    """Orçamento de queries declarado na view: query_budget = {'GET': 5, ...}."""
+    return getattr(view_class, 'query_budget', {}).get(method)
+
+
+class RequestMetricsMiddleware:
+    """Registra, por view e método, a latência, o número de queries, o tempo no banco e o tempo
+    nos serializers de cada requisição, expostos em Prometheus pela view metrics.
+
+    Com QUERY_BUDGETS_ENFORCED (ativado nos testes), uma view que passa do seu query_budget
+    lança QueryBudgetExceeded; fora dos testes o excesso é apenas registrado no log.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, metrics, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, metrics, perf_counter() - start)
+        return response
+
+    def record(self, request: HttpRequest, metrics: RequestMetrics, latency: float):
+        match = request.resolver_match
+        if match is None:
+            return
+        labels = {'view': match.view_name, 'method': request.method}
+        REQUEST_LATENCY.labels(**labels).observe(latency)
+        REQUEST_QUERIES.labels(**labels).observe(metrics.queries)
+        REQUEST_DB_TIME.labels(**labels).observe(metrics.db_time)
+        REQUEST_SERIALIZER_TIME.labels(**labels).observe(metrics.serializer_time)
+
+        budget = get_query_budget(getattr(match.func, 'view_class', None), request.method)
+        if budget is not None and metrics.queries > budget:
+            message = (f'{match.view_name} {request.method} executou {metrics.queries} queries '
+                       f'(orçamento: {budget})')
+            if getattr(settings, 'QUERY_BUDGETS_ENFORCED', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Endpoint no formato de texto do Prometheus. Com METRICS_TOKEN configurado,
+    exige o header Authorization: Bearer <token>; sem ele, responde 404 com METRICS_REQUIRE_TOKEN.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and getattr(settings, 'METRICS_REQUIRE_TOKEN', False):
+        return HttpResponse(status=404)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,129 @@
+"""Microbenchmarks dos trechos algorítmicos que não dependem de HTTP.
+
+Cada benchmark é medido em tamanhos de entrada crescentes e, além do tempo de cada tamanho, é
+estimado o expoente de crescimento: a inclinação em escala log-log entre o menor e o maior tamanho
+(~1 para trechos lineares, ~2 para quadráticos). O expoente praticamente não depende da máquina e
+acusa um trecho que ficou superlinear; os tempos absolutos são comparados com a baseline salva,
+que deve ser gerada na mesma máquina (python manage.py microbenchmark --save-baseline).
+"""
+import math
+import random
+import string
+import timeit
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+import pandas as pd
+
+from .brackets import bracket_name, partition, plan_bracket_sizes
+from .ingestion import normalize_emails, normalize_names
+from .models import TOKEN_LENGTH, Token
+from .round_robin import round_robin_schedule
+from .tokens import unique_codes
+
+BASELINE_PATH = Path(__file__).with_name('microbenchmarks.json')
+DEFAULT_TOLERANCE = 0.25
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """setup recebe o tamanho da entrada e retorna a função medida, sem argumentos.
+    max_exponent é o expoente de crescimento esperado com uma folga para o ruído da medição.
+    """
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    sizes: tuple[int, ...]
+    max_exponent: float
+
+
+def setup_round_robin(n: int) -> Callable[[], object]:
+    # A versão sem o lru_cache, para medir a geração das rodadas
+    return lambda: round_robin_schedule.__wrapped__(n)
+
+
+def setup_brackets(n: int) -> Callable[[], object]:
+    """A divisão dos jogadores presentes em chaves feita por GenerateSumulas.generate_sumulas."""
+    players = list(range(n))
+
+    def generate() -> list[tuple[str, list[int]]]:
+        brackets = partition(players, plan_bracket_sizes(len(players)))
+        return [(bracket_name(i), bracket) for i, bracket in enumerate(brackets)]
+    return generate
+
+
+def random_words(rng: random.Random, n: int, words: int) -> list[str]:
+    return [' '.join(''.join(rng.choices(string.ascii_letters, k=rng.randint(2, 10))) for _ in range(words))
+            for _ in range(n)]
+
+
+def setup_normalize_names(n: int) -> Callable[[], object]:
+    names = pd.Series([f'  {name} ' for name in random_words(random.Random(n), n, 4)])
+    return lambda: normalize_names(names)
+
+
+def setup_normalize_emails(n: int) -> Callable[[], object]:
+    emails = pd.Series([f' {user.upper()}@Example.com ' for user in random_words(random.Random(n), n, 1)])
+    return lambda: normalize_emails(emails)
+
+
+def setup_generate_token(n: int) -> Callable[[], object]:
+    """Gera n códigos de token; cada código consulta o banco para garantir que é único."""
+    return lambda: [Token().generate_token() for _ in range(n)]
+
+
+def setup_unique_codes(n: int) -> Callable[[], object]:
+    """Gera n códigos de token em lote, como Token.mint, com uma única consulta ao banco."""
+    return lambda: unique_codes(Token, 'token_code', TOKEN_LENGTH, n)
+
+
+BENCHMARKS = [
+    # n jogadores formam n/2 duplas em n-1 rodadas, ordenadas a cada rodada
+    Benchmark('round_robin_schedule', setup_round_robin, (8, 32, 128, 512), max_exponent=2.5),
+    Benchmark('generate_brackets', setup_brackets, (1_000, 10_000, 100_000), max_exponent=1.3),
+    Benchmark('normalize_names', setup_normalize_names, (1_000, 10_000, 100_000), max_exponent=1.3),
+    Benchmark('normalize_emails', setup_normalize_emails, (1_000, 10_000, 100_000), max_exponent=1.3),
+    Benchmark('generate_token', setup_generate_token, (10, 100, 1_000), max_exponent=1.3),
+    Benchmark('unique_codes', setup_unique_codes, (10, 100, 1_000), max_exponent=1.3),
+]
+
+
+def measure(function: Callable[[], object], repeat: int = 5) -> float:
+    """Menor tempo por chamada, em segundos, entre repeat medições de ~0.2s cada (como o timeit)."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def growth_exponent(sizes: tuple[int, ...], times: list[float]) -> float:
+    """Inclinação em escala log-log entre o menor e o maior tamanho: tempo ~ tamanho^expoente."""
+    return math.log(times[-1] / times[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def run(benchmarks: Iterable[Benchmark] = BENCHMARKS, repeat: int = 5) -> dict:
+    """Mede os benchmarks e retorna {nome: {'times': {tamanho: segundos}, 'exponent', 'max_exponent'}}."""
+    results = {}
+    for benchmark in benchmarks:
+        times = [measure(benchmark.setup(size), repeat) for size in benchmark.sizes]
+        results[benchmark.name] = {
+            'times': {str(size): float(f'{time:.3g}') for size, time in zip(benchmark.sizes, times)},
+            'exponent': round(growth_exponent(benchmark.sizes, times), 3),
+            'max_exponent': benchmark.max_exponent,
+        }
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Retorna os problemas encontrados: expoentes acima do máximo e tempos mais de tolerance
+    (fração) acima da baseline.
+    """
+    problems = []
+    for name, result in results.items():
+        if result['exponent'] > result['max_exponent']:
+            problems.append(f"{name}: cresce como n^{result['exponent']} (máximo n^{result['max_exponent']})")
+        for size, time in result['times'].items():
+            previous = baseline.get(name, {}).get('times', {}).get(size)
+            if previous and time > previous * (1 + tolerance):
+                problems.append(f'{name}[{size}]: {time * 1e6:.1f}µs, baseline {previous * 1e6:.1f}µs '
+                                f'({(time / previous - 1) * 100:+.0f}%)')
+    return problems
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SUMULA_FIELDS = [('SumulaClassificatoria', 'sumula_classificatoria'),
+                 ('SumulaImortal', 'sumula_imortal')]
+
+
+def get_seat(pair_player, seats):
+    """Retorna o assento de um jogador salvo no JSON de rodadas (None para folga)."""
+    if not isinstance(pair_player, dict):
+        return None
+    return pair_player.get('rounds_number') or seats.get(pair_player.get('id')) or None
+
+
+def backfill_matches(apps, schema_editor):
+    """Cria as duplas (Match) a partir do JSON de rodadas salvo em cada sumula."""
+    Match = apps.get_model('api', 'Match')
+    PlayerScore = apps.get_model('api', 'PlayerScore')
+    for model_name, field in SUMULA_FIELDS:
+        Sumula = apps.get_model('api', model_name)
+        seats = dict(PlayerScore.objects.filter(
+            **{f'{field}__isnull': False}).values_list('id', 'rounds_number'))
+        matches = []
+        for sumula in Sumula.objects.exclude(rounds=None).only('id', 'rounds').iterator():
+            if not isinstance(sumula.rounds, list):
+                continue
+            for round_number, pairs in enumerate(sumula.rounds, start=1):
+                for pair in pairs or []:
+                    if not isinstance(pair, dict):
+                        continue
+                    pair_seats = sorted(seat for seat in [get_seat(pair.get('player1'), seats),
+                                                          get_seat(pair.get('player2'), seats)] if seat)
+                    if not pair_seats:
+                        continue
+                    matches.append(Match(**{f'{field}_id': sumula.id}, round_number=round_number,
+                                         seat_a=pair_seats[0], seat_b=pair_seats[1] if len(pair_seats) > 1 else None))
+        Match.objects.bulk_create(matches, batch_size=1000)
+
+
+def restore_rounds(apps, schema_editor):
+    """Reconstrói o JSON de rodadas de cada sumula a partir das duplas (Match)."""
+    Match = apps.get_model('api', 'Match')
+    PlayerScore = apps.get_model('api', 'PlayerScore')
+    for model_name, field in SUMULA_FIELDS:
+        Sumula = apps.get_model('api', model_name)
+        players = {}
+        for score in PlayerScore.objects.filter(**{f'{field}__isnull': False}).select_related('player'):
+            players[(getattr(score, f'{field}_id'), score.rounds_number)] = {
+                'id': score.id,
+                'rounds_number': score.rounds_number,
+                'player': {'id': score.player.id, 'full_name': score.player.full_name,
+                           'social_name': score.player.social_name},
+            }
+        rounds = {}
+        for match in Match.objects.filter(**{f'{field}__isnull': False}).order_by('round_number', 'seat_a'):
+            sumula_id = getattr(match, f'{field}_id')
+            sumula_rounds = rounds.setdefault(sumula_id, [])
+            while len(sumula_rounds) < match.round_number:
+                sumula_rounds.append([])
+            sumula_rounds[match.round_number - 1].append({
+                'player1': players.get((sumula_id, match.seat_a)),
+                'player2': players.get((sumula_id, match.seat_b)) if match.seat_b else None,
+            })
+        sumulas = list(Sumula.objects.filter(id__in=rounds.keys()))
+        for sumula in sumulas:
+            sumula.rounds = rounds[sumula.id]
+        Sumula.objects.bulk_update(sumulas, ['rounds'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_event_is_sumulas_generated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveSmallIntegerField()),
+                ('seat_a', models.PositiveSmallIntegerField()),
+                ('seat_b', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('sumula_classificatoria', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='api.sumulaclassificatoria')),
+                ('sumula_imortal', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='api.sumulaimortal')),
+            ],
+            options={
+                'verbose_name': 'Match',
+                'verbose_name_plural': 'Matches',
+                'ordering': ['round_number', 'seat_a'],
+                'indexes': [models.Index(fields=['sumula_classificatoria', 'round_number', 'seat_a'], name='match_classificatoria_idx'), models.Index(fields=['sumula_imortal', 'round_number', 'seat_a'], name='match_imortal_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_matches, restore_rounds),
+        migrations.RemoveField(
+            model_name='sumulaclassificatoria',
+            name='rounds',
+        ),
+        migrations.RemoveField(
+            model_name='sumulaimortal',
+            name='rounds',
+        ),
+    ]
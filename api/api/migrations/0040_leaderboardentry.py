@@ -0,0 +1,62 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import Coalesce
+
+
+def backfill_leaderboard(apps, schema_editor):
+    """Cria o ranking de cada evento a partir da pontuação atual dos jogadores."""
+    LeaderboardEntry = apps.get_model('api', 'LeaderboardEntry')
+    Player = apps.get_model('api', 'Player')
+    stats = Player.objects.order_by().annotate(
+        played=Count('scores'), best=Coalesce(Max('scores__points'), 0),
+    ).values_list('id', 'event_id', 'total_score', 'played', 'best')
+    entries_by_event = {}
+    for player_id, event_id, total_score, played, best in stats:
+        entries_by_event.setdefault(event_id, []).append(LeaderboardEntry(
+            event_id=event_id, player_id=player_id, total_score=total_score,
+            sumulas_played=played, best_score=best))
+    entries = []
+    for event_entries in entries_by_event.values():
+        event_entries.sort(key=lambda entry: (-entry.total_score, -entry.best_score,
+                                              entry.sumulas_played, entry.player_id))
+        rank, previous_key = 0, None
+        for position, entry in enumerate(event_entries, start=1):
+            key = (entry.total_score, entry.best_score, entry.sumulas_played)
+            if key != previous_key:
+                rank, previous_key = position, key
+            entry.position, entry.rank = position, rank
+        entries.extend(event_entries)
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0039_match'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveIntegerField(default=0)),
+                ('total_score', models.PositiveSmallIntegerField(default=0)),
+                ('sumulas_played', models.PositiveSmallIntegerField(default=0)),
+                ('best_score', models.PositiveSmallIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='api.event')),
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='api.player')),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard',
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['event', 'position'], name='leaderboard_position_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
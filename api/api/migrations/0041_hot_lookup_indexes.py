@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['event', 'is_imortal', 'total_score'], name='player_event_imortal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['event', 'is_present', 'is_imortal'], name='player_event_present_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerscore',
+            index=models.Index(fields=['player', 'event'], name='score_player_event_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerscore',
+            index=models.Index(condition=models.Q(('sumula_imortal__isnull', False)), fields=['player', 'sumula_imortal'], name='score_player_imortal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerscore',
+            index=models.Index(condition=models.Q(('sumula_classificatoria__isnull', False)), fields=['player', 'sumula_classificatoria'], name='score_player_classif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sumulaclassificatoria',
+            index=models.Index(condition=models.Q(('active', True)), fields=['event'], name='sumula_class_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sumulaimortal',
+            index=models.Index(condition=models.Q(('active', True)), fields=['event'], name='sumula_imortal_active_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:51
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0041_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['event', 'id'], name='player_event_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(models.F('event'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_name'), name='text_pattern_ops'), name='player_event_full_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(models.F('event'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('social_name'), name='text_pattern_ops'), name='player_event_social_name_idx'),
+        ),
+    ]
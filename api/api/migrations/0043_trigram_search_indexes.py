@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:54
+
+import api.search
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEXES = [
+    ('player', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(api.search.ImmutableUnaccent('full_name'), name='gin_trgm_ops'), name='player_full_name_trgm_idx')),
+    ('player', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(api.search.ImmutableUnaccent('social_name'), name='gin_trgm_ops'), name='player_social_name_trgm_idx')),
+    ('player', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(api.search.ImmutableUnaccent('registration_email'), name='gin_trgm_ops'), name='player_email_trgm_idx')),
+    ('staff', django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(api.search.ImmutableUnaccent('full_name'), name='gin_trgm_ops'), name='staff_full_name_trgm_idx')),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    # Servidores sem os módulos contrib (pg_trgm e unaccent) seguem sem a busca
+    if not api.search.trigram_available(schema_editor.connection):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() é STABLE e não pode ser usada em índices; a função fixa o dicionário e é IMMUTABLE
+    schema_editor.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS
+        $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.add_index(apps.get_model('api', model_name), index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if not api.search.trigram_available(schema_editor.connection):
+        return
+    for model_name, index in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index.name}')
+    schema_editor.execute('DROP FUNCTION IF EXISTS immutable_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0042_player_keyset_and_name_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name=model_name, index=index)
+                              for model_name, index in SEARCH_INDEXES],
+            database_operations=[migrations.RunPython(create_search_indexes, drop_search_indexes)],
+        ),
+    ]
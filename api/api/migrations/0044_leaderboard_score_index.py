@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0043_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['event', 'total_score'], name='leaderboard_score_idx'),
+        ),
+    ]
@@ -1,15 +1,20 @@
-import random
+from typing import Iterable, Optional
 from django.db.models import UniqueConstraint
 from django.db import IntegrityError, models
 from django.db import transaction
 from django.forms import ValidationError
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_delete
-from django.db.models import Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.db.models import Count, F, Max, Q, Value, Window
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Coalesce, Greatest, Rank, RowNumber, Upper
 from users.models import User
-import string
-import secrets
+from api.cache import invalidate_event_cache
+from api.live import broker, publish_event_update
+from api.search import ImmutableUnaccent
+from api.tokens import unique_codes
 TOKEN_LENGTH = 9
+TOKEN_MINT_BATCH_SIZE = 1000
 
 
 class Token (models.Model):
@@ -44,16 +49,7 @@ class Token (models.Model):
 
     def generate_token(self) -> str:
         """Gera um token aleatório de TOKEN_LENGTH caracteres."""
-        alphabet = string.ascii_uppercase
-        while True:
-            letters = ''.join(secrets.choice(alphabet)
-                              for i in range(TOKEN_LENGTH - 2))
-            numbers = ''.join(secrets.choice(string.digits)
-                              for i in range(2))
-            self.token_code = ''.join(random.sample(
-                letters + numbers, len(letters + numbers)))
-            if not Token.objects.filter(token_code=self.token_code).exists():
-                break
+        self.token_code = unique_codes(Token, 'token_code', TOKEN_LENGTH, 1)[0]
 
     def save(self, *args, **kwargs) -> None:
         """Sobrescreve o método save para gerar um token caso não exista."""
@@ -61,6 +57,23 @@ class Token (models.Model):
             self.generate_token()
         super(Token, self).save(*args, **kwargs)
 
+    @staticmethod
+    def mint(count: int, batch_size: int = TOKEN_MINT_BATCH_SIZE) -> list['Token']:
+        """Cria count tokens em lotes de batch_size.
+        Os códigos de cada lote são verificados com uma única query e inseridos com bulk_create.
+        Se outro processo criar um dos códigos entre a verificação e a inserção, o índice único
+        recusa o lote, que é gerado novamente.
+        """
+        tokens: list[Token] = []
+        while len(tokens) < count:
+            codes = unique_codes(Token, 'token_code', TOKEN_LENGTH, min(batch_size, count - len(tokens)))
+            try:
+                with transaction.atomic():
+                    tokens += Token.objects.bulk_create([Token(token_code=code) for code in codes])
+            except IntegrityError:
+                continue
+        return tokens
+
 
 class Event (models.Model):
     """Modelo de Evento. Um evento esta associado a um token de uso unico e possui multiplas models Sumula associadas.
@@ -110,16 +123,7 @@ class Event (models.Model):
 
     def generate_token(self) -> str:
         """Gera um token aleatório de TOKEN_LENGTH caracteres."""
-        alphabet = string.ascii_uppercase
-        while True:
-            letters = ''.join(secrets.choice(alphabet)
-                              for i in range(TOKEN_LENGTH - 2))
-            numbers = ''.join(secrets.choice(string.digits)
-                              for i in range(2))
-            self.join_token = ''.join(random.sample(
-                letters + numbers, len(letters + numbers)))
-            if not Event.objects.filter(join_token=self.join_token).exists():
-                break
+        self.join_token = unique_codes(Event, 'join_token', TOKEN_LENGTH, 1)[0]
 
     def is_active(self) -> bool:
         """Retorna se o evento está ativo ou não."""
@@ -160,6 +164,11 @@ class Staff(models.Model):
             UniqueConstraint(fields=['user', 'event'],
                              name='unique_user_event')
         ]
+        # Busca por trigramas sem acentos (api.search.trigram_search)
+        indexes = [
+            GinIndex(OpClass(ImmutableUnaccent('full_name'), name='gin_trgm_ops'),
+                     name='staff_full_name_trgm_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.full_name}'
@@ -172,7 +181,7 @@ class Sumula (models.Model):
     - name: CharField com o nome da sumula
     - active: BooleanField
     - description: TextField
-    - rounds: JSONField
+    As rodadas da sumula são salvas no modelo Match.
     """
     referee = models.ManyToManyField(Staff, blank=True)
     event = models.ForeignKey(
@@ -181,13 +190,17 @@ class Sumula (models.Model):
     active = models.BooleanField(default=True)
     description = models.TextField(
         default='', blank=True, null=True, max_length=256)
-    rounds = models.JSONField(default=dict, blank=True, null=True)
 
     class Meta:
         abstract = True
         verbose_name = ("Sumula")
         verbose_name_plural = ("Sumulas")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Estado salvo no banco, usado para identificar o encerramento da sumula (None se o campo foi adiado)
+        self._loaded_active = self.__dict__.get('active')
+
     def __str__(self):
         return self.name
 
@@ -206,6 +219,11 @@ class SumulaImortal(Sumula):
     class Meta:
         verbose_name = ("Sumula Imortal")
         verbose_name_plural = ("Sumulas Imortais")
+        indexes = [
+            # Apenas as sumulas em andamento, lidas a todo momento durante o evento
+            models.Index(fields=['event'], condition=Q(active=True),
+                         name='sumula_imortal_active_idx'),
+        ]
 
     def _set_name(self):
         with transaction.atomic():
@@ -237,6 +255,10 @@ class SumulaClassificatoria(Sumula):
     class Meta:
         verbose_name = ("Sumula Classificatoria")
         verbose_name_plural = ("Sumulas Classificatoria")
+        indexes = [
+            models.Index(fields=['event'], condition=Q(active=True),
+                         name='sumula_class_active_idx'),
+        ]
 
 
 class Player(models.Model):
@@ -275,23 +297,53 @@ class Player(models.Model):
             UniqueConstraint(fields=['user', 'event'],
                              name='unique_user_event_player')
         ]
+        # A busca por (event, user) usa o índice da restrição unique_user_event_player
+        indexes = [
+            models.Index(fields=['event', 'is_imortal', 'total_score'],
+                         name='player_event_imortal_idx'),
+            models.Index(fields=['event', 'is_present', 'is_imortal'],
+                         name='player_event_present_idx'),
+            # Paginação por id e busca pelo início do nome (istartswith) dentro do evento
+            models.Index(fields=['event', 'id'], name='player_event_keyset_idx'),
+            models.Index(F('event'), OpClass(Upper('full_name'), name='text_pattern_ops'),
+                         name='player_event_full_name_idx'),
+            models.Index(F('event'), OpClass(Upper('social_name'), name='text_pattern_ops'),
+                         name='player_event_social_name_idx'),
+            # Busca por trigramas sem acentos (api.search.trigram_search)
+            GinIndex(OpClass(ImmutableUnaccent('full_name'), name='gin_trgm_ops'),
+                     name='player_full_name_trgm_idx'),
+            GinIndex(OpClass(ImmutableUnaccent('social_name'), name='gin_trgm_ops'),
+                     name='player_social_name_trgm_idx'),
+            GinIndex(OpClass(ImmutableUnaccent('registration_email'), name='gin_trgm_ops'),
+                     name='player_email_trgm_idx'),
+        ]
 
     # Atualiza a pontuação total após salvar uma instância de PlayerScore
     @receiver(post_save, sender='api.PlayerScore')
-    def update_player_total_score_on_save(sender, instance, **kwargs):
-        if instance.player and instance.player.event == instance.event:
-            instance.player.total_score = PlayerScore.objects.filter(
-                player=instance.player, event=instance.event).aggregate(Sum('points'))['points__sum'] or 0
-            instance.player.save()
+    def update_player_total_score_on_save(sender, instance, created, **kwargs):
+        previous_points = 0 if created else instance._loaded_points
+        instance._loaded_points = instance.points
+        if instance.player_id and instance.player.event_id == instance.event_id:
+            Player.add_to_total_score(
+                instance.player, instance.points - previous_points)
 
     # Atualiza a pontuação total após deletar uma instância de PlayerScore
     @receiver(pre_delete, sender='api.PlayerScore')
     def update_player_total_score_on_delete(sender, instance, **kwargs):
-        if instance.player and instance.player.event == instance.event:
-            instance.player.total_score -= instance.points
-            if instance.player.total_score < 0:
-                instance.player.total_score = 0
-            instance.player.save()
+        if instance.player_id and instance.player.event_id == instance.event_id:
+            Player.add_to_total_score(
+                instance.player, -instance._loaded_points)
+
+    @staticmethod
+    def add_to_total_score(player: 'Player', delta: int) -> None:
+        """Soma delta à pontuação total do jogador, nunca ficando abaixo de zero.
+        Atualiza apenas a coluna total_score no banco com uma expressão F().
+        """
+        if not delta:
+            return
+        Player.objects.filter(pk=player.pk).update(
+            total_score=Greatest(F('total_score') + delta, Value(0)))
+        player.total_score = max(player.total_score + delta, 0)
 
     def __str__(self) -> str:
         return self.full_name
@@ -323,6 +375,19 @@ class PlayerScore(models.Model):
     class Meta:
         verbose_name = ("PlayerScore")
         verbose_name_plural = ("PlayerScores")
+        indexes = [
+            models.Index(fields=['player', 'event'],
+                         name='score_player_event_idx'),
+            models.Index(fields=['player', 'sumula_imortal'], condition=Q(sumula_imortal__isnull=False),
+                         name='score_player_imortal_idx'),
+            models.Index(fields=['player', 'sumula_classificatoria'], condition=Q(sumula_classificatoria__isnull=False),
+                         name='score_player_classif_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pontuação salva no banco, usada para calcular a variação de total_score
+        self._loaded_points = self.points if self.pk else 0
 
     def __str__(self):
         return f'{self.player} - {self.points}'
@@ -371,6 +436,39 @@ class PlayerScore(models.Model):
     #         super(PlayerScore, self).delete(*args, **kwargs)
 
 
+class Match(models.Model):
+    """ Modelo de uma dupla de uma rodada de sumula.
+    Os jogadores são identificados pelo número do assento na sumula (PlayerScore.rounds_number).
+    fields:
+    - sumula_classificatoria: ForeignKey para SumulaClassificatoria
+    - sumula_imortal: ForeignKey para SumulaImortal
+    - round_number: número da rodada, a partir de 1
+    - seat_a: assento do primeiro jogador da dupla
+    - seat_b: assento do segundo jogador da dupla (None quando o primeiro jogador folga na rodada)
+    """
+    sumula_classificatoria = models.ForeignKey(
+        SumulaClassificatoria, on_delete=models.CASCADE, related_name='matches', null=True, blank=True, default=None)
+    sumula_imortal = models.ForeignKey(
+        SumulaImortal, on_delete=models.CASCADE, related_name='matches', null=True, blank=True, default=None)
+    round_number = models.PositiveSmallIntegerField()
+    seat_a = models.PositiveSmallIntegerField()
+    seat_b = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = ("Match")
+        verbose_name_plural = ("Matches")
+        ordering = ['round_number', 'seat_a']
+        indexes = [
+            models.Index(fields=['sumula_classificatoria', 'round_number', 'seat_a'],
+                         name='match_classificatoria_idx'),
+            models.Index(fields=['sumula_imortal', 'round_number', 'seat_a'],
+                         name='match_imortal_idx'),
+        ]
+
+    def __str__(self):
+        return f'Rodada {self.round_number}: {self.seat_a} x {self.seat_b}'
+
+
 class Results(models.Model):
     """ Modelo para salvar resultados de um evento.
     fields:
@@ -398,10 +496,249 @@ class Results(models.Model):
         verbose_name_plural = ("Results")
 
     def calculate_imortals(self):
-        """Calcula os imortais do evento."""
-        self.imortals.clear()
-        players = Player.objects.filter(
-            event=self.event, is_imortal=True).order_by('-total_score')[:3]
-        for player in players:
-            self.imortals.add(player)
+        """Calcula os imortais do evento: os 3 jogadores imortais mais bem colocados no ranking.
+        Os imortais só são regravados quando mudam, para não invalidar o cache do evento a cada leitura.
+        """
+        players = list(LeaderboardEntry.objects.filter(
+            event=self.event, player__is_imortal=True).values_list('player_id', flat=True)[:3])
+        if set(players) == set(self.imortals.values_list('id', flat=True)):
+            return
+        self.imortals.set(players, clear=True)
         self.save()
+
+
+class LeaderboardEntry(models.Model):
+    """ Posição de um jogador no ranking do evento (tabela desnormalizada).
+    As linhas são atualizadas a cada alteração de PlayerScore e Player, por isso a leitura
+    de uma página do ranking é uma busca pelo índice (event, position).
+    fields:
+    - event: ForeignKey para Event
+    - player: OneToOneField para Player
+    - position: posição única no ranking, a partir de 1
+    - rank: colocação no ranking, igual para jogadores empatados em todos os critérios
+    - total_score: pontuação total do jogador
+    - sumulas_played: número de sumulas em que o jogador tem pontuação
+    - best_score: maior pontuação do jogador em uma sumula
+    Critérios de ordenação: total_score, best_score (maior primeiro) e sumulas_played (menor primeiro).
+    """
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='leaderboard')
+    player = models.OneToOneField(
+        Player, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    position = models.PositiveIntegerField(default=0)
+    rank = models.PositiveIntegerField(default=0)
+    total_score = models.PositiveSmallIntegerField(default=0)
+    sumulas_played = models.PositiveSmallIntegerField(default=0)
+    best_score = models.PositiveSmallIntegerField(default=0)
+
+    ORDERING = [F('total_score').desc(), F('best_score').desc(),
+                F('sumulas_played').asc()]
+
+    class Meta:
+        verbose_name = ("Leaderboard Entry")
+        verbose_name_plural = ("Leaderboard")
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['event', 'position'],
+                         name='leaderboard_position_idx'),
+            # Reordenação parcial por faixa de pontuação (LeaderboardEntry.rank_event)
+            models.Index(fields=['event', 'total_score'],
+                         name='leaderboard_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.rank}º {self.player}'
+
+    @staticmethod
+    def refresh(event_id: int, player_ids: Optional[Iterable[int]] = None) -> None:
+        """Atualiza as linhas dos jogadores fornecidos (por padrão, todos os do evento) com um único
+        upsert e reordena o ranking do evento.
+        Com player_ids, apenas as linhas com total_score entre a menor e a maior pontuação (anterior
+        ou nova) dos jogadores são reordenadas; as demais não mudam de colocação.
+        A reordenação regrava linhas de outros jogadores do evento, então duas atualizações simultâneas
+        do mesmo evento se bloqueariam (deadlock); a linha do evento é travada para executá-las em fila.
+        """
+        with transaction.atomic():
+            Event.objects.select_for_update(no_key=True).filter(id=event_id).exists()
+            players = Player.objects.filter(event_id=event_id)
+            previous_scores = {}
+            if player_ids is not None:
+                player_ids = list(player_ids)
+                players = players.filter(id__in=player_ids)
+                previous_scores = dict(LeaderboardEntry.objects.filter(
+                    player_id__in=player_ids).values_list('player_id', 'total_score'))
+            stats = list(players.order_by().annotate(
+                played=Count('scores'),
+                best=Coalesce(Max('scores__points'), 0),
+            ).values_list('id', 'total_score', 'played', 'best'))
+            LeaderboardEntry.objects.bulk_create(
+                [LeaderboardEntry(event_id=event_id, player_id=player_id, total_score=total_score,
+                                  sumulas_played=played, best_score=best)
+                 for player_id, total_score, played, best in stats],
+                update_conflicts=True,
+                unique_fields=['player'],
+                update_fields=['total_score', 'sumulas_played', 'best_score'])
+            if player_ids is None:
+                LeaderboardEntry.rank_event(event_id)
+            elif stats:
+                scores = [total_score for _, total_score, _, _ in stats] + list(previous_scores.values())
+                # Uma linha nova desloca todas as linhas abaixo dela
+                if len(previous_scores) < len(stats):
+                    scores.append(0)
+                LeaderboardEntry.rank_event(event_id, (min(scores), max(scores)))
+        # O upsert e o bulk_update não disparam post_save
+        invalidate_event_cache(event_id)
+
+    @staticmethod
+    def append(player: Player) -> None:
+        """Cria a linha de um jogador recém-criado, ainda sem pontuação, sem travar o evento nem reordenar.
+        Ele empata com os demais jogadores sem pontos e fica depois deles (maior id), então a linha entra
+        na última posição. Se já há jogadores que jogaram sumulas sem marcar pontos (que ficam abaixo dele),
+        o ranking é atualizado com refresh. Duas entradas simultâneas podem receber a mesma posição até a
+        próxima reordenação, que corrige a faixa de pontuação 0.
+        """
+        counts = LeaderboardEntry.objects.filter(event_id=player.event_id).aggregate(
+            entries=Count('id'),
+            above=Count('id', filter=Q(total_score__gt=0)),
+            below=Count('id', filter=Q(total_score=0, sumulas_played__gt=0)),
+        )
+        if player.total_score or counts['below']:
+            LeaderboardEntry.refresh(player.event_id, [player.id])
+            return
+        LeaderboardEntry.objects.create(event_id=player.event_id, player_id=player.id,
+                                        position=counts['entries'] + 1, rank=counts['above'] + 1)
+
+    @staticmethod
+    def rank_event(event_id: int, score_range: Optional[tuple[int, int]] = None) -> int:
+        """Recalcula position e rank do evento com funções de janela no banco.
+        Com score_range = (menor, maior), apenas as linhas com total_score no intervalo são ordenadas,
+        deslocadas pelo número de linhas acima do intervalo.
+        Apenas as linhas cuja colocação mudou são carregadas e regravadas.
+        Retorna o número de linhas atualizadas.
+        """
+        entries = LeaderboardEntry.objects.filter(event_id=event_id)
+        offset = 0
+        if score_range is not None:
+            offset = entries.filter(total_score__gt=score_range[1]).count()
+            entries = entries.filter(total_score__range=score_range)
+        entries = entries.annotate(
+            new_position=Window(RowNumber(), order_by=[
+                *LeaderboardEntry.ORDERING, F('player_id').asc()]) + offset,
+            new_rank=Window(Rank(), order_by=LeaderboardEntry.ORDERING) + offset,
+        ).order_by().only('id', 'position', 'rank')
+        changed = list(entries.exclude(position=F('new_position'), rank=F('new_rank')))
+        for entry in changed:
+            entry.position = entry.new_position
+            entry.rank = entry.new_rank
+        LeaderboardEntry.objects.bulk_update(changed, ['position', 'rank'])
+        return len(changed)
+
+
+# Modelos cujas alterações mudam as leituras de resultados e sumulas guardadas em cache
+EVENT_CACHE_SENDERS = [Event, Staff, Player, PlayerScore,
+                       SumulaImortal, SumulaClassificatoria, Results]
+EVENT_CACHE_M2M_SENDERS = [SumulaImortal.referee.through, SumulaClassificatoria.referee.through,
+                           Results.imortals.through, Results.top4.through]
+
+
+def invalidate_event_cache_on_change(sender, instance, **kwargs):
+    """Invalida o cache do evento ao qual a instância alterada pertence."""
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    event_id = instance.pk if isinstance(instance, Event) else instance.event_id
+    invalidate_event_cache(event_id)
+
+
+for model in EVENT_CACHE_SENDERS:
+    post_save.connect(invalidate_event_cache_on_change, sender=model,
+                      dispatch_uid=f'event_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_event_cache_on_change, sender=model,
+                        dispatch_uid=f'event_cache_delete_{model.__name__}')
+for through in EVENT_CACHE_M2M_SENDERS:
+    m2m_changed.connect(invalidate_event_cache_on_change, sender=through,
+                        dispatch_uid=f'event_cache_m2m_{through.__name__}')
+
+
+def sumula_live_data(sumula: SumulaImortal | SumulaClassificatoria, with_scores: bool = True) -> dict:
+    """Dados de uma sumula enviados para as conexões SSE do evento."""
+    data = {
+        'id': sumula.id,
+        'kind': 'imortal' if isinstance(sumula, SumulaImortal) else 'classificatoria',
+        'name': sumula.name,
+        'active': sumula.active,
+    }
+    if with_scores:
+        data['players_score'] = list(sumula.scores.values(
+            'id', 'player_id', 'points', 'rounds_number'))
+    return data
+
+
+def publish_sumula_on_save(sender, instance, created, **kwargs):
+    """Publica a criação, o encerramento ou a edição de uma sumula, com as pontuações salvas."""
+    loaded_active = instance._loaded_active
+    instance._loaded_active = instance.active
+    if not broker.has_subscribers(instance.event_id):
+        return
+    if created:
+        publish_event_update(instance.event_id, 'sumula_created',
+                             sumula_live_data(instance, with_scores=False))
+    elif loaded_active and not instance.active:
+        publish_event_update(instance.event_id, 'sumula_closed',
+                             sumula_live_data(instance))
+    else:
+        publish_event_update(instance.event_id, 'sumula_updated',
+                             sumula_live_data(instance))
+
+
+def publish_sumula_on_delete(sender, instance, **kwargs):
+    publish_event_update(instance.event_id, 'sumula_deleted',
+                         sumula_live_data(instance, with_scores=False))
+
+
+for model in [SumulaImortal, SumulaClassificatoria]:
+    post_save.connect(publish_sumula_on_save, sender=model,
+                      dispatch_uid=f'live_save_{model.__name__}')
+    post_delete.connect(publish_sumula_on_delete, sender=model,
+                        dispatch_uid=f'live_delete_{model.__name__}')
+
+
+def deleted_from(origin, *senders: type[models.Model]) -> bool:
+    """Verifica se a deleção começou em uma instância ou queryset de um dos modelos."""
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return issubclass(model, senders)
+
+
+def refresh_leaderboard_on_score_save(sender, instance, **kwargs):
+    """Atualiza a linha do jogador no ranking quando uma pontuação é salva."""
+    LeaderboardEntry.refresh(instance.event_id, [instance.player_id])
+
+
+def refresh_leaderboard_on_score_delete(sender, instance, origin, **kwargs):
+    """Atualiza a linha do jogador quando a pontuação ou a sumula é deletada.
+    Nas deleções em cascata do jogador ou do evento a linha não deve ser recriada.
+    """
+    if deleted_from(origin, PlayerScore, Sumula):
+        LeaderboardEntry.refresh(instance.event_id, [instance.player_id])
+
+
+def add_player_to_leaderboard(sender, instance, created, **kwargs):
+    """Cria a linha do jogador no ranking. As mudanças de total_score não passam por Player.save()
+    (são feitas com update()) e já atualizam o ranking onde acontecem.
+    """
+    if created:
+        LeaderboardEntry.append(instance)
+
+
+def rank_leaderboard_on_player_delete(sender, instance, origin, **kwargs):
+    if not deleted_from(origin, Event, Token):
+        LeaderboardEntry.rank_event(instance.event_id)
+
+
+post_save.connect(refresh_leaderboard_on_score_save, sender=PlayerScore,
+                  dispatch_uid='leaderboard_score_save')
+post_delete.connect(refresh_leaderboard_on_score_delete, sender=PlayerScore,
+                    dispatch_uid='leaderboard_score_delete')
+post_save.connect(add_player_to_leaderboard, sender=Player,
+                  dispatch_uid='leaderboard_player_save')
+post_delete.connect(rank_leaderboard_on_player_delete, sender=Player,
+                    dispatch_uid='leaderboard_player_delete')
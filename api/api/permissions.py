@@ -1,6 +1,8 @@
-from guardian.shortcuts import assign_perm
+from guardian.models import UserObjectPermission
 from django.contrib.auth.models import Permission, Group
 from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
 from typing import Type
 from django.db.models import Model
 from django.db.models import Q
@@ -9,31 +11,66 @@ from users.models import User
 from typing import Optional
 from django.db.models import QuerySet
 
+# Filtros (inclusão, exclusão) sobre os codenames das permissões de Event de cada grupo
+GROUP_PERMISSIONS_FILTERS = {
+    "event_admin": (Q(codename__icontains='change') | Q(codename__icontains='delete') | Q(codename__icontains='view') | Q(codename__icontains='add'), Q(codename__icontains='add_event')),
+    "staff_manager": (Q(codename__icontains='view_event') | Q(codename__icontains='sumula') | Q(codename__icontains='player'), Q(codename__icontains='delete_player')),
+    "staff_member": (Q(codename__icontains='view') | Q(codename__icontains='change'), Q(codename__icontains='change_event')),
+    "player": (Q(codename__icontains='view'), None),
+}
+
+# Ids das permissões de cada grupo, calculados uma única vez por processo
+_group_permission_ids: dict[str, tuple[int, ...]] = {}
+
 
 def assign_permissions(user: User, group: Group, event: Event) -> None:
     """ Atribui permissões ao usuário em nível de objeto de acordo com o grupo fornecido.
+    Todas as permissões do grupo são gravadas com um único bulk insert em UserObjectPermission.
+    Permissões que o usuário já possui no evento são ignoradas.
     Args:
         user (User): Usuário ao qual as permissões serão atribuídas
         group (Group): Grupo do usuário
         event (Event): Evento ao qual as permissões serão atribuídas
     """
-    permissions = filter_permissions(group)
-    for permission in permissions:
-        assign_perm(permission, user, event)
+    permission_ids = get_group_permission_ids(group.name)
+    if not permission_ids:
+        return
+    content_type = get_content_type(Event)
+    UserObjectPermission.objects.bulk_create([
+        UserObjectPermission(user=user, permission_id=permission_id,
+                             content_type=content_type, object_pk=str(event.pk))
+        for permission_id in permission_ids
+    ], ignore_conflicts=True)
+
+
+def get_group_permission_ids(group_name: str) -> Optional[tuple[int, ...]]:
+    """Retorna os ids das permissões de Event do grupo, consultando o banco apenas na primeira chamada."""
+    if group_name not in GROUP_PERMISSIONS_FILTERS:
+        return None
+    if group_name not in _group_permission_ids:
+        _group_permission_ids[group_name] = tuple(
+            filter_permissions_by_name(group_name).values_list('id', flat=True))
+    return _group_permission_ids[group_name]
+
+
+@receiver(post_migrate)
+def clear_permissions_cache(**kwargs) -> None:
+    """As permissões são recriadas após as migrações, então os ids em cache são descartados."""
+    _group_permission_ids.clear()
 
 
 def filter_permissions(group: Group) -> Optional[QuerySet[Permission]]:
-    content_type = get_content_type(Event)
-    permissions = get_permissions(content_type)
-
-    group_permissions = {
-        "event_admin": permissions.filter(Q(codename__icontains='change') | Q(codename__icontains='delete') | Q(codename__icontains='view') | Q(codename__icontains='add')).exclude(codename__icontains='add_event'),
-        "staff_manager": permissions.filter(Q(codename__icontains='view_event') | Q(codename__icontains='sumula') | Q(codename__icontains='player')).exclude(codename__icontains='delete_player'),
-        "staff_member": permissions.filter(Q(codename__icontains='view') | Q(codename__icontains='change')).exclude(codename__icontains='change_event'),
-        "player": permissions.filter(Q(codename__icontains='view')),
-    }
-    if group.name in group_permissions:
-        return group_permissions[group.name]
+    return filter_permissions_by_name(group.name)
+
+
+def filter_permissions_by_name(group_name: str) -> Optional[QuerySet[Permission]]:
+    if group_name not in GROUP_PERMISSIONS_FILTERS:
+        return None
+    include, exclude = GROUP_PERMISSIONS_FILTERS[group_name]
+    permissions = get_permissions(get_content_type(Event)).filter(include)
+    if exclude is not None:
+        permissions = permissions.exclude(exclude)
+    return permissions
 
 
 def get_content_type(model: Type[Model]) -> ContentType:
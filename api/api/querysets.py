@@ -0,0 +1,16 @@
+from django.db.models import QuerySet
+
+
+def with_sumula_relations(queryset: QuerySet, prefix: str = '') -> QuerySet:
+    """Adiciona ao queryset o prefetch das pontuações (já com os jogadores), das duplas e dos árbitros das sumulas.
+
+    Com isso, as sumulas são serializadas com um número fixo de queries, independente da quantidade
+    de sumulas e de jogadores. prefix é o caminho até a sumula quando o queryset não é de sumulas.
+    Ex: with_sumula_relations(PlayerScore.objects.all(), prefix='sumula_imortal__')
+    Os jogadores são buscados pela chave primária em uma query separada: um JOIN com a tabela de
+    jogadores faz o PostgreSQL percorrer a tabela inteira em eventos grandes.
+    """
+    return queryset.prefetch_related(
+        f'{prefix}scores__player',
+        f'{prefix}matches',
+        f'{prefix}referee')
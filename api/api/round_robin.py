@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Optional
+
+Pair = tuple[int, Optional[int]]
+Schedule = tuple[tuple[Pair, ...], ...]
+
+
+@lru_cache(maxsize=None)
+def round_robin_schedule(n: int) -> Schedule:
+    """Gera as rodadas de um torneio todos contra todos para n jogadores pelo método do círculo.
+
+    Os jogadores são identificados pelo número do assento (1..n). Cada rodada é uma tupla de pares
+    (assento_a, assento_b), com assento_a < assento_b. Para n ímpar, um jogador folga a cada
+    rodada e é retornado no par (assento, None).
+    O resultado é memorizado por n.
+    """
+    if n < 2:
+        raise ValueError("Número de jogadores insuficiente para formar duplas!")
+
+    seats: list[Optional[int]] = list(range(1, n + 1))
+    if n % 2 != 0:
+        seats.append(None)
+    size = len(seats)
+
+    rounds = []
+    for _ in range(size - 1):
+        pairs = []
+        for i in range(size // 2):
+            pairs.append(_normalize_pair(seats[i], seats[size - 1 - i]))
+        rounds.append(tuple(sorted(pairs, key=lambda pair: pair[0])))
+        # O primeiro assento fica fixo e os demais giram uma posição
+        seats = [seats[0], seats[-1]] + seats[1:-1]
+    return tuple(rounds)
+
+
+def _normalize_pair(a: Optional[int], b: Optional[int]) -> Pair:
+    """Ordena o par colocando a folga (None) sempre na segunda posição."""
+    if a is None:
+        return b, None
+    if b is None:
+        return a, None
+    return (a, b) if a < b else (b, a)
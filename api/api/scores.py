@@ -0,0 +1,26 @@
+from django.db.models import IntegerField, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .models import Player, PlayerScore
+
+
+def total_score_subquery() -> Coalesce:
+    """Expressão com a soma dos pontos de um jogador (OuterRef) no seu evento."""
+    points = PlayerScore.objects.filter(
+        player=OuterRef('pk'), event=OuterRef('event')
+    ).order_by().values('player').annotate(total=Sum('points')).values('total')
+    return Coalesce(Subquery(points, output_field=IntegerField()), 0)
+
+
+def drifted_players(players: QuerySet[Player]) -> QuerySet[Player]:
+    """Retorna os jogadores cuja pontuação total difere da soma de seus PlayerScores.
+    Cada jogador é anotado com expected_total_score.
+    """
+    return players.annotate(expected_total_score=total_score_subquery()).exclude(
+        total_score=total_score_subquery())
+
+
+def recalculate_total_scores(players: QuerySet[Player]) -> int:
+    """Recalcula a pontuação total dos jogadores com um único UPDATE.
+    Retorna o número de jogadores atualizados.
+    """
+    return players.update(total_score=total_score_subquery())
@@ -0,0 +1,97 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import FloatField, Func, Q, QuerySet, TextField, Value
+from django.db.models.functions import Greatest
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+
+# Resultado de trigram_installed por banco (alias): só muda com uma migração
+_trigram_installed: dict[str, bool] = {}
+
+
+def trigram_available(connection) -> bool:
+    """Indica se o servidor PostgreSQL oferece as extensões pg_trgm e unaccent usadas na busca."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_available_extensions WHERE name IN ('pg_trgm', 'unaccent')")
+        return cursor.fetchone()[0] == 2
+
+
+def trigram_installed(connection) -> bool:
+    """Indica se a migração 0043 criou a busca por trigramas no banco (pg_trgm e immutable_unaccent).
+    A migração não a cria quando trigram_available é falso.
+    """
+    if connection.alias not in _trigram_installed:
+        installed = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT to_regprocedure('immutable_unaccent(text)') IS NOT NULL "
+                    "AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+                installed = cursor.fetchone()[0]
+        _trigram_installed[connection.alias] = installed
+    return _trigram_installed[connection.alias]
+
+
+class ImmutableUnaccent(Func):
+    """Remove os acentos do texto com a função immutable_unaccent criada na migração 0043.
+
+    unaccent() não pode ser usada em índices por não ser IMMUTABLE. A função da migração
+    apenas a declara como IMMUTABLE, e as buscas devem usar a mesma expressão dos índices.
+    """
+    function = 'immutable_unaccent'
+    output_field = TextField()
+
+
+def trigram_search(queryset: QuerySet, fields: list[str], query: str) -> QuerySet:
+    """Busca por similaridade de trigramas (pg_trgm), sem diferenciar acentos e maiúsculas.
+
+    Cada campo é comparado com o operador %> (word_similarity), atendido pelos índices GIN
+    gin_trgm_ops sobre immutable_unaccent(campo). O resultado é anotado com similarity, a maior
+    similaridade entre os campos, e ordenado por ela.
+    """
+    search = ImmutableUnaccent(Value(query))
+    similarities = [TrigramWordSimilarity(search, ImmutableUnaccent(field)) for field in fields]
+    matches = [TrigramWordSimilar(ImmutableUnaccent(field), search) for field in fields]
+    return queryset.filter(reduce(or_, matches)).annotate(
+        similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0],
+    ).order_by('-similarity', 'id')
+
+
+def contains_search(queryset: QuerySet, fields: list[str], query: str) -> QuerySet:
+    """Busca pelos campos que contêm query, sem diferenciar maiúsculas (mas sim acentos).
+    Usada quando o banco não tem a busca por trigramas; similarity é nula e a ordem é pelo id.
+    """
+    matches = [Q(**{f'{field}__icontains': query}) for field in fields]
+    return queryset.filter(reduce(or_, matches)).annotate(
+        similarity=Value(None, output_field=FloatField()),
+    ).order_by('id')
+
+
+def search(queryset: QuerySet, fields: list[str], query: str) -> QuerySet:
+    """Busca com trigram_search quando o banco a oferece e, senão, com contains_search."""
+    if trigram_installed(connections[queryset.db]):
+        return trigram_search(queryset, fields, query)
+    return contains_search(queryset, fields, query)
+
+
+def parse_search_params(params) -> tuple[str, int]:
+    """Lê os parâmetros q e limit de uma busca. Lança ValueError se forem inválidos."""
+    query = params.get('q', '').strip()
+    if len(query) < SEARCH_MIN_LENGTH:
+        raise ValueError(f'q deve ter pelo menos {SEARCH_MIN_LENGTH} caracteres.')
+    try:
+        limit = int(params.get('limit', SEARCH_LIMIT))
+    except ValueError:
+        raise ValueError('limit deve ser um número inteiro.')
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise ValueError(f'limit deve estar entre 1 e {SEARCH_MAX_LIMIT}.')
+    return query, limit
@@ -1,6 +1,6 @@
 from rest_framework.serializers import ModelSerializer
 from rest_framework import serializers
-from api.models import SumulaClassificatoria, Token, Event, Sumula, PlayerScore, Player, Staff, SumulaImortal, Results
+from api.models import SumulaClassificatoria, Token, Event, Sumula, PlayerScore, Player, Staff, SumulaImortal, Results, LeaderboardEntry
 from users.models import User
 
 
@@ -28,6 +28,14 @@ class PlayerSerializer(ModelSerializer):
         fields = ['id', 'full_name', 'social_name', 'is_imortal', 'is_present']
 
 
+class PlayerSearchSerializer(ModelSerializer):
+    similarity = serializers.FloatField()
+
+    class Meta:
+        model = Player
+        fields = PlayerSerializer.Meta.fields + ['registration_email', 'similarity']
+
+
 class PlayerForRoundRobinSerializer(ModelSerializer):
     class Meta:
         model = Player
@@ -89,13 +97,42 @@ class StaffSerializer(ModelSerializer):
         fields = ['id', 'full_name', 'registration_email', 'is_manager']
 
 
-class SumulaClassificatoriaSerializer(ModelSerializer):
+class StaffSearchSerializer(ModelSerializer):
+    similarity = serializers.FloatField()
+
+    class Meta:
+        model = Staff
+        fields = StaffSerializer.Meta.fields + ['similarity']
+
+
+class RoundsSerializerMixin:
+    """Monta as rodadas da sumula a partir das duplas (Match) e das pontuações dos jogadores.
+    Cada dupla é um dicionário com 'player1' e 'player2', no formato de PlayerScoreForRoundRobinSerializer.
+    Usa matches e scores já carregados quando a sumula vem de with_sumula_relations.
+    """
+
+    def get_rounds(self, obj):
+        players = {player_score['rounds_number']: player_score
+                   for player_score in PlayerScoreForRoundRobinSerializer(obj.scores.all(), many=True).data}
+        rounds = []
+        for match in obj.matches.all():
+            while len(rounds) < match.round_number:
+                rounds.append([])
+            rounds[match.round_number - 1].append({
+                'player1': players.get(match.seat_a),
+                'player2': players.get(match.seat_b) if match.seat_b else None
+            })
+        return rounds
+
+
+class SumulaClassificatoriaSerializer(RoundsSerializerMixin, ModelSerializer):
     """ Serializer for the SumulaClassificatoria model.
     fields: id, active, description, referee, name, players_score
     """
     players_score = PlayerScoreSerializer(
         source='scores', many=True)
     referee = StaffSerializer(many=True)
+    rounds = serializers.SerializerMethodField()
 
     class Meta:
         model = SumulaClassificatoria
@@ -103,13 +140,14 @@ class SumulaClassificatoriaSerializer(ModelSerializer):
                   'description', 'referee',  'players_score', 'rounds']
 
 
-class SumulaImortalSerializer(ModelSerializer):
+class SumulaImortalSerializer(RoundsSerializerMixin, ModelSerializer):
     """ Serializer for the Sumula model.
     fields: id, active, description, referee, name, players_score
     """
     players_score = PlayerScoreSerializer(
         source='scores', many=True)
     referee = StaffSerializer(many=True)
+    rounds = serializers.SerializerMethodField()
 
     class Meta:
         model = SumulaImortal
@@ -142,12 +180,13 @@ class PlayerScoreForPlayerSerializer(ModelSerializer):
         fields = ['player']
 
 
-class SumulaClassificatoriaForPlayerSerializer(ModelSerializer):
+class SumulaClassificatoriaForPlayerSerializer(RoundsSerializerMixin, ModelSerializer):
     """ Serializer for the Sumula model.
     fields: id, active, referee, name, players_score
     """
     referee = StaffSerializer(many=True)
     players = PlayerScoreForPlayerSerializer(source='scores', many=True)
+    rounds = serializers.SerializerMethodField()
 
     class Meta:
         model = SumulaClassificatoria
@@ -155,12 +194,13 @@ class SumulaClassificatoriaForPlayerSerializer(ModelSerializer):
                   'referee', 'players', 'rounds']
 
 
-class SumulaImortalForPlayerSerializer(ModelSerializer):
+class SumulaImortalForPlayerSerializer(RoundsSerializerMixin, ModelSerializer):
     """ Serializer for the Sumula model.
     fields: id, active, referee, name, players_score
     """
     referee = StaffSerializer(many=True)
     players = PlayerScoreForPlayerSerializer(source='scores', many=True)
+    rounds = serializers.SerializerMethodField()
 
     class Meta:
         model = SumulaImortal
@@ -240,3 +280,18 @@ class ResultsSerializer(ModelSerializer):
             return None
         result = PlayerResultsSerializer(obj.paladin).data
         return result
+
+
+class LeaderboardEntrySerializer(ModelSerializer):
+    """ Serializer for the LeaderboardEntry model.
+    fields: 'position', 'rank', 'player_id', 'full_name', 'social_name', 'is_imortal',
+    'total_score', 'sumulas_played', 'best_score'
+    """
+    full_name = serializers.CharField(source='player.full_name')
+    social_name = serializers.CharField(source='player.social_name')
+    is_imortal = serializers.BooleanField(source='player.is_imortal')
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['position', 'rank', 'player_id', 'full_name', 'social_name', 'is_imortal',
+                  'total_score', 'sumulas_played', 'best_score']
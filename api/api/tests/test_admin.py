@@ -0,0 +1,58 @@
+import csv
+import warnings
+from io import BytesIO, StringIO
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import openpyxl
+import pyarrow.parquet as pq
+from api.models import Event, Token
+from users.models import User
+
+
+class ExportActionsTestCase(TestCase):
+    def setUp(self):
+        self.events = [Event.objects.create(name=f'Evento {i}', token=Token.objects.create(),
+                                            is_final_results_published=i % 2 == 0) for i in range(3)]
+        self.superuser = User.objects.create_superuser(
+            username='admin', email='admin@gmail.com', password='admin')
+        self.client.force_login(self.superuser)
+
+    def export(self, model: str, action: str, objects) -> bytes:
+        response = self.client.post(reverse(f'admin:api_{model}_changelist'), {
+            'action': action, ACTION_CHECKBOX_NAME: [obj.pk for obj in objects]})
+        self.assertEqual(response.status_code, 200)
+        # O admin é servido pelo WSGI: o corpo deve ser um iterador síncrono, sem o aviso do Django
+        # de que um iterador assíncrono seria lido inteiro para a memória
+        self.assertFalse(response.is_async)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            return b''.join(response)
+
+    def test_export_events_as_excel(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.export('event', 'export_as_excel', self.events)
+        # O token de cada evento vem no mesmo SELECT, sem uma query por evento
+        self.assertEqual(sum('api_token' in query['sql'] for query in queries.captured_queries), 1)
+        rows = list(openpyxl.load_workbook(BytesIO(content))['Events'].values)
+        self.assertEqual(rows[0][:3], ('NOME', 'ATIVO', 'ADMIN TOKEN'))
+        self.assertIn(('Evento 0', 'Sim', self.events[0].token.token_code, self.events[0].join_token,
+                       'Não', 'Sim'), rows[1:])
+        self.assertEqual(len(rows), 4)
+
+    def test_export_tokens_as_csv(self):
+        tokens = [event.token for event in self.events]
+        rows = list(csv.reader(StringIO(self.export('token', 'export_as_csv', tokens).decode('utf-8-sig'))))
+        self.assertEqual(rows[0], ['TOKEN', 'USADO', 'CRIADO EM'])
+        self.assertEqual({row[0] for row in rows[1:]}, {token.token_code for token in tokens})
+        self.assertEqual({row[2] for row in rows[1:]},
+                         {token.created_at.strftime('%d/%m/%Y %H:%M:%S') for token in tokens})
+
+    def test_export_tokens_as_parquet(self):
+        tokens = [event.token for event in self.events]
+        table = pq.read_table(BytesIO(self.export('token', 'export_as_parquet', tokens)))
+        self.assertEqual(table.column_names, ['TOKEN', 'USADO', 'CRIADO EM'])
+        self.assertEqual(str(table.schema.field('USADO').type), 'bool')
+        self.assertEqual(set(table.column('TOKEN').to_pylist()), {token.token_code for token in tokens})
@@ -0,0 +1,50 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.test import LiveServerTestCase
+from api.factories import create_event, delete_event
+from api.models import Event, Player, SumulaClassificatoria
+from users.models import User
+
+
+class BenchmarkEventDayTestCase(LiveServerTestCase):
+    def test_factory(self):
+        seeded = create_event(players=8, staff=2)
+        self.assertEqual(Player.objects.filter(event=seeded.event).count(), 8)
+        self.assertEqual(seeded.event.staff.count(), 2)
+        self.assertTrue(seeded.admin.has_perm('api.add_sumula_event', seeded.event))
+        delete_event(seeded)
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith=seeded.prefix).exists())
+
+    def test_replays_event_day(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'benchmark.json'
+            call_command('benchmark_event_day', url=self.live_server_url, players=14, staff=2, concurrency=4,
+                         pollers=2, polls=5, output=str(output), keep=True, stdout=StringIO())
+            report = json.loads(output.read_text())
+
+            stdout = StringIO()
+            call_command('benchmark_event_day', url=self.live_server_url, players=14, staff=2, concurrency=4,
+                         pollers=2, polls=5, compare=str(output), stdout=stdout)
+        self.assertIn('p95 comparado com', stdout.getvalue())
+
+        phases = {phase['name']: phase['endpoints'] for phase in report['phases']}
+        self.assertEqual(list(phases), ['staff_join', 'player_join', 'generate_sumulas', 'referee_assignment',
+                                        'scoring', 'publishing', 'results_polling'])
+        self.assertEqual(phases['player_join']['POST api/players/']['requests'], 14)
+        self.assertEqual(phases['scoring']['PUT api/sumula/classificatoria/']['requests'], 2)
+        self.assertEqual(phases['results_polling']['GET api/results/']['requests'], 5)
+        for name, endpoints in phases.items():
+            for endpoint, stats in endpoints.items():
+                self.assertEqual(stats['errors'], 0, endpoint)
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                if name != 'scoring':
+                    self.assertEqual(stats['client_errors'], 0, endpoint)
+        self.assertEqual(phases['scoring']['PUT api/sumula/classificatoria/']['client_errors'], 0)
+
+        event = Event.objects.get()
+        self.assertTrue(event.is_final_results_published)
+        self.assertFalse(SumulaClassificatoria.objects.filter(event=event, active=True).exists())
@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+from ..brackets import plan_bracket_sizes, balanced_bracket_sizes, partition, bracket_name
+
+
+class PlanBracketSizesTestCase(SimpleTestCase):
+    def test_multiple_of_max_players(self):
+        self.assertEqual(plan_bracket_sizes(16), [8, 8])
+
+    def test_remainder_above_min_players(self):
+        self.assertEqual(plan_bracket_sizes(23), [8, 8, 7])
+
+    def test_remainder_is_rebalanced(self):
+        self.assertEqual(plan_bracket_sizes(20), [8, 6, 6])
+        self.assertEqual(plan_bracket_sizes(17), [6, 6, 5])
+
+    def test_all_players_are_planned(self):
+        for n in range(1, 500):
+            sizes = plan_bracket_sizes(n)
+            self.assertEqual(sum(sizes), n)
+            self.assertLessEqual(max(sizes), 8)
+
+    def test_fallback_to_balanced_sizes(self):
+        self.assertEqual(plan_bracket_sizes(9), [5, 4])
+        self.assertEqual(balanced_bracket_sizes(10, 3), [4, 3, 3])
+
+    def test_no_players(self):
+        self.assertEqual(plan_bracket_sizes(0), [])
+
+
+class PartitionTestCase(SimpleTestCase):
+    def test_partition(self):
+        self.assertEqual(partition(range(7), [3, 4]), [[0, 1, 2], [3, 4, 5, 6]])
+
+    def test_partition_with_wrong_sizes(self):
+        with self.assertRaises(ValueError):
+            partition(range(7), [3, 3])
+
+
+class BracketNameTestCase(SimpleTestCase):
+    def test_bracket_name(self):
+        self.assertEqual(bracket_name(0), 'Chave A')
+        self.assertEqual(bracket_name(25), 'Chave Z')
+        self.assertEqual(bracket_name(26), 'Chave AA')
+        self.assertEqual(bracket_name(27), 'Chave BB')
@@ -0,0 +1,237 @@
+import threading
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from api.cache import aget_cached_event_payload, aget_event_etag, get_cache_stats, get_cached_event_payload, get_event_cache, get_event_version, invalidate_event_cache
+from api.models import Event, Player, PlayerScore, Results, Staff, SumulaImortal, Token
+from api.permissions import assign_permissions
+from users.models import User
+import uuid
+
+
+class EventCacheTestCase(TestCase):
+    def create_unique_email(self):
+        return f'{uuid.uuid4()}@gmail.com'
+
+    def setUp(self):
+        get_event_cache().clear()
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+        self.other_event = Event.objects.create(
+            name='Evento 2', token=Token.objects.create())
+        self.results = Results.objects.create(event=self.event)
+
+    def test_get_cached_event_payload(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {'data': len(calls)}
+
+        self.assertEqual(get_cached_event_payload(
+            self.event.id, 'results', build), {'data': 1})
+        self.assertEqual(get_cached_event_payload(
+            self.event.id, 'results', build), {'data': 1})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_cache_stats()['results'], {
+                         'hits': 1, 'misses': 1})
+
+    async def test_async_reads_use_the_cache_off_the_event_loop(self):
+        cache = get_event_cache()
+        threads = []
+
+        def record(method):
+            def wrapper(*args, **kwargs):
+                threads.append(threading.get_ident())
+                return method(*args, **kwargs)
+            return wrapper
+
+        async def build():
+            return 'dados'
+
+        with patch.object(cache, 'get', record(cache.get)), patch.object(cache, 'set', record(cache.set)):
+            self.assertIsNotNone(await aget_event_etag(self.event.id, 'results'))
+            self.assertEqual(await aget_cached_event_payload(self.event.id, 'results', build), 'dados')
+        self.assertTrue(threads)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_invalidate_event_cache(self):
+        get_cached_event_payload(self.event.id, 'results', lambda: 'antigo')
+        get_cached_event_payload(
+            self.other_event.id, 'results', lambda: 'outro')
+        invalidate_event_cache(self.event.id)
+        self.assertEqual(get_cached_event_payload(
+            self.event.id, 'results', lambda: 'novo'), 'novo')
+        self.assertEqual(get_cached_event_payload(
+            self.other_event.id, 'results', lambda: 'novo'), 'outro')
+
+    def test_version_bumped_by_signals(self):
+        player = Player.objects.create(
+            event=self.event, registration_email=self.create_unique_email())
+        sumula = SumulaImortal.objects.create(event=self.event)
+        staff = Staff.objects.create(
+            event=self.event, registration_email=self.create_unique_email())
+        other_version = get_event_version(self.other_event.id)
+
+        changes = [
+            lambda: PlayerScore.objects.create(
+                player=player, event=self.event, sumula_imortal=sumula, points=3),
+            lambda: sumula.referee.add(staff),
+            lambda: Player.objects.get(pk=player.pk).save(),
+            lambda: self.results.top4.add(player),
+            lambda: self.event.save(),
+            lambda: sumula.delete(),
+        ]
+        for change in changes:
+            version = get_event_version(self.event.id)
+            change()
+            self.assertGreater(get_event_version(self.event.id), version)
+        self.assertEqual(get_event_version(
+            self.other_event.id), other_version)
+
+    def test_calculate_imortals_is_idempotent(self):
+        Player.objects.create(event=self.event, registration_email=self.create_unique_email(),
+                              is_imortal=True, total_score=10)
+        self.results.calculate_imortals()
+        version = get_event_version(self.event.id)
+        self.results.calculate_imortals()
+        self.assertEqual(get_event_version(self.event.id), version)
+        self.assertEqual(self.results.imortals.count(), 1)
+
+    def test_event_cache_stats_command(self):
+        get_cached_event_payload(self.event.id, 'sumulas', lambda: [])
+        out = StringIO()
+        call_command('event_cache_stats', '--reset', stdout=out)
+        self.assertIn('sumulas: 0 hits, 1 misses', out.getvalue())
+        self.assertEqual(get_cache_stats()['sumulas'], {
+                         'hits': 0, 'misses': 0})
+
+
+class BaseEventCacheViewsTestCase(APITestCase):
+    def create_unique_email(self):
+        return f'{uuid.uuid4()}@gmail.com'
+
+    def setUp(self):
+        get_event_cache().clear()
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create(), is_final_results_published=True)
+        self.results = Results.objects.create(event=self.event)
+        self.admin = User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=self.create_unique_email())
+        self.admin.events.add(self.event)
+        assign_permissions(self.admin, Group.objects.create(
+            name='event_admin'), self.event)
+        self.players = [Player.objects.create(event=self.event, registration_email=self.create_unique_email(),
+                                              full_name=f'Jogador {i}') for i in range(4)]
+        self.sumula = SumulaImortal.objects.create(event=self.event)
+        self.scores = [PlayerScore.objects.create(player=player, event=self.event, sumula_imortal=self.sumula)
+                       for player in self.players]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+
+class EventCacheViewsTestCase(BaseEventCacheViewsTestCase):
+    def test_get_sumulas_uses_cache(self):
+        url = f"{reverse('api:sumula-ativas')}?event_id={self.event.id}"
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as second:
+            cached_response = self.client.get(url)
+        self.assertEqual(cached_response.data, response.data)
+        self.assertLess(len(second), len(first))
+        self.assertEqual(get_cache_stats()['sumulas-ativas'], {
+                         'hits': 1, 'misses': 1})
+
+    def test_get_sumulas_after_change(self):
+        url = f"{reverse('api:sumula-ativas')}?event_id={self.event.id}"
+        self.client.get(url)
+        score = self.scores[0]
+        score.points = 7
+        score.save()
+        response = self.client.get(url)
+        scores = response.data['sumulas_imortal'][0]['players_score']
+        self.assertIn(7, [player_score['points'] for player_score in scores])
+
+    def test_get_results_after_change(self):
+        url = f"{reverse('api:results')}?event_id={self.event.id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['top4'])
+        self.results.top4.add(self.players[0])
+        response = self.client.get(url)
+        self.assertEqual([player['id'] for player in response.data['top4']], [
+                         self.players[0].id])
+        self.assertEqual(get_cache_stats()['results'], {
+                         'hits': 0, 'misses': 2})
+
+
+class EventETagViewsTestCase(BaseEventCacheViewsTestCase):
+    def get_not_modified(self, url, etag, if_none_match=None):
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=if_none_match or etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_get_active_sumulas_etag(self):
+        url = f"{reverse('api:sumula-ativas')}?event_id={self.event.id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.get_not_modified(url, etag)
+        self.get_not_modified(url, etag, f'"outra", W/{etag}')
+        self.assertEqual(get_cache_stats()['sumulas-ativas'], {
+                         'hits': 0, 'misses': 1})
+
+        self.scores[0].points = 7
+        self.scores[0].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_results_etag(self):
+        url = f"{reverse('api:results')}?event_id={self.event.id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.get_not_modified(url, response['ETag'])
+        self.results.top4.add(self.players[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_sumula_for_player_etag(self):
+        user = User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=self.create_unique_email())
+        assign_permissions(user, Group.objects.create(
+            name='player'), self.event)
+        self.players[0].user = user
+        self.players[0].is_imortal = True
+        self.players[0].save()
+        self.client.force_authenticate(user=user)
+        url = f"{reverse('api:sumula-player')}?event_id={self.event.id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.get_not_modified(url, response['ETag'])
+
+    @override_settings(EVENT_CACHE_SINGLE_PROCESS=False)
+    def test_no_etag_with_process_local_cache(self):
+        url = f"{reverse('api:sumula-ativas')}?event_id={self.event.id}"
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_etag_requires_permission(self):
+        url = f"{reverse('api:sumula-ativas')}?event_id={self.event.id}"
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=self.create_unique_email()))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,107 @@
+from io import BytesIO
+from django.core.validators import validate_email
+from django.forms import ValidationError
+from django.test import SimpleTestCase, TestCase
+from openpyxl import Workbook
+from ..ingestion import read_table_chunks, normalize_names, normalize_emails, valid_emails, string_mask, TabularImporter
+from ..models import Event, Token, Player, Staff
+import pandas as pd
+
+
+class ReadTableChunksTestCase(SimpleTestCase):
+    columns = ['nome completo', 'e-mail']
+
+    def test_csv_chunks(self):
+        content = 'Nome Social; Nome Completo ;E-MAIL\n'
+        content += ''.join(f'x;Jogador {i};j{i}@gmail.com\n' for i in range(5))
+        chunks = list(read_table_chunks(
+            BytesIO(content.encode('latin-1')), 'csv', self.columns, chunksize=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(list(chunks[0].columns), self.columns)
+        self.assertEqual(chunks[2].iloc[0]['e-mail'], 'j4@gmail.com')
+
+    def test_xlsx_chunks(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['E-mail', 'Nome Completo'])
+        for i in range(3):
+            sheet.append([f'j{i}@gmail.com', f'Jogador {i}'])
+        file = BytesIO()
+        workbook.save(file)
+        chunks = list(read_table_chunks(file, 'xlsx', self.columns, chunksize=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(list(chunks[1].index), [2])
+        self.assertEqual(chunks[1].iloc[0].to_dict(), {
+                         'nome completo': 'Jogador 2', 'e-mail': 'j2@gmail.com'})
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(ValueError, 'Colunas ausentes no arquivo: e-mail'):
+            read_table_chunks(BytesIO(b'Nome Completo\nJoao\n'), 'csv', self.columns)
+
+    def test_invalid_extension(self):
+        self.assertIsNone(read_table_chunks(BytesIO(b''), 'txt', self.columns))
+
+
+class NormalizeTestCase(SimpleTestCase):
+    def test_normalize_names(self):
+        names = pd.Series(['  joão DA silva ', 'MARIA  d\'ávila'])
+        self.assertEqual(list(normalize_names(names)), [
+                         'João Da Silva', 'Maria  D\'ávila'])
+
+    def test_normalize_emails(self):
+        self.assertEqual(list(normalize_emails(
+            pd.Series([' Joao@Gmail.COM ']))), ['joao@gmail.com'])
+
+    def test_string_mask(self):
+        mask = string_mask(pd.Series(['a', None, 'c']),
+                           pd.Series(['a', 'b', 3]))
+        self.assertEqual(list(mask), [True, False, False])
+
+    def test_valid_emails_matches_django_validator(self):
+        emails = ['joao@gmail.com', 'joao@localhost', 'joao@[127.0.0.1]', 'joao@ação.com.br',
+                  'joao', 'joao@', '@gmail.com', 'jo ao@gmail.com', 'joao@gmail', 'a@b@gmail.com',
+                  '"joao silva"@gmail.com', 'joao@-gmail.com', f'{"a" * 320}@gmail.com', '']
+
+        def django_valid(email):
+            try:
+                validate_email(email)
+            except ValidationError:
+                return False
+            return True
+
+        self.assertEqual(list(valid_emails(pd.Series(emails))),
+                         [django_valid(email) for email in emails])
+
+
+class TabularImporterTestCase(TestCase):
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+
+    def chunks(self, rows):
+        df = pd.DataFrame(rows, columns=['nome completo', 'e-mail'])
+        return [df.iloc[:2], df.iloc[2:]]
+
+    def test_import_players(self):
+        importer = TabularImporter(Player, self.event, update_fields=[
+                                   'full_name', 'is_present'], defaults={'is_present': True})
+        result = importer.run(self.chunks([
+            ['joão', 'joao@gmail.com'], [None, 'maria@gmail.com'], ['pedro', 'pedro@'], ['joão silva', 'joao@gmail.com']]))
+        self.assertEqual(result.total, 4)
+        self.assertEqual(result.errors_count, 2)
+        self.assertEqual([error['row'] for error in result.errors], [3, 4])
+        player = Player.objects.get(event=self.event)
+        self.assertEqual(player.full_name, 'João Silva')
+        self.assertTrue(player.is_present)
+
+    def test_import_staff_does_not_touch_other_fields(self):
+        Staff.objects.create(event=self.event, registration_email='joao@gmail.com',
+                             full_name='João', is_manager=True)
+        # Um upsert por bloco, dentro de uma transação (savepoint e release)
+        with self.assertNumQueries(4):
+            result = TabularImporter(Staff, self.event, update_fields=['full_name']).run(
+                self.chunks([['joão silva', 'joao@gmail.com'], ['maria', 'maria@gmail.com'], ['pedro', 'pedro@gmail.com']]))
+        self.assertEqual(result.errors_count, 0)
+        self.assertEqual(Staff.objects.filter(event=self.event).count(), 3)
+        self.assertTrue(Staff.objects.get(
+            registration_email='joao@gmail.com').is_manager)
@@ -0,0 +1,203 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from api.models import Event, LeaderboardEntry, Player, PlayerScore, Results, SumulaClassificatoria, SumulaImortal, Token
+from api.permissions import assign_permissions
+from users.models import User
+import random
+import uuid
+
+
+def create_unique_email():
+    return f'{uuid.uuid4()}@gmail.com'
+
+
+class LeaderboardEntryTestCase(TestCase):
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+        self.players = [Player.objects.create(event=self.event, registration_email=create_unique_email(),
+                                              full_name=f'Jogador {i}') for i in range(4)]
+        self.sumulas = [SumulaClassificatoria.objects.create(event=self.event, name=f'Chave {i}')
+                        for i in range(2)]
+
+    def add_score(self, player, points, sumula=None):
+        return PlayerScore.objects.create(player=player, event=self.event, points=points,
+                                          sumula_classificatoria=sumula or self.sumulas[0])
+
+    def ranking(self):
+        return list(LeaderboardEntry.objects.filter(event=self.event).values_list('player_id', 'position', 'rank'))
+
+    def test_players_enter_the_leaderboard(self):
+        self.assertEqual([entry[0] for entry in self.ranking()],
+                         [player.id for player in self.players])
+        self.assertEqual({rank for _, _, rank in self.ranking()}, {1})
+
+    def test_ranking_follows_scores(self):
+        self.add_score(self.players[2], 10)
+        score = self.add_score(self.players[1], 5)
+        self.assertEqual(self.ranking()[:2], [
+                         (self.players[2].id, 1, 1), (self.players[1].id, 2, 2)])
+
+        score.points = 12
+        score.save()
+        entry = LeaderboardEntry.objects.get(player=self.players[1])
+        self.assertEqual((entry.position, entry.total_score,
+                         entry.best_score, entry.sumulas_played), (1, 12, 12, 1))
+
+        score.delete()
+        entry.refresh_from_db()
+        self.assertEqual((entry.total_score, entry.sumulas_played), (0, 0))
+        self.assertEqual(self.ranking()[0], (self.players[2].id, 1, 1))
+
+    def test_tie_breakers(self):
+        # Mesma pontuação total: maior pontuação em uma sumula, depois menos sumulas jogadas
+        self.add_score(self.players[0], 5)
+        self.add_score(self.players[0], 5, self.sumulas[1])
+        self.add_score(self.players[1], 10)
+        self.add_score(self.players[2], 6)
+        self.add_score(self.players[2], 4, self.sumulas[1])
+        self.add_score(self.players[3], 10)
+        self.assertEqual(self.ranking(), [
+            (self.players[1].id, 1, 1),
+            (self.players[3].id, 2, 1),
+            (self.players[2].id, 3, 3),
+            (self.players[0].id, 4, 4),
+        ])
+
+    def test_rank_event_only_updates_changed_rows(self):
+        self.add_score(self.players[3], 10)
+        self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 0)
+        LeaderboardEntry.objects.filter(
+            player=self.players[3]).update(position=4, rank=4)
+        self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 1)
+        self.assertEqual(self.ranking()[0], (self.players[3].id, 1, 1))
+
+    def test_partial_ranking_matches_full_ranking(self):
+        # Cada pontuação salva reordena só a faixa entre a pontuação anterior e a nova
+        rng = random.Random(0)
+        scores = [self.add_score(player, rng.randint(0, 5), sumula)
+                  for player in self.players for sumula in self.sumulas]
+        for _ in range(20):
+            score = rng.choice(scores)
+            score.points = rng.randint(0, 10)
+            score.save()
+            self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 0)
+        Player.objects.create(event=self.event, registration_email=create_unique_email(), full_name='Novo')
+        self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 0)
+
+    def test_new_player_appended_without_lock(self):
+        self.add_score(self.players[0], 10)
+        with CaptureQueriesContext(connection) as queries:
+            player = Player.objects.create(event=self.event, registration_email=create_unique_email())
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('FOR NO KEY UPDATE', sql)
+        self.assertNotIn('ROW_NUMBER', sql)
+        self.assertEqual(self.ranking()[-1], (player.id, 5, 2))
+        self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 0)
+
+    def test_new_player_above_players_without_points(self):
+        # Quem jogou uma sumula sem marcar pontos fica abaixo de quem ainda não jogou
+        self.add_score(self.players[1], 0)
+        player = Player.objects.create(event=self.event, registration_email=create_unique_email())
+        self.assertEqual(self.ranking()[-1][0], self.players[1].id)
+        self.assertIn((player.id, 4, 1), self.ranking())
+        self.assertEqual(LeaderboardEntry.rank_event(self.event.id), 0)
+
+    def test_player_update_does_not_refresh(self):
+        self.players[0].is_present = True
+        with CaptureQueriesContext(connection) as queries:
+            self.players[0].save()
+        self.assertFalse([query for query in queries if 'api_leaderboardentry' in query['sql']])
+
+    def test_player_deleted(self):
+        self.add_score(self.players[0], 10)
+        self.players[0].delete()
+        self.assertEqual([position for _, position, _ in self.ranking()], [1, 2, 3])
+
+    def test_sumula_deleted(self):
+        self.add_score(self.players[0], 10, self.sumulas[1])
+        self.sumulas[1].delete()
+        entry = LeaderboardEntry.objects.get(player=self.players[0])
+        self.assertEqual((entry.total_score, entry.sumulas_played), (0, 0))
+
+    def test_calculate_imortals_uses_leaderboard(self):
+        results = Results.objects.create(event=self.event)
+        sumula = SumulaImortal.objects.create(event=self.event)
+        Player.objects.filter(event=self.event).update(is_imortal=True)
+        for player, points in zip(self.players, [3, 8, 8, 1]):
+            PlayerScore.objects.create(
+                player=player, event=self.event, sumula_imortal=sumula, points=points)
+        results.calculate_imortals()
+        self.assertEqual({player.id for player in results.imortals.all()},
+                         {self.players[0].id, self.players[1].id, self.players[2].id})
+
+
+class LeaderboardViewTestCase(APITestCase):
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create(), is_final_results_published=True)
+        self.admin = User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=create_unique_email())
+        self.admin.events.add(self.event)
+        assign_permissions(self.admin, Group.objects.create(
+            name='event_admin'), self.event)
+        Player.objects.bulk_create([Player(event=self.event, registration_email=create_unique_email(),
+                                           full_name=f'Jogador {i}', total_score=i) for i in range(25)])
+        LeaderboardEntry.refresh(self.event.id)
+        self.url = f"{reverse('api:leaderboard')}?event_id={self.event.id}"
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_get_leaderboard_page(self):
+        response = self.client.get(f'{self.url}&page=2&page_size=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertIn('page=3', response.data['next'])
+        self.assertIn('page=1', response.data['previous'])
+        results = response.data['results']
+        self.assertEqual([entry['position'] for entry in results], list(range(11, 21)))
+        self.assertEqual([entry['total_score'] for entry in results], list(range(14, 4, -1)))
+        self.assertEqual(results[0]['full_name'], 'Jogador 14')
+
+        response = self.client.get(f'{self.url}&page=3&page_size=10')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_get_leaderboard_query_count_does_not_depend_on_page_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(f'{self.url}&page_size=2')
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(f'{self.url}&page_size=25')
+        self.assertEqual(len(small), len(large))
+
+    def test_get_leaderboard_invalid_page(self):
+        for query in ['page=0', 'page=a', 'page_size=0', 'page_size=1000']:
+            response = self.client.get(f'{self.url}&{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_leaderboard_not_published(self):
+        self.event.is_final_results_published = False
+        self.event.save()
+        user = User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=create_unique_email())
+        user.events.add(self.event)
+        assign_permissions(user, Group.objects.create(
+            name='player'), self.event)
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_leaderboard_etag(self):
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
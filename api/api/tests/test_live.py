@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from api.live import EventStreamBroker, RESYNC_MESSAGE, broker, format_sse
+from api.models import Event, Player, PlayerScore, SumulaClassificatoria, Token
+from api.permissions import assign_permissions
+from users.models import User
+import uuid
+
+
+class EventStreamBrokerTestCase(SimpleTestCase):
+    async def test_publish_from_another_thread(self):
+        stream_broker = EventStreamBroker()
+        queue = stream_broker.subscribe(1)
+        other_queue = stream_broker.subscribe(2)
+        thread = threading.Thread(target=stream_broker.publish, args=(
+            1, {'type': 'sumula_closed', 'data': {'id': 1}}))
+        thread.start()
+        thread.join()
+        message = await asyncio.wait_for(queue.get(), timeout=1)
+        self.assertEqual(message, {'type': 'sumula_closed', 'data': {'id': 1}})
+        self.assertTrue(other_queue.empty())
+
+    async def test_unsubscribe(self):
+        stream_broker = EventStreamBroker()
+        queue = stream_broker.subscribe(1)
+        self.assertEqual(stream_broker.subscribers_count(1), 1)
+        stream_broker.unsubscribe(1, queue)
+        self.assertFalse(stream_broker.has_subscribers(1))
+
+    async def test_resync_when_queue_is_full(self):
+        stream_broker = EventStreamBroker(queue_size=2)
+        queue = stream_broker.subscribe(1)
+        for i in range(3):
+            stream_broker.publish(1, {'type': 'sumula_updated', 'data': i})
+        await asyncio.sleep(0)
+        self.assertEqual(queue.qsize(), 1)
+        self.assertEqual(queue.get_nowait(), RESYNC_MESSAGE)
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse({'type': 'results_updated', 'data': {'a': 1}}),
+                         'event: results_updated\ndata: {"a": 1}\n\n')
+
+
+class EventStreamViewTestCase(TestCase):
+    def create_unique_email(self):
+        return f'{uuid.uuid4()}@gmail.com'
+
+    def create_user(self):
+        return User.objects.create(username=f'user_{uuid.uuid4().hex[:10]}', email=self.create_unique_email())
+
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+        self.user = self.create_user()
+        assign_permissions(self.user, Group.objects.create(
+            name='staff_manager'), self.event)
+        self.url = f"{reverse('api:event-stream')}?event_id={self.event.id}"
+        self.players = [Player.objects.create(event=self.event, registration_email=self.create_unique_email())
+                        for _ in range(2)]
+        self.sumula = SumulaClassificatoria.objects.create(
+            event=self.event, name='Chave 1')
+        self.scores = [PlayerScore.objects.create(player=player, event=self.event, sumula_classificatoria=self.sumula)
+                       for player in self.players]
+
+    def auth_header(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get(self.url, headers={'Authorization': 'Bearer invalido'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_stream_requires_permission(self):
+        user = await sync_to_async(self.create_user)()
+        response = await self.async_client.get(self.url, headers=self.auth_header(user))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_stream_event_not_found(self):
+        response = await self.async_client.get(
+            f"{reverse('api:event-stream')}?event_id=99999", headers=self.auth_header(self.user))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_requires_asgi(self):
+        # No WSGI o stream nunca seria enviado e prenderia o worker
+        response = self.client.get(f"{self.url}&access_token={AccessToken.for_user(self.user)}")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(broker.has_subscribers(self.event.id))
+
+    def close_sumula(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            PlayerScore.objects.filter(pk=self.scores[0].pk).update(points=9)
+            self.sumula.active = False
+            self.sumula.save()
+
+    async def test_stream_sumula_closed(self):
+        response = await self.async_client.get(
+            f"{self.url}&access_token={AccessToken.for_user(self.user)}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        self.assertEqual(await anext(content), b'retry: 5000\n\n')
+        self.assertIn(b'event: ready', await anext(content))
+        self.assertTrue(broker.has_subscribers(self.event.id))
+
+        await sync_to_async(self.close_sumula)()
+        message = (await asyncio.wait_for(anext(content), timeout=1)).decode()
+
+        # O servidor ASGI cancela o stream quando o cliente desconecta
+        next_message = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        next_message.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await next_message
+        self.assertFalse(broker.has_subscribers(self.event.id))
+        event, data = message.strip().split('\n')
+        self.assertEqual(event, 'event: sumula_closed')
+        data = json.loads(data.removeprefix('data: '))
+        self.assertEqual(data['id'], self.sumula.id)
+        self.assertEqual(data['kind'], 'classificatoria')
+        self.assertIn({'id': self.scores[0].id, 'player_id': self.players[0].id, 'points': 9, 'rounds_number': 0},
+                      data['players_score'])
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+from django.contrib.auth.models import Group
+from django.test import override_settings
+from django.urls import resolve, reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from api.metrics import QueryBudgetExceeded, get_query_budget
+from api.models import Event, Player, Token
+from api.permissions import assign_permissions
+from api.views.views_players import PlayersView
+from users.models import User
+
+PLAYERS_LABELS = {'view': 'api:players', 'method': 'GET'}
+
+
+def sample(name: str, labels: dict = PLAYERS_LABELS) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestMetricsTestCase(APITestCase):
+    def setUp(self):
+        self.event = Event.objects.create(name='Evento 1', token=Token.objects.create())
+        self.admin = User.objects.create(username='admin', email='admin@gmail.com')
+        assign_permissions(self.admin, Group.objects.create(name='event_admin'), self.event)
+        Player.objects.create(event=self.event, full_name='Jogador', registration_email='jogador@gmail.com')
+        self.url = f"{reverse('api:players')}?event_id={self.event.id}"
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_records_queries_of_async_views(self):
+        count, queries = sample('rrdd_request_db_queries_count'), sample('rrdd_request_db_queries_sum')
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+        self.assertEqual(sample('rrdd_request_db_queries_count'), count + 1)
+        self.assertEqual(sample('rrdd_request_db_queries_sum'), queries + 4)
+        self.assertGreater(sample('rrdd_request_duration_seconds_sum'), 0)
+
+    def test_records_serializer_time(self):
+        labels = {'view': 'api:event', 'method': 'GET'}
+        self.admin.events.add(self.event)
+        serializer_time = sample('rrdd_request_serializer_duration_seconds_sum', labels)
+        self.client.get(reverse('api:event'))
+        self.assertGreater(sample('rrdd_request_serializer_duration_seconds_sum', labels), serializer_time)
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.url)
+        response = self.client.get(reverse('api:metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('rrdd_request_db_queries_bucket{le="5.0",method="GET",view="api:players"}',
+                      response.content.decode())
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_metrics_endpoint_token(self):
+        self.assertEqual(self.client.get(reverse('api:metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('api:metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='', METRICS_REQUIRE_TOKEN=True)
+    def test_metrics_endpoint_disabled_without_token(self):
+        self.assertEqual(self.client.get(reverse('api:metrics')).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_budget_exceeded(self):
+        with patch.object(PlayersView, 'query_budget', {'GET': 3}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url)
+
+    def test_query_budget_includes_jwt_authentication(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_200_OK)
+
+    @override_settings(QUERY_BUDGETS_ENFORCED=False)
+    def test_query_budget_only_logged_outside_tests(self):
+        with patch.object(PlayersView, 'query_budget', {'GET': 3}):
+            with self.assertLogs('api.metrics', 'WARNING'):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_read_views_declare_budgets(self):
+        for url_name in ['sumula', 'sumula-ativas', 'sumula-encerradas', 'sumula-player', 'results',
+                         'leaderboard', 'player', 'players', 'players-search', 'qualified-players',
+                         'export-players', 'staff-search']:
+            view_class = resolve(reverse(f'api:{url_name}')).func.view_class
+            self.assertIsNotNone(get_query_budget(view_class, 'GET'), url_name)
@@ -0,0 +1,47 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from api.microbenchmarks import BENCHMARKS, Benchmark, compare, growth_exponent, run
+
+
+class MicrobenchmarksTestCase(TestCase):
+    def test_growth_exponent(self):
+        self.assertAlmostEqual(growth_exponent((10, 100, 1000), [1, 10, 100]), 1)
+        self.assertAlmostEqual(growth_exponent((10, 1000), [1, 10_000]), 2)
+
+    def test_benchmarks_run(self):
+        for benchmark in BENCHMARKS:
+            with self.subTest(benchmark.name):
+                self.assertIsNotNone(benchmark.setup(benchmark.sizes[0])())
+
+    def test_run(self):
+        results = run([Benchmark('sum', lambda n: lambda: sum(range(n)), (10, 1000), max_exponent=1.5)], repeat=1)
+        self.assertEqual(list(results['sum']['times']), ['10', '1000'])
+        self.assertEqual(results['sum']['max_exponent'], 1.5)
+
+    def test_compare(self):
+        results = {'a': {'times': {'10': 0.002, '100': 0.02}, 'exponent': 1.0, 'max_exponent': 1.3},
+                   'b': {'times': {'10': 0.001, '100': 0.1}, 'exponent': 2.0, 'max_exponent': 1.3}}
+        baseline = {'a': {'times': {'10': 0.001, '100': 0.019}}}
+        problems = compare(results, baseline, tolerance=0.25)
+        self.assertEqual(len(problems), 2)
+        self.assertTrue(problems[0].startswith('a[10]'))
+        self.assertIn('n^2.0', problems[1])
+        self.assertEqual(compare(results, baseline, tolerance=1.5)[1:], [])
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / 'baseline.json'
+            call_command('microbenchmark', 'generate_brackets', repeat=1, baseline=str(baseline),
+                         save_baseline=True, stdout=StringIO())
+            self.assertIn('generate_brackets', json.loads(baseline.read_text()))
+            stdout = StringIO()
+            call_command('microbenchmark', 'generate_brackets', repeat=1, baseline=str(baseline),
+                         tolerance=100, stdout=stdout)
+        self.assertIn('Nenhuma regressão', stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('microbenchmark', 'inexistente', stdout=StringIO())
@@ -460,6 +460,37 @@ class PlayerTest(TestCase):
         # Check if total score is updated
         self.assertEqual(self.player.total_score, 35)
 
+    def test_update_total_score_when_points_decrease(self):
+        player_score = PlayerScore.objects.create(
+            player=self.player, event=self.event, sumula_imortal=self.sumulaImortal, points=10)
+        player_score.points = 4
+        player_score.save()
+        self.assertEqual(self.player.total_score, 4)
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 4)
+
+    def test_update_total_score_only_touches_total_score_column(self):
+        player_score = PlayerScore.objects.create(
+            player=self.player, event=self.event, sumula_imortal=self.sumulaImortal, points=10)
+        Player.objects.filter(pk=self.player.pk).update(full_name='Novo Nome')
+        player_score.points = 15
+        player_score.save()
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 15)
+        self.assertEqual(self.player.full_name, 'Novo Nome')
+
+    def test_update_total_score_on_loaded_player_score(self):
+        PlayerScore.objects.create(
+            player=self.player, event=self.event, sumula_imortal=self.sumulaImortal, points=10)
+        player_score = PlayerScore.objects.get(player=self.player)
+        player_score.points = 12
+        player_score.save()
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 12)
+        player_score.delete()
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 0)
+
     def tearDown(self):
         self.token.delete()
         self.user.delete()
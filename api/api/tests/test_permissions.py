@@ -5,6 +5,7 @@ from ..permissions import filter_permissions, assign_permissions
 import uuid
 from django.db.models import QuerySet
 from django.test import TestCase
+from guardian.models import UserObjectPermission
 
 event_admin_permissions = ['change_event', 'view_event', 'delete_event', 'add_sumula_event', 'change_sumula_event', 'delete_sumula_event', 'view_sumula_event', 'add_player_event',
                            'change_player_event', 'view_player_event', 'delete_player_event', 'add_player_score_event', 'change_player_score_event', 'view_player_score_event', 'delete_player_score_event']
@@ -65,6 +66,28 @@ class AddPermissionsTestCase(TestCase):
             self.verify_permissions(
                 self.user, self.event, expected_permissions)
 
+    def test_assign_permissions_with_a_single_query(self):
+        """Com as permissões do grupo em cache, cada atribuição é um único bulk insert."""
+        assign_permissions(self.user, self.group_player, self.event)
+        other_user = User.objects.create(
+            username=self.create_unique_username(), email=self.create_unique_email())
+        with self.assertNumQueries(1):
+            assign_permissions(other_user, self.group_player, self.event)
+        self.verify_permissions(other_user, self.event, player_permissions)
+        other_user.delete()
+
+    def test_assign_permissions_twice(self):
+        assign_permissions(self.user, self.group_staff_member, self.event)
+        assign_permissions(self.user, self.group_staff_member, self.event)
+        self.assertEqual(UserObjectPermission.objects.filter(
+            user=self.user).count(), len(staff_member_permissions))
+
+    def test_assign_permissions_invalid_group(self):
+        invalid_group = Group.objects.create(name='invalid_group')
+        assign_permissions(self.user, invalid_group, self.event)
+        self.assertFalse(UserObjectPermission.objects.filter(
+            user=self.user).exists())
+
     def test_filter_permissions_invalid_group(self):
         invalid_group = Group.objects.create(name='invalid_group')
         permissions = filter_permissions(invalid_group)
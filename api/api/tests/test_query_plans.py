@@ -0,0 +1,161 @@
+import json
+import unittest
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from api.cache import get_event_cache
+from api.models import Event, Player, Results, Token
+from api.permissions import assign_permissions
+from api.search import trigram_available
+from users.models import User
+
+EVENTS = 50
+PLAYERS_PER_EVENT = 2000  # 100 mil jogadores, 100 mil pontuações e 100 mil linhas de ranking
+BRACKET_SIZE = 8
+ACTIVE_SUMULAS_PER_EVENT = 5
+IMORTAL_SUMULAS_PER_EVENT = 10
+# Tabelas grandes que nunca devem ser lidas por inteiro pelos endpoints de um evento
+LARGE_TABLES = {'api_player', 'api_playerscore', 'api_sumulaclassificatoria', 'api_sumulaimortal',
+                'api_leaderboardentry'}
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'EXPLAIN com FORMAT JSON do PostgreSQL')
+class QueryPlansTestCase(TestCase):
+    """Verifica com EXPLAIN que as queries dos principais endpoints usam índices
+    nas tabelas grandes, em uma base com 100 mil jogadores.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.events = [Event.objects.create(name=f'Evento {i}', token=Token.objects.create(),
+                                           is_final_results_published=True, is_imortal_results_published=True)
+                      for i in range(EVENTS)]
+        cls.event = cls.events[0]
+        brackets = PLAYERS_PER_EVENT // BRACKET_SIZE
+        # Os dados são gerados no próprio banco: com o ORM a criação das 300 mil linhas leva minutos
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO api_player (full_name, social_name, total_score, registration_email,
+                                        is_imortal, is_present, event_id)
+                SELECT 'Jogador ' || i, '', i %% 100, 'jogador' || i || '@evento' || event.id || '.com',
+                       i < %s, true, event.id
+                FROM api_event event CROSS JOIN generate_series(0, %s - 1) i
+            """, [4 * IMORTAL_SUMULAS_PER_EVENT, PLAYERS_PER_EVENT])
+            cursor.execute("""
+                INSERT INTO api_sumulaclassificatoria (name, active, description, event_id)
+                SELECT 'Chave ' || i, i >= %s, '', event.id
+                FROM api_event event CROSS JOIN generate_series(0, %s - 1) i
+            """, [brackets - ACTIVE_SUMULAS_PER_EVENT, brackets])
+            cursor.execute("""
+                INSERT INTO api_sumulaimortal (name, number, active, description, event_id)
+                SELECT 'Imortais ' || i, i, i = 0, '', event.id
+                FROM api_event event CROSS JOIN generate_series(0, %s - 1) i
+            """, [IMORTAL_SUMULAS_PER_EVENT])
+            # Cada jogador pontua na chave da sua posição no evento, e os imortais em uma sumula imortal
+            for table, column, size, condition in [
+                    ('api_sumulaclassificatoria', 'sumula_classificatoria_id', BRACKET_SIZE, 'true'),
+                    ('api_sumulaimortal', 'sumula_imortal_id', 4, 'is_imortal')]:
+                cursor.execute(f"""
+                    INSERT INTO api_playerscore (player_id, event_id, points, rounds_number, {column})
+                    SELECT player.id, player.event_id, player.total_score, 0, sumula.id
+                    FROM (SELECT id, event_id, total_score,
+                                 row_number() OVER (PARTITION BY event_id ORDER BY id) - 1 AS n
+                          FROM api_player WHERE {condition}) player
+                    JOIN (SELECT id, event_id, row_number() OVER (PARTITION BY event_id ORDER BY id) - 1 AS n
+                          FROM {table}) sumula
+                      ON sumula.event_id = player.event_id AND sumula.n = player.n / %s
+                """, [size])
+            cursor.execute("""
+                INSERT INTO api_leaderboardentry (event_id, player_id, position, rank, total_score,
+                                                  sumulas_played, best_score)
+                SELECT event_id, id, row_number() OVER (PARTITION BY event_id ORDER BY total_score DESC, id),
+                       rank() OVER (PARTITION BY event_id ORDER BY total_score DESC), total_score, 1, total_score
+                FROM api_player
+            """)
+        Results.objects.create(event=cls.event)
+
+        cls.admin = User.objects.create(username='admin_plans', email='admin_plans@gmail.com')
+        cls.admin.events.add(cls.event)
+        assign_permissions(cls.admin, Group.objects.create(
+            name='event_admin'), cls.event)
+        cls.player_user = User.objects.create(
+            username='player_plans', email='player_plans@gmail.com')
+        cls.player_user.events.add(cls.event)
+        assign_permissions(cls.player_user, Group.objects.create(
+            name='player'), cls.event)
+        Player.objects.filter(pk=Player.objects.filter(event=cls.event, is_imortal=True).order_by(
+            'id').values_list('id', flat=True)[:1]).update(user=cls.player_user)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {', '.join(sorted(LARGE_TABLES))}")
+            # Verifica as chaves estrangeiras uma única vez aqui, e não ao final de cada teste
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+    def setUp(self):
+        get_event_cache().clear()
+        self.client = APIClient()
+
+    def explain(self, sql: str) -> dict:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+    def assertUsesIndexes(self, url_name: str, user: User, query: str = ''):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f'{reverse(f"api:{url_name}")}?event_id={self.event.id}{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seq_scans = []
+        for captured in queries.captured_queries:
+            if not captured['sql'].startswith('SELECT'):
+                continue
+            for node in plan_nodes(self.explain(captured['sql'])):
+                if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES:
+                    seq_scans.append(f"{node['Relation Name']}: {captured['sql']}")
+        self.assertEqual(seq_scans, [])
+
+    def test_players(self):
+        self.assertUsesIndexes('players', self.admin)
+
+    def test_players_filtered_page(self):
+        self.assertUsesIndexes('players', self.admin,
+                               '&name=jogador 12&is_present=true&limit=50&cursor=10')
+
+    def test_qualified_players(self):
+        self.assertUsesIndexes('qualified-players', self.admin)
+
+    def test_sumulas(self):
+        self.assertUsesIndexes('sumula', self.admin)
+
+    def test_active_sumulas(self):
+        self.assertUsesIndexes('sumula-ativas', self.admin)
+
+    def test_sumula_for_player(self):
+        self.assertUsesIndexes('sumula-player', self.player_user)
+
+    def test_player_results(self):
+        self.assertUsesIndexes('player', self.player_user)
+
+    def test_results(self):
+        self.assertUsesIndexes('results', self.admin)
+
+    def test_leaderboard(self):
+        self.assertUsesIndexes('leaderboard', self.admin, '&page=3')
+
+    def test_players_search(self):
+        if not trigram_available(connection):
+            self.skipTest('Extensões pg_trgm e unaccent indisponíveis no servidor')
+        self.assertUsesIndexes('players-search', self.admin, '&q=jogadr 1234')
@@ -0,0 +1,66 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from api.models import Event, Player, PlayerScore, SumulaImortal, Token
+import uuid
+
+
+class ReconcileTotalScoresTestCase(TestCase):
+    def create_unique_email(self):
+        return f'{uuid.uuid4()}@gmail.com'
+
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+        self.other_event = Event.objects.create(
+            name='Evento 2', token=Token.objects.create())
+        self.sumula = SumulaImortal.objects.create(event=self.event)
+        self.player = Player.objects.create(
+            event=self.event, registration_email=self.create_unique_email())
+        self.player2 = Player.objects.create(
+            event=self.event, registration_email=self.create_unique_email())
+        self.other_player = Player.objects.create(
+            event=self.other_event, registration_email=self.create_unique_email(), total_score=7)
+        PlayerScore.objects.create(
+            player=self.player, event=self.event, sumula_imortal=self.sumula, points=10)
+        PlayerScore.objects.create(
+            player=self.player, event=self.event, sumula_imortal=self.sumula, points=5)
+        PlayerScore.objects.create(
+            player=self.player2, event=self.event, sumula_imortal=self.sumula, points=3)
+        # Simula divergências na pontuação total
+        Player.objects.filter(pk=self.player.pk).update(total_score=2)
+        Player.objects.filter(pk=self.player2.pk).update(total_score=3)
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command('reconcile_total_scores', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reconcile_total_scores(self):
+        output = self.call_command()
+        self.player.refresh_from_db()
+        self.player2.refresh_from_db()
+        self.other_player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 15)
+        self.assertEqual(self.player2.total_score, 3)
+        self.assertEqual(self.other_player.total_score, 0)
+        self.assertIn('2 jogadores tiveram a pontuação total corrigida!', output)
+
+    def test_reconcile_total_scores_by_event(self):
+        self.call_command('--event', str(self.event.id))
+        self.player.refresh_from_db()
+        self.other_player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 15)
+        self.assertEqual(self.other_player.total_score, 7)
+
+    def test_reconcile_total_scores_dry_run(self):
+        output = self.call_command('--dry-run')
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 2)
+        self.assertIn(f'Jogador {self.player.id}', output)
+        self.assertNotIn(f'Jogador {self.player2.id}', output)
+
+    def test_reconcile_total_scores_without_drift(self):
+        self.call_command()
+        output = self.call_command()
+        self.assertIn('Nenhuma divergência encontrada!', output)
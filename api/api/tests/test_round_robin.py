@@ -0,0 +1,117 @@
+from itertools import combinations
+from django.test import SimpleTestCase, TestCase
+from ..round_robin import round_robin_schedule
+from ..views.base_views import BaseSumulaView
+from ..serializers import SumulaClassificatoriaSerializer
+from ..models import Event, Token, Match, Player, PlayerScore, SumulaClassificatoria
+import uuid
+
+
+class RoundRobinScheduleTestCase(SimpleTestCase):
+    def assert_valid_schedule(self, n: int):
+        schedule = round_robin_schedule(n)
+        self.assertEqual(len(schedule), n - 1 if n % 2 == 0 else n)
+        matches = []
+        for round_pairs in schedule:
+            seats = [seat for pair in round_pairs for seat in pair if seat]
+            # Cada jogador aparece exatamente uma vez por rodada
+            self.assertEqual(sorted(seats), list(range(1, n + 1)))
+            matches.extend(pair for pair in round_pairs if pair[1] is not None)
+        # Todos os jogadores jogam com todos os outros exatamente uma vez
+        self.assertEqual(sorted(matches), list(combinations(range(1, n + 1), 2)))
+
+    def test_even_number_of_players(self):
+        for n in [2, 4, 6, 8, 10, 16]:
+            self.assert_valid_schedule(n)
+
+    def test_odd_number_of_players(self):
+        for n in [3, 5, 7, 9, 15]:
+            self.assert_valid_schedule(n)
+
+    def test_odd_number_of_players_has_one_bye_per_round(self):
+        for round_pairs in round_robin_schedule(7):
+            byes = [pair for pair in round_pairs if pair[1] is None]
+            self.assertEqual(len(byes), 1)
+
+    def test_byes_are_evenly_distributed(self):
+        byes = [pair[0] for round_pairs in round_robin_schedule(5)
+                for pair in round_pairs if pair[1] is None]
+        self.assertEqual(sorted(byes), [1, 2, 3, 4, 5])
+
+    def test_insufficient_players(self):
+        with self.assertRaises(ValueError):
+            round_robin_schedule(1)
+
+    def test_schedule_is_memoized(self):
+        self.assertIs(round_robin_schedule(12), round_robin_schedule(12))
+
+
+class RoundRobinTournamentTestCase(TestCase):
+    def setUp(self):
+        self.event = Event.objects.create(
+            name='Evento 1', token=Token.objects.create())
+        self.sumula = SumulaClassificatoria.objects.create(
+            event=self.event, name='Chave A')
+
+    def create_players_score(self, n: int) -> list[PlayerScore]:
+        players = Player.objects.bulk_create([
+            Player(event=self.event, registration_email=f'{uuid.uuid4()}@gmail.com')
+            for _ in range(n)
+        ])
+        return PlayerScore.objects.bulk_create([
+            PlayerScore(event=self.event, player=player,
+                        sumula_classificatoria=self.sumula)
+            for player in players
+        ])
+
+    def test_seats_are_saved_with_a_single_query(self):
+        players_score = self.create_players_score(10)
+        with self.assertNumQueries(1):
+            matches = BaseSumulaView().round_robin_tournament(
+                10, players_score, self.sumula)
+        self.assertEqual(len({match.round_number for match in matches}), 9)
+        self.assertEqual(len(matches), 45)
+        self.assertEqual(
+            sorted(PlayerScore.objects.values_list('rounds_number', flat=True)),
+            list(range(1, 11)))
+
+    def test_already_seated_players_are_not_saved(self):
+        players_score = self.create_players_score(4)
+        for seat, player_score in enumerate(players_score, start=1):
+            player_score.rounds_number = seat
+        with self.assertNumQueries(0):
+            matches = BaseSumulaView().round_robin_tournament(
+                4, players_score, self.sumula)
+        self.assertEqual((matches[0].round_number, matches[0].seat_a), (1, 1))
+        self.assertEqual(matches[0].sumula_classificatoria, self.sumula)
+
+    def test_odd_number_of_players(self):
+        players_score = self.create_players_score(5)
+        matches = BaseSumulaView().round_robin_tournament(
+            5, players_score, self.sumula)
+        self.assertEqual(len({match.round_number for match in matches}), 5)
+        # Um jogador folga em cada rodada
+        self.assertEqual(
+            len([match for match in matches if match.seat_b is None]), 5)
+
+    def test_rounds_are_serialized_from_matches(self):
+        players_score = self.create_players_score(4)
+        Match.objects.bulk_create(BaseSumulaView().round_robin_tournament(
+            4, players_score, self.sumula))
+        # Os dados dos jogadores são lidos no momento da serialização, não ficam desatualizados
+        Player.objects.filter(id=players_score[0].player_id).update(
+            full_name='Nome Novo')
+        rounds = SumulaClassificatoriaSerializer(self.sumula).data['rounds']
+        self.assertEqual(len(rounds), 3)
+        self.assertEqual(rounds[0][0]['player1']['rounds_number'], 1)
+        self.assertEqual(rounds[0][0]['player1']
+                         ['player']['full_name'], 'Nome Novo')
+        self.assertEqual(
+            {pair['player2']['rounds_number'] for round_pairs in rounds for pair in round_pairs
+             if pair['player1']['rounds_number'] == 1}, {2, 3, 4})
+
+    def test_number_of_players_mismatch(self):
+        players_score = self.create_players_score(4)
+        with self.assertRaises(Exception):
+            BaseSumulaView().round_robin_tournament(
+                5, players_score, self.sumula)
@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import patch
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from api.models import Event, Player, Staff, Token
+from api.permissions import assign_permissions
+from api.search import trigram_available, trigram_installed
+from users.models import User
+import uuid
+
+
+def create_user(event: Event, group_name: str) -> User:
+    user = User.objects.create(
+        username=f'user_{uuid.uuid4().hex[:10]}', email=f'{uuid.uuid4()}@gmail.com')
+    user.events.add(event)
+    group, _ = Group.objects.get_or_create(name=group_name)
+    assign_permissions(user, group, event)
+    return user
+
+
+class TrigramSearchTestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not trigram_available(connection):
+            raise unittest.SkipTest('Extensões pg_trgm e unaccent indisponíveis no servidor')
+        super().setUpClass()
+
+
+class PlayersSearchViewTest(TrigramSearchTestCase):
+    def setUp(self):
+        self.event = Event.objects.create(name='Evento 1', token=Token.objects.create())
+        other_event = Event.objects.create(name='Evento 2', token=Token.objects.create())
+        Player.objects.bulk_create([
+            Player(event=self.event, full_name='João da Silva', registration_email='joao@gmail.com'),
+            Player(event=self.event, full_name='Maria Conceição', social_name='Lia',
+                   registration_email='maria@gmail.com'),
+            Player(event=self.event, full_name='Joana Souza', registration_email='joana@gmail.com'),
+            Player(event=self.event, full_name='Pedro Álvares', registration_email='pedro.alvares@unb.br'),
+            Player(event=other_event, full_name='João da Silva', registration_email='joao@gmail.com'),
+        ])
+        self.url = reverse('api:players-search')
+        self.client = APIClient()
+        self.client.force_authenticate(user=create_user(self.event, 'staff_member'))
+
+    def search(self, query: str, **params):
+        return self.client.get(self.url, {'event_id': self.event.id, 'q': query, **params})
+
+    def names(self, response) -> list[str]:
+        return [player['full_name'] for player in response.data]
+
+    def test_search_ignores_accents_and_case(self):
+        response = self.search('JOAO SILVA')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(response), ['João da Silva'])
+        self.assertEqual(self.names(self.search('conceicao')), ['Maria Conceição'])
+        self.assertEqual(self.names(self.search('alvarés')), ['Pedro Álvares'])
+
+    def test_search_social_name_and_email(self):
+        self.assertEqual(self.names(self.search('lia')), ['Maria Conceição'])
+        response = self.search('pedro.alvares@unb')
+        self.assertEqual(self.names(response), ['Pedro Álvares'])
+        self.assertEqual(response.data[0]['registration_email'], 'pedro.alvares@unb.br')
+
+    def test_search_tolerates_typos_and_ranks_by_similarity(self):
+        self.assertEqual(self.names(self.search('joao silvs')), ['João da Silva'])
+        response = self.search('joa')
+        self.assertEqual(self.names(response)[0], 'João da Silva')
+        similarities = [player['similarity'] for player in response.data]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+
+    def test_search_limit(self):
+        self.assertEqual(len(self.search('gmail', limit=2).data), 2)
+        for params in [{'limit': 0}, {'limit': 51}, {'limit': 'a'}]:
+            self.assertEqual(self.search('gmail', **params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_query_too_short(self):
+        self.assertEqual(self.search('j').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(' ').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_requires_change_player_permission(self):
+        self.client.force_authenticate(user=create_user(self.event, 'player'))
+        self.assertEqual(self.search('joao').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StaffSearchViewTest(TrigramSearchTestCase):
+    def setUp(self):
+        self.event = Event.objects.create(name='Evento 1', token=Token.objects.create())
+        Staff.objects.bulk_create([
+            Staff(event=self.event, full_name='Antônio Gonçalves', registration_email='antonio@gmail.com'),
+            Staff(event=self.event, full_name='Beatriz Lima', registration_email='beatriz@gmail.com',
+                  is_manager=True),
+        ])
+        self.url = reverse('api:staff-search')
+        self.client = APIClient()
+        self.client.force_authenticate(user=create_user(self.event, 'staff_manager'))
+
+    def test_search_staff(self):
+        response = self.client.get(self.url, {'event_id': self.event.id, 'q': 'antonio goncalves'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([staff['full_name'] for staff in response.data], ['Antônio Gonçalves'])
+        self.assertEqual(response.data[0]['registration_email'], 'antonio@gmail.com')
+
+    def test_search_staff_requires_permission(self):
+        self.client.force_authenticate(user=create_user(self.event, 'staff_member'))
+        response = self.client.get(self.url, {'event_id': self.event.id, 'q': 'beatriz'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@patch('api.search.trigram_installed', return_value=False)
+class ContainsSearchViewTest(APITestCase):
+    """Bancos em que a migração 0043 não criou a busca por trigramas."""
+
+    def setUp(self):
+        self.event = Event.objects.create(name='Evento 1', token=Token.objects.create())
+        Player.objects.bulk_create([
+            Player(event=self.event, full_name='João da Silva', registration_email='joao@gmail.com'),
+            Player(event=self.event, full_name='Maria Conceição', social_name='Lia',
+                   registration_email='maria@gmail.com'),
+        ])
+        Staff.objects.create(event=self.event, full_name='Antônio Gonçalves', registration_email='antonio@gmail.com')
+        self.client = APIClient()
+
+    def test_search_players(self, _):
+        self.client.force_authenticate(user=create_user(self.event, 'staff_member'))
+        response = self.client.get(reverse('api:players-search'), {'event_id': self.event.id, 'q': 'SILVA'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([player['full_name'] for player in response.data], ['João da Silva'])
+        self.assertIsNone(response.data[0]['similarity'])
+        response = self.client.get(reverse('api:players-search'), {'event_id': self.event.id, 'q': 'lia'})
+        self.assertEqual([player['full_name'] for player in response.data], ['Maria Conceição'])
+
+    def test_search_staff(self, _):
+        self.client.force_authenticate(user=create_user(self.event, 'staff_manager'))
+        response = self.client.get(reverse('api:staff-search'), {'event_id': self.event.id, 'q': 'gonçalves'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([staff['full_name'] for staff in response.data], ['Antônio Gonçalves'])
+
+    def test_trigram_installed_follows_migration(self, _):
+        # A migração cria a busca apenas quando as extensões estão disponíveis
+        # (trigram_installed foi importada antes do patch da classe)
+        self.assertEqual(trigram_installed(connection), trigram_available(connection))
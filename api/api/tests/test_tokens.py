@@ -0,0 +1,81 @@
+import csv
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from api.models import TOKEN_LENGTH, Event, Token
+from api.tokens import random_code, unique_codes
+from users.models import User
+
+
+class UniqueCodesTestCase(TestCase):
+    def test_random_code(self):
+        code = random_code(TOKEN_LENGTH)
+        self.assertEqual(len(code), TOKEN_LENGTH)
+        self.assertEqual(sum(char.isdigit() for char in code), 2)
+        self.assertTrue(all(char.isdigit() or char.isupper() for char in code))
+
+    def test_unique_codes_skip_existing(self):
+        Token.objects.create(token_code='ABCDEFG12')
+        codes = iter(['ABCDEFG12', 'ABCDEFG12', 'HIJKLMN34', 'OPQRSTU56'])
+        with patch('api.tokens.random_code', side_effect=lambda length: next(codes)), \
+                self.assertNumQueries(2):
+            self.assertCountEqual(unique_codes(Token, 'token_code', TOKEN_LENGTH, 2), ['HIJKLMN34', 'OPQRSTU56'])
+
+    def test_event_join_token(self):
+        event = Event.objects.create(token=Token.objects.create())
+        self.assertEqual(len(event.join_token), TOKEN_LENGTH)
+
+
+class MintTokensTestCase(TestCase):
+    def test_mint(self):
+        # Por lote: a consulta dos códigos e o INSERT, entre o SAVEPOINT e o RELEASE
+        with self.assertNumQueries(3 * 4):
+            tokens = Token.mint(2500, batch_size=1000)
+        self.assertEqual(len(tokens), 2500)
+        self.assertEqual(Token.objects.count(), 2500)
+        self.assertTrue(all(token.pk and len(token.token_code) == TOKEN_LENGTH for token in tokens))
+
+    def test_mint_retries_batch_on_conflict(self):
+        bulk_create = Token.objects.bulk_create
+        calls = []
+
+        def conflicting_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError('duplicate key value violates unique constraint')
+            return bulk_create(objs, *args, **kwargs)
+
+        with patch.object(Token.objects, 'bulk_create', side_effect=conflicting_bulk_create):
+            tokens = Token.mint(5)
+        self.assertEqual(calls, [5, 5])
+        self.assertEqual(len(tokens), 5)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('mint_tokens', 3, stdout=stdout, stderr=StringIO())
+        self.assertCountEqual(stdout.getvalue().split(), Token.objects.values_list('token_code', flat=True))
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'tokens.csv'
+            call_command('mint_tokens', 5, batch_size=2, output=str(output), stderr=StringIO())
+            rows = list(csv.reader(output.open(encoding='utf-8')))
+        self.assertEqual(rows[0], ['TOKEN', 'CRIADO EM'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(Token.objects.count(), 8)
+
+    def test_admin(self):
+        self.client.force_login(User.objects.create_superuser(
+            username='admin', email='admin@gmail.com', password='admin'))
+        url = reverse('admin:mint-tokens')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.post(url, {'count': 0}).status_code, 200)
+        response = self.client.post(url, {'count': 25})
+        self.assertRedirects(response, reverse('admin:api_token_changelist'))
+        self.assertEqual(Token.objects.count(), 25)
+        self.client.get(reverse('admin:create-10-tokens'))
+        self.assertEqual(Token.objects.count(), 35)
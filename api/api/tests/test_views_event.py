@@ -1,5 +1,5 @@
 
-from api.models import Token, Event
+from api.models import Token, Event, Staff, Player
 from users.models import User
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -10,6 +10,8 @@ from django.contrib.auth.models import Permission
 from ..utils import get_permissions, get_content_type
 from guardian.shortcuts import assign_perm, remove_perm
 from ..serializers import UserEventsSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 # class TokenViewTest(APITestCase):
@@ -221,6 +223,47 @@ class EventViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, self.expected_data)
 
+    def test_get_event_roles(self):
+        """Testa o cargo retornado para cada evento do usuário."""
+        events = {role: Event.objects.create(name=f'Evento {role}', token=Token.objects.create())
+                  for role in ['manager', 'staff', 'player', 'none']}
+        Staff.objects.create(event=events['manager'], user=self.user,
+                             registration_email=self.user.email, is_manager=True)
+        Staff.objects.create(event=events['staff'], user=self.user,
+                             registration_email=self.user.email)
+        Player.objects.create(event=events['player'], user=self.user)
+        # Um jogador que também é monitor recebe o cargo de monitor
+        Player.objects.create(event=events['staff'], user=self.user)
+        self.user.events.add(self.event, *events.values())
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('api:event'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        roles = {item['event']['id']: item['role'] for item in response.data}
+        self.assertEqual(roles, {
+            self.event.id: 'admin',
+            events['manager'].id: 'manager',
+            events['staff'].id: 'staff',
+            events['player'].id: 'player',
+        })
+
+    def test_get_event_number_of_queries(self):
+        """O número de queries não depende da quantidade de eventos do usuário."""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('api:event')
+        self.user.events.add(self.event)
+        with CaptureQueriesContext(connection) as single_event_queries:
+            self.client.get(url)
+        for i in range(20):
+            event = Event.objects.create(
+                name=f'Evento {i}', token=Token.objects.create())
+            Staff.objects.create(event=event, user=self.user,
+                                 registration_email=self.user.email, is_manager=i % 2 == 0)
+            self.user.events.add(event)
+        with CaptureQueriesContext(connection) as many_events_queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 21)
+        self.assertEqual(len(many_events_queries), len(single_event_queries))
+
     def test_get_event_unauthenticated(self):
         """Test getting an event without authentication."""
         url = reverse('api:event')
@@ -1,12 +1,20 @@
 
+import csv
 import random
+import warnings
+from io import BytesIO, StringIO
+from unittest.mock import patch
+import openpyxl
 from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from django.urls import reverse
 from rest_framework import status
 from api.models import Results, SumulaImortal, SumulaClassificatoria, Event,  Token, Player
 from users.models import User
 import uuid
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import Group
 from ..permissions import assign_permissions
 from guardian.shortcuts import remove_perm, get_perms
@@ -95,6 +103,46 @@ class PlayersViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 4)
 
+    def test_get_players_paginated(self):
+        self.client.force_authenticate(user=self.admin)
+        ids = sorted(player.id for player in [
+                     self.player1, self.player2, self.player3, self.player4])
+        response = self.client.get(f'{self.url_get}&limit=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([player['id'] for player in response.data['results']], ids[:3])
+        self.assertEqual(response.data['next_cursor'], ids[2])
+
+        response = self.client.get(
+            f"{self.url_get}&limit=3&cursor={response.data['next_cursor']}")
+        self.assertEqual([player['id'] for player in response.data['results']], ids[3:])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_get_players_fields_and_filters(self):
+        Player.objects.filter(pk=self.player1.pk).update(
+            full_name='Ana Souza', is_present=True)
+        Player.objects.filter(pk=self.player2.pk).update(
+            full_name='Bruno', social_name='Anita', is_present=True, is_imortal=True)
+        Player.objects.filter(pk=self.player3.pk).update(full_name='Ana Lima')
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            f'{self.url_get}&name=an&is_present=true&fields=full_name')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.player1.id, 'full_name': 'Ana Souza'},
+            {'id': self.player2.id, 'full_name': 'Bruno'},
+        ])
+        response = self.client.get(
+            f'{self.url_get}&is_imortal=false&is_present=true&fields=id,is_present')
+        self.assertEqual(response.data, [
+                         {'id': self.player1.id, 'is_present': True}])
+
+    def test_get_players_invalid_parameters(self):
+        self.client.force_authenticate(user=self.admin)
+        for query in ['fields=registration_email', 'is_present=sim', 'limit=0', 'limit=501', 'cursor=a']:
+            response = self.client.get(f'{self.url_get}&{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_all_players_unauthenticated(self):
         response = self.client.get(self.url_get)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -114,7 +162,7 @@ class PlayersViewTest(APITestCase):
 
     def test_get_all_players_with_invalid_event_id(self):
         self.client.force_authenticate(user=self.admin)
-        url = f"{reverse('api:players')}?event_id=100"
+        url = f"{reverse('api:players')}?event_id=99999"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
@@ -267,7 +315,7 @@ class GetPlayerResultsViewTest(APITestCase):
 
     def test_get_player_with_invalid_event_id(self):
         self.client.force_authenticate(user=self.user)
-        url = f"{reverse('api:player')}?event_id=100"
+        url = f"{reverse('api:player')}?event_id=99999"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(
@@ -390,6 +438,75 @@ class AddPlayersViewTest(APITestCase):
         players = Player.objects.filter(event=self.event)
         self.assertEqual(players.count(), 10)
 
+    def upload_csv(self, content: str, name: str = 'jogadores.csv'):
+        self.client.force_authenticate(user=self.admin)
+        uploaded_file = SimpleUploadedFile(
+            name, content.encode('utf-8'), content_type="multipart/form-data")
+        return self.client.post(self.url, {'file': uploaded_file}, format='multipart')
+
+    def test_add_players_csv_updates_existing_players(self):
+        player = Player.objects.create(
+            event=self.event, registration_email='joao@gmail.com', full_name='Nome Antigo')
+        response = self.upload_csv(
+            'Nome Completo;E-mail\n  joão DA silva ; JOAO@gmail.com \nMaria Souza;maria@gmail.com\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Player.objects.filter(event=self.event).count(), 2)
+        player.refresh_from_db()
+        self.assertEqual(player.full_name, 'João Da Silva')
+        self.assertTrue(player.is_present)
+
+    def test_add_players_csv_with_invalid_rows(self):
+        response = self.upload_csv(
+            'Nome Completo,E-mail\nJoão,joao@gmail.com\nMaria,email-invalido\n,pedro@gmail.com\nPaulo,\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['errors'].split()[0], '3')
+        self.assertEqual(response.data['rows'], [
+            {'row': 4, 'email': 'pedro@gmail.com',
+                'error': 'Nome ou email inválidos!'},
+            {'row': 5, 'email': None, 'error': 'Nome ou email inválidos!'},
+            {'row': 3, 'email': 'email-invalido', 'error': 'E-mail inválido!'},
+        ])
+        self.assertEqual(list(Player.objects.filter(event=self.event).values_list(
+            'registration_email', flat=True)), ['joao@gmail.com'])
+
+    def test_add_players_csv_without_valid_rows(self):
+        response = self.upload_csv(
+            'Nome Completo,E-mail\nJoão,joao\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'],
+                         'Nenhum jogador adicionado! Verifique os e-mails do arquivo!')
+        self.assertEqual(len(response.data['rows']), 1)
+
+    def test_add_players_csv_with_repeated_email(self):
+        response = self.upload_csv(
+            'Nome Completo,E-mail\nJoão,joao@gmail.com\nJoão Silva,joao@gmail.com\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        player = Player.objects.get(event=self.event)
+        self.assertEqual(player.full_name, 'João Silva')
+
+    def test_add_players_csv_with_missing_columns(self):
+        response = self.upload_csv('Nome Completo\nJoão\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {
+                         'errors': 'ERRO - Colunas ausentes no arquivo: e-mail'})
+
+    def test_add_players_csv_with_invalid_extension(self):
+        response = self.upload_csv(
+            'Nome Completo,E-mail\nJoão,joao@gmail.com\n', name='jogadores.txt')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'errors': 'Arquivo inválido!'})
+
+    def test_add_players_large_csv_with_one_query_per_chunk(self):
+        rows = ''.join(
+            f'Jogador {i},jogador{i}@gmail.com\n' for i in range(5000))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload_csv('Nome Completo,E-mail\n' + rows)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Player.objects.filter(event=self.event).count(), 5000)
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "api_player"')]
+        self.assertEqual(len(inserts), 3)
+
     def test_add_players_unauthenticated(self):
         data = {'file': self.csv_uploaded_file}
         response = self.client.post(self.url, data, format='multipart')
@@ -412,7 +529,7 @@ class AddPlayersViewTest(APITestCase):
 
     def test_add_players_with_invalid_event_id(self):
         self.client.force_authenticate(user=self.admin)
-        url = f"{reverse('api:upload-player')}?event_id=100"
+        url = f"{reverse('api:upload-player')}?event_id=99999"
         response = self.client.post(url, {'file': self.csv_uploaded_file})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(
@@ -498,7 +615,7 @@ class PublishPlayersResultsViewTestCase(APITestCase):
 
     def test_publish_results_with_invalid_event_id(self):
         self.client.force_authenticate(user=self.admin)
-        url = f"{reverse('api:publish-results-imortals')}?event_id=100"
+        url = f"{reverse('api:publish-results-imortals')}?event_id=99999"
         response = self.client.put(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(
@@ -681,3 +798,71 @@ class AddSinglePlayerViewTest(APITestCase):
         self.client.force_authenticate(user=self.user_not_admin)
         response = self.client.post(self.url, self.data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ExportPlayersViewTest(APITestCase):
+
+    def setUp(self):
+        self.event = Event.objects.create(name='Evento 1', token=Token.objects.create())
+        self.admin = User.objects.create(
+            username=f'user_{uuid.uuid4().hex[:10]}', email=f'{uuid.uuid4()}@gmail.com')
+        assign_permissions(self.admin, Group.objects.create(name='event_admin'), self.event)
+        Player.objects.bulk_create([
+            Player(event=self.event, full_name=f'Jogador {i}', social_name=f'Conceição {i}',
+                   registration_email=f'jogador{i}@gmail.com', total_score=i) for i in range(5)])
+        Player.objects.create(event=self.event, full_name='Imortal', registration_email='imortal@gmail.com',
+                              total_score=10, is_imortal=True)
+        self.url = f'{reverse("api:export-players")}?event_id={self.event.id}'
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def read_chunks(self, response) -> list[bytes]:
+        # O cliente de testes síncrono é WSGI: o corpo deve ser um iterador síncrono, sem o aviso do
+        # Django de que um iterador assíncrono seria lido inteiro para a memória
+        self.assertFalse(response.is_async)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            return list(response)
+
+    def test_export_xlsx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('jogadores_classificados.xlsx', response['Content-Disposition'])
+        workbook = openpyxl.load_workbook(BytesIO(b''.join(self.read_chunks(response))))
+        rows = list(workbook['Jogadores Classificados'].values)
+        self.assertEqual(rows[0], ('Nome Completo', 'Email', 'Nome Social'))
+        self.assertEqual(rows[1:], [(f'Jogador {i}', f'jogador{i}@gmail.com', f'Conceição {i}')
+                                    for i in range(1, 5)])
+
+    def test_export_csv_streams_in_chunks(self):
+        with patch('api.exports.EXPORT_CHUNK_SIZE', 2):
+            response = self.client.get(f'{self.url}&extension=csv')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            chunks = [chunk.decode('utf-8') for chunk in self.read_chunks(response)]
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(StringIO(''.join(chunks).lstrip('\ufeff'))))
+        self.assertEqual(rows[0], ['Nome Completo', 'Email', 'Nome Social'])
+        self.assertEqual(rows[1:], [[f'Jogador {i}', f'jogador{i}@gmail.com', f'Conceição {i}']
+                                    for i in range(1, 5)])
+
+    async def test_export_under_asgi(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.admin)}'}
+        with patch('api.exports.EXPORT_CHUNK_SIZE', 2):
+            response = await self.async_client.get(f'{self.url}&extension=csv', headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        response = await self.async_client.get(self.url, headers=headers)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(list(openpyxl.load_workbook(BytesIO(content))['Jogadores Classificados'].values)), 5)
+
+    def test_export_invalid_format(self):
+        response = self.client.get(f'{self.url}&extension=pdf')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_no_players(self):
+        Player.objects.filter(event=self.event).update(total_score=0)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -339,6 +339,22 @@ class AddStaffMembersTestCase(APITestCase):
         )
         self.assertIsNotNone(Staff.objects.filter(event=self.event))
 
+    def test_add_staff_members_updates_existing_staff(self):
+        staff = Staff.objects.create(
+            event=self.event, registration_email='joao@gmail.com', full_name='Nome Antigo', is_manager=True)
+        content = 'Nome Completo,E-mail\njoão silva,JOAO@gmail.com\nMaria,maria@gmail.com\nPedro,pedro\n'
+        uploaded_file = SimpleUploadedFile(
+            'monitores.csv', content.encode('utf-8'), content_type="multipart/form-data")
+        response = self.client.post(
+            self.url, {'file': uploaded_file}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['rows'], [
+                         {'row': 4, 'email': 'pedro', 'error': 'E-mail inválido!'}])
+        self.assertEqual(Staff.objects.filter(event=self.event).count(), 2)
+        staff.refresh_from_db()
+        self.assertEqual(staff.full_name, 'João Silva')
+        self.assertTrue(staff.is_manager)
+
     def test_add_staff_members_with_invalid_event_id(self):
         url = f'{reverse("api:upload-staff")}?event_id=99999'
         data = {'event_id': 999, 'file': self.excel_uploaded_file}
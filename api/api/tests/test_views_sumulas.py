@@ -1,6 +1,8 @@
 from django.forms import ValidationError
 from rest_framework.test import APITestCase
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.crypto import get_random_string
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -9,6 +11,7 @@ from users.models import User
 import uuid
 from ..utils import get_permissions, get_content_type
 from ..permissions import assign_permissions, filter_permissions
+from ..cache import invalidate_event_cache
 from ..serializers import SumulaForPlayerSerializer, SumulaImortalForPlayerSerializer, SumulaClassificatoriaForPlayerSerializer
 from django.contrib.auth.models import Group
 from guardian.shortcuts import remove_perm, assign_perm, get_perms
@@ -214,6 +217,43 @@ class SumulaViewTest(BaseSumulaViewTest):
         self.assertEqual(
             response.data['sumulas_imortal'][0]['referee'][0]['id'], self.staff1.id)
 
+    def create_sumulas_with_players(self, model, n_sumulas: int, n_players: int) -> None:
+        sumula_field = 'sumula_imortal' if model is SumulaImortal else 'sumula_classificatoria'
+        sumulas = model.objects.bulk_create(
+            [model(event=self.event, name=f'Chave {i}') for i in range(n_sumulas)])
+        players = Player.objects.bulk_create([
+            Player(event=self.event, registration_email=self.create_unique_email())
+            for _ in range(n_sumulas * n_players)])
+        PlayerScore.objects.bulk_create([
+            PlayerScore(event=self.event, player=player,
+                        **{sumula_field: sumulas[i // n_players]})
+            for i, player in enumerate(players)])
+        model.referee.through.objects.bulk_create([
+            model.referee.through(**{f'{model.__name__.lower()}_id': sumula.id, 'staff_id': staff.id})
+            for sumula in sumulas for staff in [self.staff1, self.staff2]])
+        # bulk_create não dispara os signals que invalidam o cache do evento
+        invalidate_event_cache(self.event.id)
+
+    def test_get_sumulas_number_of_queries(self):
+        """Benchmark: 200 sumulas com 8 jogadores cada são serializadas com o mesmo número de queries de 3 sumulas."""
+        self.client.force_authenticate(user=self.user_staff_manager)
+        with CaptureQueriesContext(connection) as few_sumulas_queries:
+            self.client.get(self.url_get)
+
+        self.create_sumulas_with_players(SumulaImortal, 100, 8)
+        self.create_sumulas_with_players(SumulaClassificatoria, 100, 8)
+        with CaptureQueriesContext(connection) as many_sumulas_queries:
+            response = self.client.get(self.url_get)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['sumulas_imortal']), 102)
+        self.assertEqual(len(response.data['sumulas_classificatoria']), 101)
+        sumula_imortal = next(
+            sumula for sumula in response.data['sumulas_imortal'] if sumula['name'] == 'Chave 0')
+        self.assertEqual(len(sumula_imortal['players_score']), 8)
+        self.assertEqual(len(sumula_imortal['referee']), 2)
+        self.assertEqual(len(many_sumulas_queries), len(few_sumulas_queries))
+
     def test_get_sumulas_unauthenticated(self):
         response = self.client.get(self.url_get)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -664,6 +704,100 @@ class SumulaClassificatoriaViewTest(BaseSumulaViewTest):
             self.url_update, self.data_update, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_update_sumula_with_string_ids_and_points(self):
+        for player_score in self.data_update['players_score']:
+            player_score['id'] = str(player_score['id'])
+            player_score['points'] = str(player_score['points'])
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response = self.client.put(
+            self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.player_score1.refresh_from_db()
+        self.assertIn(self.player_score1.points, [10, 15])
+
+    def test_update_sumula_with_invalid_points(self):
+        self.client.force_authenticate(user=self.user_staff_manager)
+        for field, value in [('points', -1), ('points', 'dez'), ('id', 'abc')]:
+            with self.subTest(field=field, value=value):
+                data = {**self.data_update, 'players_score': [
+                    {**player_score, field: value} for player_score in self.data_update['players_score']]}
+                response = self.client.put(self.url_update, data, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('Dados de pontuação inválidos!', response.data['errors'])
+
+    def test_update_sumula_with_imortal_players(self):
+        self.data_update['imortal_players'] = [{'id': self.player2.id}]
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response = self.client.put(
+            self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.player.refresh_from_db()
+        self.player2.refresh_from_db()
+        self.assertFalse(self.player.is_imortal)
+        self.assertTrue(self.player2.is_imortal)
+
+    def test_update_sumula_with_player_score_from_another_sumula(self):
+        self.data_update['players_score'][1]['id'] = self.player_score3.id
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response = self.client.put(
+            self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.player_score1.refresh_from_db()
+        self.player_score3.refresh_from_db()
+        self.assertEqual(self.player_score1.points, 0)
+        self.assertEqual(self.player_score3.points, 0)
+
+    def test_update_sumula_is_atomic(self):
+        self.data_update['imortal_players'] = [{'id': 100}]
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response = self.client.put(
+            self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.player_score1.refresh_from_db()
+        self.player.refresh_from_db()
+        self.sumula.refresh_from_db()
+        self.assertEqual(self.player_score1.points, 0)
+        self.assertEqual(self.player.total_score, 0)
+        self.assertTrue(self.sumula.active)
+
+    def test_update_sumula_recalculates_total_score(self):
+        PlayerScore.objects.create(
+            player=self.player, sumula_classificatoria=self.sumula2, event=self.event, points=7)
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response = self.client.put(
+            self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.total_score, 17)
+
+    def test_update_sumula_query_count_is_constant(self):
+        """O número de queries para encerrar uma sumula não depende do número de jogadores."""
+        self.client.force_authenticate(user=self.user_staff_manager)
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.put(self.url_update, self.data_update, format='json')
+
+        players = Player.objects.bulk_create([
+            Player(event=self.event, registration_email=self.create_unique_email())
+            for _ in range(8)
+        ])
+        scores = PlayerScore.objects.bulk_create([
+            PlayerScore(player=player, sumula_classificatoria=self.sumula3, event=self.event)
+            for player in players
+        ])
+        self.data_update['id'] = self.sumula3.id
+        self.data_update['players_score'] = [
+            {'id': score.id, 'points': 5, 'player': {'id': score.player_id}} for score in scores]
+        self.data_update['imortal_players'] = [
+            {'id': player.id} for player in players[:4]]
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self.client.put(
+                self.url_update, self.data_update, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # As únicas queries adicionais são as de validar e marcar os jogadores imortais
+        self.assertEqual(len(large_queries), len(small_queries) + 2)
+        self.assertEqual(Player.objects.filter(
+            id__in=[player.id for player in players], total_score=5).count(), 8)
+
     def tearDown(self):
         User.objects.all().delete()
         SumulaClassificatoria.objects.all().delete()
@@ -889,3 +1023,112 @@ class AddRefereeToSumulaTestCase(BaseSumulaViewTest):
         Group.objects.all().delete()
         Token.objects.all().delete()
         Staff.objects.all().delete()
+
+
+class GenerateSumulasTestCase(BaseSumulaViewTest):
+    def seed_players(self, event: Event, n: int) -> None:
+        Player.objects.bulk_create([
+            Player(event=event, registration_email=self.create_unique_email(),
+                   full_name=f'Jogador {i}', is_present=True)
+            for i in range(n)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.setUpEvent()
+        self.setupUser()
+        self.setUpGroup()
+        self.setUpPermissions()
+        self.url = f"{reverse('api:sumula-generate')}?event_id={self.event.id}"
+
+    def generate(self, event: Event):
+        url = f"{reverse('api:sumula-generate')}?event_id={event.id}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, format='json')
+        return response, len(queries)
+
+    def test_generate_sumulas(self):
+        self.seed_players(self.event, 20)
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response, _ = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        sumulas = SumulaClassificatoria.objects.filter(event=self.event)
+        self.assertEqual(
+            sorted(sumula.scores.count() for sumula in sumulas), [6, 6, 8])
+        self.assertEqual(PlayerScore.objects.filter(
+            event=self.event).values('player').distinct().count(), 20)
+        self.assertEqual(sorted(sumulas.values_list('name', flat=True)), [
+                         'Chave A', 'Chave B', 'Chave C'])
+        for sumula in sumulas:
+            self.assertEqual(
+                sorted(sumula.scores.values_list('rounds_number', flat=True)),
+                list(range(1, sumula.scores.count() + 1)))
+            self.assertEqual(sumula.matches.values('round_number').distinct().count(),
+                             sumula.scores.count() - 1)
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.is_sumulas_generated)
+
+    def test_generate_sumulas_ignores_absent_and_imortal_players(self):
+        self.seed_players(self.event, 8)
+        Player.objects.create(event=self.event, registration_email=self.create_unique_email(),
+                              is_present=False)
+        Player.objects.create(event=self.event, registration_email=self.create_unique_email(),
+                              is_present=True, is_imortal=True)
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response, _ = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(PlayerScore.objects.filter(event=self.event).count(), 8)
+
+    def test_generate_sumulas_with_insufficient_players(self):
+        self.seed_players(self.event, 5)
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response, _ = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SumulaClassificatoria.objects.exists())
+        self.event.refresh_from_db()
+        self.assertFalse(self.event.is_sumulas_generated)
+
+    def test_generate_sumulas_twice(self):
+        self.seed_players(self.event, 8)
+        self.client.force_authenticate(user=self.user_staff_manager)
+        self.generate(self.event)
+        response, _ = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(SumulaClassificatoria.objects.count(), 1)
+
+    def test_generate_sumulas_unauthorized(self):
+        self.seed_players(self.event, 8)
+        self.remove_permissions()
+        self.client.force_authenticate(user=self.user_staff_manager)
+        response, _ = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_generate_sumulas_query_count_is_constant(self):
+        """O número de queries não deve depender do número de jogadores (5000 jogadores)."""
+        large_event = Event.objects.create(
+            name='Evento 2', token=Token.objects.create())
+        assign_permissions(self.user_staff_manager,
+                           self.group_staff_manager, large_event)
+        self.seed_players(self.event, 40)
+        self.seed_players(large_event, 5000)
+        self.client.force_authenticate(user=self.user_staff_manager)
+
+        response, small_queries = self.generate(self.event)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response, large_queries = self.generate(large_event)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(PlayerScore.objects.filter(
+            event=large_event).count(), 5000)
+        self.assertEqual(SumulaClassificatoria.objects.filter(
+            event=large_event).count(), 625)
+
+    def tearDown(self) -> None:
+        Event.objects.all().delete()
+        SumulaClassificatoria.objects.all().delete()
+        Player.objects.all().delete()
+        PlayerScore.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        Token.objects.all().delete()
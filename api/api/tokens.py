@@ -0,0 +1,26 @@
+"""Geração dos códigos de uso único: os tokens de criação de eventos e os códigos de entrada dos eventos."""
+import secrets
+import string
+from django.db import models
+
+_random = secrets.SystemRandom()
+
+
+def random_code(length: int) -> str:
+    """Gera um código com length - 2 letras maiúsculas e 2 dígitos, embaralhados. Ex: 'QW7ERT2YU'."""
+    letters = [secrets.choice(string.ascii_uppercase) for _ in range(length - 2)]
+    numbers = [secrets.choice(string.digits) for _ in range(2)]
+    return ''.join(_random.sample(letters + numbers, length))
+
+
+def unique_codes(model: type[models.Model], field: str, length: int, count: int) -> list[str]:
+    """Gera count códigos distintos que ainda não existem em model.field.
+    Os candidatos de cada rodada são verificados com uma única query; apenas os que colidiram
+    (raros: há mais de 10^11 códigos possíveis) são gerados novamente.
+    """
+    codes: set[str] = set()
+    while len(codes) < count:
+        candidates = {random_code(length) for _ in range(count - len(codes))} - codes
+        taken = set(model.objects.filter(**{f'{field}__in': candidates}).values_list(field, flat=True))
+        codes |= candidates - taken
+    return list(codes)
@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path, re_path
 from django.http import JsonResponse
-from .views.views_event import EventView, ResultsView, PublishFinalResults, PublishImortalsResults
-from .views.views_staff import StaffView, AddStaffManager, AddStaffMembers, AddSingleStaff, DeleteAllStaffs
-from .views.views_players import PlayersView, GetPlayerResults, AddPlayersExcel, AddSinglePlayer, DeleteAllPlayers, GetNotImortalPlayers, ExportPlayersView
+from .views.views_event import EventView, ResultsView, LeaderboardView, PublishFinalResults, PublishImortalsResults
+from .views.views_staff import StaffView, StaffSearchView, AddStaffManager, AddStaffMembers, AddSingleStaff, DeleteAllStaffs
+from .views.views_players import PlayersView, PlayersSearchView, GetPlayerResults, AddPlayersExcel, AddSinglePlayer, DeleteAllPlayers, GetNotImortalPlayers, ExportPlayersView
+from .views.views_stream import EventStreamView
+from .metrics import metrics
 from .views.views_sumulas import SumulasView, ActiveSumulaView, FinishedSumulaView, GetSumulaForPlayer, SumulaImortalView, SumulaClassificatoriaView, AddRefereeToSumulaView, GenerateSumulas
 
 app_name = 'api'
@@ -20,12 +22,15 @@ def health_check(request):
 urlpatterns = [
     # Health check
     path('health/', health_check, name='health'),
+    path('metrics/', metrics, name='metrics'),
 
     # Rotas de evento e token
     #     path('token/', TokenView.as_view(), name='token'),
     path('event/', EventView.as_view(), name='event'),
     path('results/', ResultsView.as_view(), name='results'),
     path('results/player/', GetPlayerResults.as_view(), name='player'),
+    path('results/leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('event/stream/', EventStreamView.as_view(), name='event-stream'),
     path('publish/results/imortals/', PublishImortalsResults.as_view(),
          name='publish-results-imortals'),
     path('publish/results/final',
@@ -46,6 +51,7 @@ urlpatterns = [
 
     # Rotas de jogadores
     path('players/', PlayersView.as_view(), name='players'),
+    path('players/search/', PlayersSearchView.as_view(), name='players-search'),
     path('upload-player/', AddPlayersExcel.as_view(), name='upload-player'),
     path('player/add/', AddSinglePlayer.as_view(), name='add-player'),
     path('players/delete/', DeleteAllPlayers.as_view(), name='delete-players'),
@@ -54,6 +60,7 @@ urlpatterns = [
     path('players/export/', ExportPlayersView.as_view(), name='export-players'),
     # Rotas de staff
     path('staff/', StaffView.as_view(), name='staff'),
+    path('staff/search/', StaffSearchView.as_view(), name='staff-search'),
     path('staff/add', AddSingleStaff.as_view(), name='add-staff'),
     path('staff-manager/', AddStaffManager.as_view(), name='staff-manager'),
     path('upload-staff/', AddStaffMembers.as_view(), name='upload-staff'),
@@ -1,14 +1,27 @@
-from ..models import Event, PlayerScore, Staff, SumulaImortal, SumulaClassificatoria, Player
-from ..serializers import PlayerScoreForRoundRobinSerializer
-from io import StringIO
+from ..models import Event, LeaderboardEntry, Match, PlayerScore, Staff, SumulaImortal, SumulaClassificatoria, Player
+from ..round_robin import round_robin_schedule
+from ..scores import recalculate_total_scores
+from ..querysets import with_sumula_relations
+from ..cache import aget_cached_event_payload, get_cached_event_payload, SUMULAS_PAYLOAD, ACTIVE_SUMULAS_PAYLOAD, FINISHED_SUMULAS_PAYLOAD
+from ..serializers import SumulaSerializer
+from ..ingestion import read_table_chunks, TabularImporter, IMPORT_COLUMNS
+from ..utils import handle_400_error
 from django.db import transaction
 # from django.db.models import BaseManager
-import chardet
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.deprecation import MiddlewareMixin
 from django.forms import ValidationError
-from rest_framework.views import APIView
+from django.utils.http import parse_etags
+from django.utils.functional import classproperty
+from asgiref.sync import sync_to_async
+from inspect import iscoroutinefunction
+from rest_framework import status, response
+from adrf.views import APIView
 from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
 import logging
+import os
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +33,17 @@ SUMULA_NOT_FOUND_ERROR_MESSAGE = "Sumula não encontrada!"
 
 
 class BaseView(APIView):
+    # Máximo de queries por método HTTP, ex.: {'GET': 5}. Verificado pelo api.metrics.RequestMetricsMiddleware.
+    # Inclui a query do JWTAuthentication que carrega o usuário, que o force_authenticate dos testes não faz
+    query_budget: dict[str, int] = {}
+
+    @classproperty
+    def view_is_async(cls) -> bool:
+        """A view é assíncrona quando o seu GET é assíncrono (async def).
+        Os outros métodos, síncronos, rodam em uma thread com sync_to_async, como o Django faz com views síncronas no ASGI.
+        """
+        return iscoroutinefunction(getattr(cls, 'get', None))
+
     def get_event(self) -> Event:
         """ Verifica se o evento existe.
         Retorna o evento associado ao id fornecido ou uma exceção.
@@ -36,136 +60,141 @@ class BaseView(APIView):
             raise ValidationError(EVENT_NOT_FOUND_ERROR_MESSAGE)
         return event
 
-    def treat_name_and_email_excel(self, name: str, email: str) -> tuple[str, str]:
-        """Trata o nome e o email de um jogador para serem inseridos no banco de dados."""
-        if name.__class__ != str or email.__class__ != str:
-            raise ValidationError('Nome ou email inválidos!')
-        name = name.strip().lower()
-        email = email.strip().lower()
-        for word in name.split():
-            name = name.replace(word, word.capitalize())
-        return name, email
-
-    def treat_csv(self, file) -> tuple[StringIO, str]:
-        """Trata um arquivo CSV para ser lido pelo pandas.
-        Lidando com a codificação do arquivo e convertendo-o em um StringIO.
+    async def aget_event(self) -> Event:
+        """Versão assíncrona de get_event."""
+        if 'event_id' not in self.request.query_params:
+            raise ValidationError(EVENT_ID_NOT_PROVIDED_ERROR_MESSAGE)
+        event_id = self.request.query_params.get('event_id')
+        if not event_id:
+            raise ValidationError(EVENT_ID_NOT_PROVIDED_ERROR_MESSAGE)
+        event = await Event.objects.filter(id=event_id).afirst()
+        if not event:
+            raise ValidationError(EVENT_NOT_FOUND_ERROR_MESSAGE)
+        return event
+
+    async def acheck_object_permissions(self, request, obj) -> None:
+        """Versão assíncrona de check_object_permissions (as permissões do guardian consultam o banco)."""
+        await sync_to_async(self.check_object_permissions)(request, obj)
+
+    def not_modified(self, etag: Optional[str]) -> Optional[response.Response]:
+        """Retorna uma resposta 304 se o cliente já possui a versão identificada pela ETag (If-None-Match).
+        Deve ser chamado depois das verificações de permissão, para não revelar se o evento mudou.
         """
-        raw_data = file.read()
-        detection = chardet.detect(raw_data)
-        encoding = detection['encoding']
-        file_data = raw_data.decode(encoding)
-        # Converte a string em um StringIO, que pode ser lido pelo pandas
-        csv_data = StringIO(file_data)
-        return csv_data, encoding
-
-    def get_delimiter(self, csv_data):
-        first_line = csv_data.readline()
-        csv_data.seek(0)  # Resetar o ponteiro para o início do arquivo
-        if ';' in first_line:
-            return ';'
-        else:
-            return ','
+        if etag is None:
+            return None
+        etags = parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in etags or etag in [tag.removeprefix('W/') for tag in etags]:
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers=self.etag_headers(etag))
+        return None
+
+    def etag_headers(self, etag: Optional[str]) -> dict[str, str]:
+        """Cabeçalhos das leituras com ETag: o cliente pode guardar a resposta, mas deve revalidá-la sempre."""
+        if etag is None:
+            return {}
+        return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+
+class BaseImportView(BaseView):
+    """Classe base para as views de importação de planilhas (CSV, XLSX ou XLS) com nome completo e e-mail.
+    As subclasses definem o modelo importado, os campos atualizados em registros já existentes e as mensagens.
+    """
+    parser_classes = [MultiPartParser]
+    import_model = None
+    import_update_fields: list[str] = []
+    import_defaults: dict = {}
+    success_message = ''
+    partial_errors_message = ''  # Formatada com o número de linhas recusadas
+    no_rows_imported_message = ''
+
+    def import_file(self, event: Event) -> response.Response:
+        """Importa o arquivo enviado na requisição e monta a resposta com o relatório de erros por linha."""
+        try:
+            excel_file = self.get_excel_file()
+        except ValidationError as e:
+            return handle_400_error(str(e))
+
+        # Obtém a última extensão do arquivo
+        extension = os.path.splitext(excel_file.name)[-1].lower().strip('.')
+        try:
+            # Lê o arquivo em blocos usando a extensão correta
+            chunks = read_table_chunks(excel_file, extension, IMPORT_COLUMNS)
+        except ValueError as e:
+            return handle_400_error(str(e))
+        except Exception:
+            return handle_400_error('Arquivo inválido!')
+        if chunks is None:
+            return handle_400_error('Arquivo inválido!')
+
+        importer = TabularImporter(self.import_model, event,
+                                   update_fields=self.import_update_fields, defaults=self.import_defaults)
+        try:
+            result = importer.run(chunks)
+        except Exception as e:
+            return handle_400_error(str(e))
+
+        if result.errors_count >= result.total:
+            return response.Response(status=status.HTTP_400_BAD_REQUEST, data={
+                'errors': self.no_rows_imported_message,
+                'rows': result.errors
+            })
+        if result.errors_count > 0:
+            return response.Response(status=status.HTTP_201_CREATED, data={
+                'message': self.success_message,
+                'errors': self.partial_errors_message.format(result.errors_count),
+                'rows': result.errors
+            })
+        return response.Response(status=status.HTTP_201_CREATED, data=self.success_message)
+
+    def get_excel_file(self) -> UploadedFile:
+        """Retorna o arquivo enviado na requisição.
+        - ValidationError: Se o arquivo não foi enviado ou é inválido.
+        """
+        excel_file = self.request.data.get('file')
+        if not isinstance(excel_file, UploadedFile):
+            raise ValidationError('Arquivo inválido!')
+        if not excel_file:
+            raise ValidationError('Arquivo não encontrado!')
+        if not excel_file.name:
+            raise ValidationError('Arquivo inválido!')
+        return excel_file
 
 
 class BaseSumulaView(BaseView):
     """Classe base para as views de sumula. Contém métodos comuns a todas as views de sumula."""
 
-    def round_robin_tournament(self, n: int, players_score: list[PlayerScore]) -> list[list[dict[dict]]] | Exception:
-        """Gera os pares de jogadores para um torneio com n-1 rodadas.
-        Todos os jogadores jogam com todos os outros jogadores em formato de duplas"""
+    def round_robin_tournament(self, n: int, players_score: list[PlayerScore], sumula: SumulaImortal | SumulaClassificatoria) -> list[Match] | Exception:
+        """Gera as duplas de um torneio com n-1 rodadas (n rodadas para n ímpar).
+        Todos os jogadores jogam com todos os outros jogadores em formato de duplas.
+
+        O número do assento de cada jogador é salvo em rounds_number com um único bulk_update.
+        Retorna as duplas (Match) da sumula ainda não salvas, para que possam ser criadas em lote.
+        """
 
         if len(players_score) != n:
             raise Exception(
                 "Número de jogadores não corresponde ao número fornecido!")
 
-        if n % 2 != 0:
-            players_score.append(None)
-            n += 1
-
-        ordem = {
-            4: [
-                [(1, 2), (3, 4)],
-                [(1, 3), (2, 4)],
-                [(1, 4), (2, 3)]
-            ],
-            6: [
-                [(1, 2), (3, 4), (5, 6)],
-                [(1, 3), (2, 5), (4, 6)],
-                [(1, 4), (2, 3), (5, 6)],
-                [(1, 5), (2, 4), (3, 6)],
-                [(1, 6), (2, 5), (3, 4)]
-            ],
-            8: [
-                [(1, 2), (3, 4), (5, 6), (7, 8)],
-                [(1, 3), (2, 4), (5, 7), (6, 8)],
-                [(1, 4), (2, 3), (5, 8), (6, 7)],
-                [(1, 5), (2, 6), (3, 7), (4, 8)],
-                [(1, 6), (2, 5), (3, 8), (4, 7)],
-                [(1, 7), (2, 8), (3, 5), (4, 6)],
-                [(1, 8), (2, 7), (3, 6), (4, 5)]
-            ]
-        }
-
-        if n not in ordem:
-            raise Exception(
-                "Número de jogadores insuficiente para formar duplas!")
-
-        # Mapear os jogadores para os seus respectivos números
-        player_map = {i + 1: players_score[i] for i in range(n)}
-
-        # Gerar os pares de jogadores conforme a ordem predefinida
-        numbered_rounds = []
-        # print('length players_score', len(players_score))
-        for round_pairs in ordem[n]:
-            numbered_round = []
-            for p1, p2 in round_pairs:
-                player1 = player_map[p1]
-                player2 = player_map[p2] if p2 <= len(players_score) else None
-                # print(f"p1: {p1} p2: {p2}")
-                # print(f"player1: {player1} player2: {player2}")
-                if player1 is not None and player1.rounds_number == 0:
-                    player1.rounds_number = p1
-                    player1.save()
-                if player2 is not None and player2.rounds_number == 0:
-                    player2.rounds_number = p2
-                    player2.save()
-                numbered_round.append((player1, player2))
-            numbered_rounds.append(numbered_round)
-
-        # Caso o número de jogadores seja ímpar (5 ou 7), garantir que um jogador jogue sozinho a cada rodada
-        # if n % 2 != 0:
-        #     print("Jogador sozinho NUMERO IMPAR")
-        #     for i, round in enumerate(numbered_rounds):
-        #         for j, pair in enumerate(round):
-        #             if pair[1] is None:
-        #                 player1 = pair[0]
-        #                 player1.rounds_number = ordem[n][i][j][0]
-        #                 numbered_rounds[i][j] = (player1, None)
-
-        # Serializar os dados corretamente
-        serialized_rounds = []
-        for round in numbered_rounds:
-            serialized_round = []
-            for pair in round:
-                serialized_pair = {
-                    'player1': PlayerScoreForRoundRobinSerializer(pair[0]).data if pair[0] else None,
-                    'player2': PlayerScoreForRoundRobinSerializer(pair[1]).data if pair[1] else None
-                }
-                serialized_round.append(serialized_pair)
-            serialized_rounds.append(serialized_round)
-        # k = 1
-        # for round in serialized_rounds:
-        #     print(f"Rodada {k}")
-        #     for pair in round:
-        #         if pair['player2'] is None:
-        #             print(
-        #                 f"{pair['player1']['player']['full_name']} {pair['player1']['rounds_number']} E {pair['player2']} ")
-        #         else:
-        #             print(
-        #                 f"{pair['player1']['player']['full_name']} {pair['player1']['rounds_number']} E {pair['player2']['rounds_number']} {pair['player2']['player']['full_name']}")
-        #     k += 1
-
-        return serialized_rounds
+        try:
+            schedule = round_robin_schedule(n)
+        except ValueError as e:
+            raise Exception(str(e))
+
+        seated_players = []
+        for seat, player in enumerate(players_score, start=1):
+            if player.rounds_number == 0:
+                player.rounds_number = seat
+                seated_players.append(player)
+        if seated_players:
+            PlayerScore.objects.bulk_update(seated_players, ['rounds_number'])
+
+        sumula_field = 'sumula_imortal' if isinstance(
+            sumula, SumulaImortal) else 'sumula_classificatoria'
+        return [
+            Match(**{sumula_field: sumula}, round_number=round_number,
+                  seat_a=seat_a, seat_b=seat_b)
+            for round_number, round_pairs in enumerate(schedule, start=1)
+            for seat_a, seat_b in round_pairs
+        ]
 
     def validate_request_data_dict(self, data):
         """Valida se os dados fornecidos na requisição estão no formato correto."""
@@ -206,7 +235,9 @@ class BaseSumulaView(BaseView):
         return True
 
     def get_sumulas(self, event: Event, active: bool = None) -> tuple[SumulaClassificatoria, SumulaImortal]:
-        """Retorna as sumulas de um evento de acordo com o parâmetro active."""
+        """Retorna as sumulas de um evento de acordo com o parâmetro active.
+        As pontuações, os jogadores e os árbitros das sumulas já vêm carregados (prefetch).
+        """
         if active is None:
             sumula_imortal = SumulaImortal.objects.filter(
                 event=event).order_by('name')
@@ -217,7 +248,33 @@ class BaseSumulaView(BaseView):
                 event=event, active=active).order_by('name')
             sumula_classificatoria = SumulaClassificatoria.objects.filter(
                 event=event, active=active).order_by('name')
-        return sumula_imortal, sumula_classificatoria
+        return with_sumula_relations(sumula_imortal), with_sumula_relations(sumula_classificatoria)
+
+    def get_sumulas_data(self, event: Event, active: bool = None) -> dict:
+        """Retorna as sumulas do evento já serializadas, usando o cache de leituras do evento.
+        O cache é invalidado sempre que uma sumula, pontuação, jogador ou árbitro do evento é alterado.
+        """
+        name = SUMULAS_PAYLOAD if active is None else ACTIVE_SUMULAS_PAYLOAD if active else FINISHED_SUMULAS_PAYLOAD
+
+        def build() -> dict:
+            sumulas_imortal, sumulas_classificatoria = self.get_sumulas(
+                event=event, active=active)
+            return SumulaSerializer(
+                {'sumulas_classificatoria': sumulas_classificatoria, 'sumulas_imortal': sumulas_imortal}).data
+        return get_cached_event_payload(event.id, name, build)
+
+    async def aget_sumulas_data(self, event: Event, active: bool = None) -> dict:
+        """Versão assíncrona de get_sumulas_data."""
+        name = SUMULAS_PAYLOAD if active is None else ACTIVE_SUMULAS_PAYLOAD if active else FINISHED_SUMULAS_PAYLOAD
+
+        async def build() -> dict:
+            sumulas_imortal, sumulas_classificatoria = self.get_sumulas(
+                event=event, active=active)
+            return SumulaSerializer({
+                'sumulas_classificatoria': [sumula async for sumula in sumulas_classificatoria],
+                'sumulas_imortal': [sumula async for sumula in sumulas_imortal],
+            }).data
+        return await aget_cached_event_payload(event.id, name, build)
 
     def create_players_score(self, players: list, sumula: SumulaImortal | SumulaClassificatoria, event: Event,) -> list[PlayerScore] | ValidationError:
         """Cria uma lista de PlayerScore associados a uma sumula."""
@@ -259,44 +316,71 @@ class BaseSumulaView(BaseView):
                 sumula.referee.add(staff)
         sumula.save()
 
-    def update_player_score(self, players_score: list[dict]) -> bool:
-        """Atualiza a pontuação de um jogador."""
+    def update_player_score(self, players_score: list[dict], sumula: SumulaImortal | SumulaClassificatoria, event: Event) -> bool:
+        """Atualiza a pontuação dos jogadores de uma sumula em lote.
+        Os PlayerScores são carregados com uma única query, validados em memória contra a sumula
+        e o evento e salvos com bulk_update. A pontuação total é recalculada uma vez por jogador.
+        Ids e pontos podem ser enviados como números ou textos numéricos; pontos negativos ou que não
+        são inteiros são recusados (a coluna points não aceita valores negativos).
+        """
+        points_by_id = {}
         for player_score in players_score:
-            player_score_id = player_score.get('id')
-            if player_score_id is None:
+            try:
+                player_score_id = int(player_score.get('id'))
+                points = int(player_score.get('points'))
+            except (TypeError, ValueError):
+                return False
+            if points < 0:
                 return False
-            player_score_obj = PlayerScore.objects.filter(
-                id=player_score_id).first()
-            if not player_score_obj:
+            points_by_id[player_score_id] = points
+
+        sumula_field = 'sumula_imortal_id' if isinstance(
+            sumula, SumulaImortal) else 'sumula_classificatoria_id'
+        player_score_objs = list(PlayerScore.objects.select_for_update().filter(
+            id__in=points_by_id.keys()).only('id', 'points', 'player_id', 'event_id', sumula_field))
+        if len(player_score_objs) != len(points_by_id):
+            return False
+        for player_score_obj in player_score_objs:
+            if player_score_obj.event_id != event.id or getattr(player_score_obj, sumula_field) != sumula.id:
                 return False
-            player_score_obj.points = player_score['points']
-            player_score_obj.save()
+            player_score_obj.points = points_by_id[player_score_obj.id]
+
+        PlayerScore.objects.bulk_update(player_score_objs, ['points'])
+        player_ids = {player_score_obj.player_id for player_score_obj in player_score_objs}
+        recalculate_total_scores(Player.objects.filter(id__in=player_ids))
+        LeaderboardEntry.refresh(event.id, player_ids)
         return True
 
+    def mark_players_as_imortal(self, players: list[dict], event: Event) -> None | ValidationError:
+        """Marca os jogadores fornecidos como imortais com uma única query de atualização."""
+        player_ids = {player.get('id')
+                      for player in players if player.get('id') is not None}
+        if not player_ids:
+            return
+        players_found = Player.objects.filter(id__in=player_ids, event=event)
+        if players_found.count() != len(player_ids):
+            raise ValidationError("Jogador não encontrado!")
+        players_found.update(is_imortal=True)
+
     def update_sumula(self, sumula: SumulaImortal | SumulaClassificatoria, event: Event) -> None | ValidationError:
-        """Atualiza uma sumula."""
+        """Atualiza uma sumula.
+        Todas as alterações são feitas em uma única transação.
+        """
         players_score = self.request.data['players_score']
 
-        if not self.update_player_score(players_score):
-            raise ValidationError("Dados de pontuação inválidos!")
-
-        if 'imortal_players' in self.request.data:
-            players = self.request.data['imortal_players']
-            for player in players:
-                player_id = player.get('id')
-                if player_id is None:
-                    continue
-                player_obj = Player.objects.filter(id=player_id).first()
-                if not player_obj:
-                    raise ValidationError("Jogador não encontrado!")
-                player_obj.is_imortal = True
-                player_obj.save()
-
-        sumula.description = self.request.data['description']
-        sumula.active = False
-        if sumula.__class__ != SumulaImortal:
-            sumula.name = self.request.data['name']
-        sumula.save()
+        with transaction.atomic():
+            if not self.update_player_score(players_score, sumula=sumula, event=event):
+                raise ValidationError("Dados de pontuação inválidos!")
+
+            if 'imortal_players' in self.request.data:
+                self.mark_players_as_imortal(
+                    self.request.data['imortal_players'], event=event)
+
+            sumula.description = self.request.data['description']
+            sumula.active = False
+            if sumula.__class__ != SumulaImortal:
+                sumula.name = self.request.data['name']
+            sumula.save()
 
     def validate_if_staff_is_sumula_referee(self, sumula: SumulaClassificatoria | SumulaImortal, event: Event) -> Exception | Staff:
         staff = Staff.objects.filter(
@@ -1,26 +1,34 @@
 from typing import Optional
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import Group
 
+from django.db.models import Case, CharField, Exists, OuterRef, QuerySet, Value, When
 from django.forms import ValidationError
 from rest_framework import status, request, response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import BasePermission
 
 from ..views.base_views import BaseView
-from api.models import Token, Event, Staff, Player, Results
-from ..serializers import EventSerializer, PlayerResultsSerializer, UserEventsSerializer, ResultsSerializer
+from api.models import LeaderboardEntry, Token, Event, Staff, Player, Results
+from ..serializers import EventSerializer, LeaderboardEntrySerializer, PlayerResultsSerializer, UserEventsSerializer, ResultsSerializer
 from ..utils import handle_400_error
 from ..swagger import Errors, manual_parameter_event_id
 from ..permissions import assign_permissions
+from ..live import publish_event_update
+from ..cache import aget_cached_event_payload, aget_event_etag, RESULTS_PAYLOAD
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework.utils.urls import replace_query_param
 
 TOKEN_NOT_PROVIDED_ERROR_MESSAGE = "Token não fornecido!"
 TOKEN_NOT_FOUND_ERROR_MESSAGE = "Token não encontrado!"
 TOKEN_ALREADY_USED_ERROR_MESSAGE = "Token já utilizado para criação de evento!"
 EVENT_NOT_FOUND_ERROR_MESSAGE = "Nenhum evento encontrado!"
 EVENT_DOES_NOT_EXIST_ERROR_MESSAGE = "Este evento não existe!"
+LEADERBOARD_ETAG = 'leaderboard'
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
 
 
 # class TokenPermissions(BasePermission):
@@ -99,6 +107,22 @@ class EventView(BaseView):
         self.token.save()
         return response.Response(status=status.HTTP_200_OK)
 
+    def get_events_with_role(self, user) -> QuerySet[Event]:
+        """Retorna os eventos do usuário anotados com o maior cargo dele em cada evento, em uma única query.
+        Os cargos são resolvidos com Exists sobre Staff e Player, na ordem: admin, manager, staff e player.
+        Eventos em que o usuário não possui cargo não são retornados.
+        """
+        staff = Staff.objects.filter(event=OuterRef('pk'), user=user)
+        player = Player.objects.filter(event=OuterRef('pk'), user=user)
+        return user.events.annotate(role=Case(
+            When(admin_email=user.email, then=Value('admin')),
+            When(Exists(staff.filter(is_manager=True)), then=Value('manager')),
+            When(Exists(staff), then=Value('staff')),
+            When(Exists(player), then=Value('player')),
+            default=None,
+            output_field=CharField(),
+        )).filter(role__isnull=False)
+
     @ swagger_auto_schema(
         tags=['event'],
         operation_summary="Retorna todos os eventos associados ao usuário logado e seu cargo no evento.",
@@ -112,33 +136,13 @@ class EventView(BaseView):
         responses={200: openapi.Response(
             'OK', UserEventsSerializer), **Errors([400]).retrieve_erros()}
     )
-    def get(self, request: request.Request, *args, **kwargs):
+    async def get(self, request: request.Request, *args, **kwargs):
         """Retorna todos os eventos associados ao usuário que fez a requisição.
         E o cargo dele no evento.
         """
-        events = request.user.events.all()
-        data_to_serialize = []
-        for event in events:
-            if event.admin_email == request.user.email:
-                data_to_serialize.append(
-                    {'event': event, 'role': 'admin'})
-                continue
-            staff = Staff.objects.filter(
-                event=event, user=request.user).first()
-            if staff and staff.is_manager:
-                data_to_serialize.append(
-                    {'event': event, 'role': 'manager'})
-                continue
-            elif staff:
-                data_to_serialize.append(
-                    {'event': event, 'role': 'staff'})
-                continue
-            else:
-                player = Player.objects.filter(
-                    event=event, user=request.user).first()
-                if player:
-                    data_to_serialize.append(
-                        {'event': event, 'role': 'player'})
+        events = self.get_events_with_role(request.user)
+        data_to_serialize = [{'event': event, 'role': event.role}
+                             async for event in events]
         data = UserEventsSerializer(data_to_serialize, many=True).data
         return response.Response(status=status.HTTP_200_OK, data=data)
 
@@ -281,6 +285,14 @@ class EventView(BaseView):
         return True
 
 
+def publish_results_update(event: Event) -> None:
+    """Avisa as conexões SSE do evento que a publicação dos resultados mudou."""
+    publish_event_update(event.id, 'results_updated', {
+        'is_imortal_results_published': event.is_imortal_results_published,
+        'is_final_results_published': event.is_final_results_published,
+    })
+
+
 class ResultsPermissions(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method == 'PUT':
@@ -294,6 +306,7 @@ class ResultsPermissions(BasePermission):
 
 class ResultsView(BaseView):
     permission_classes = [IsAuthenticated, ResultsPermissions]
+    query_budget = {'GET': 14}
 
     @swagger_auto_schema(
         operation_description="""
@@ -365,6 +378,7 @@ class ResultsView(BaseView):
         event.is_final_results_published = True
         # event.is_imortal_results_published = True
         event.save()
+        publish_results_update(event)
         return response.Response(status=status.HTTP_200_OK, data='Resultados atribuídos e publicados com sucesso!')
 
     @swagger_auto_schema(
@@ -394,6 +408,7 @@ class ResultsView(BaseView):
         event.is_final_results_published = False
         event.is_imortal_results_published = False
         event.save()
+        publish_results_update(event)
         return response.Response(status=status.HTTP_200_OK, data='Resultados deletados com sucesso.')
 
     @swagger_auto_schema(
@@ -446,20 +461,108 @@ class ResultsView(BaseView):
             ),
         ), **Errors([400]).retrieve_erros()}
     )
-    def get(self, request: request.Request, *args, **kwargs):
+    async def get(self, request: request.Request, *args, **kwargs):
         try:
-            event = self.get_event()
+            event = await self.aget_event()
         except Exception as e:
             return handle_400_error(str(e))
-        if event not in request.user.events.all():
+        if not await request.user.events.filter(pk=event.pk).aexists():
             return response.Response(status=status.HTTP_403_FORBIDDEN, data={'errors': 'Você não tem permissão para acessar este evento.'})
         if not event.is_final_results_published and not event.is_imortal_results_published:
             return handle_400_error('Resultados ainda não publicados.')
-        results = Results.objects.get(event=event)
-        if event.is_imortal_results_published:
-            results.calculate_imortals()
-        data = ResultsSerializer(results).data
-        return response.Response(status=status.HTTP_200_OK, data=data)
+        etag = await aget_event_etag(event.id, RESULTS_PAYLOAD)
+        not_modified = self.not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        async def build() -> dict:
+            if event.is_imortal_results_published:
+                results = await Results.objects.aget(event=event)
+                await sync_to_async(results.calculate_imortals)()
+            # Os jogadores são carregados antes da serialização, que não consulta o banco
+            results = await Results.objects.select_related('event', 'paladin', 'ambassor').prefetch_related(
+                'top4', 'imortals').aget(event=event)
+            return ResultsSerializer(results).data
+        data = await aget_cached_event_payload(event.id, RESULTS_PAYLOAD, build)
+        return response.Response(status=status.HTTP_200_OK, data=data, headers=self.etag_headers(etag))
+
+
+class LeaderboardView(BaseView):
+    permission_classes = [IsAuthenticated, ResultsPermissions]
+    query_budget = {'GET': 9}
+
+    @swagger_auto_schema(
+        tags=['results'],
+        operation_summary="Retorna uma página do ranking do evento.",
+        operation_description="""Retorna uma página do ranking do evento, ordenado pela pontuação total,
+        pela maior pontuação em uma sumula e pelo menor número de sumulas jogadas.
+        Jogadores empatados em todos os critérios têm o mesmo **rank**; **position** é única.
+
+        Os jogadores só podem ver o ranking depois da publicação dos resultados. A equipe do evento pode ver a qualquer momento.
+        """,
+        manual_parameters=manual_parameter_event_id + [
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description='Número da página, a partir de 1'),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f'Jogadores por página (padrão {LEADERBOARD_PAGE_SIZE}, máximo {LEADERBOARD_MAX_PAGE_SIZE})'),
+        ],
+        responses={200: openapi.Response('OK', openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+            'count': openapi.Schema(type=openapi.TYPE_INTEGER, description='Número de jogadores no ranking', example=120),
+            'next': openapi.Schema(type=openapi.TYPE_STRING, description='URL da próxima página'),
+            'previous': openapi.Schema(type=openapi.TYPE_STRING, description='URL da página anterior'),
+            'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
+                'position': openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
+                'rank': openapi.Schema(type=openapi.TYPE_INTEGER, example=1),
+                'player_id': openapi.Schema(type=openapi.TYPE_INTEGER, example=5),
+                'full_name': openapi.Schema(type=openapi.TYPE_STRING, example='João da Silva'),
+                'social_name': openapi.Schema(type=openapi.TYPE_STRING, example='João'),
+                'is_imortal': openapi.Schema(type=openapi.TYPE_BOOLEAN, example=False),
+                'total_score': openapi.Schema(type=openapi.TYPE_INTEGER, example=98),
+                'sumulas_played': openapi.Schema(type=openapi.TYPE_INTEGER, example=4),
+                'best_score': openapi.Schema(type=openapi.TYPE_INTEGER, example=30),
+            })),
+        })), **Errors([400]).retrieve_erros()}
+    )
+    async def get(self, request: request.Request, *args, **kwargs):
+        """A página é lida pelo índice (event, position), sem contar nem ordenar os jogadores do evento."""
+        try:
+            event = await self.aget_event()
+        except Exception as e:
+            return handle_400_error(str(e))
+        if not await request.user.events.filter(pk=event.pk).aexists():
+            return response.Response(status=status.HTTP_403_FORBIDDEN, data={'errors': 'Você não tem permissão para acessar este evento.'})
+        await self.acheck_object_permissions(request, event)
+        if not event.is_final_results_published and not event.is_imortal_results_published and \
+                not await sync_to_async(request.user.has_perm)('api.change_player_score_event', event):
+            return handle_400_error('Resultados ainda não publicados.')
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get(
+                'page_size', LEADERBOARD_PAGE_SIZE))
+        except ValueError:
+            return handle_400_error('page e page_size devem ser números inteiros.')
+        if page < 1 or not 1 <= page_size <= LEADERBOARD_MAX_PAGE_SIZE:
+            return handle_400_error(
+                f'page deve ser maior que 0 e page_size deve estar entre 1 e {LEADERBOARD_MAX_PAGE_SIZE}.')
+        etag = await aget_event_etag(event.id, LEADERBOARD_ETAG, page, page_size)
+        not_modified = self.not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        entries = LeaderboardEntry.objects.filter(event=event)
+        # A última posição é o número de jogadores no ranking
+        count = await entries.order_by('-position').values_list('position', flat=True).afirst() or 0
+        start = (page - 1) * page_size
+        page_entries = [entry async for entry in entries.filter(
+            position__gt=start, position__lte=start + page_size).select_related('player')]
+        url = request.build_absolute_uri()
+        data = {
+            'count': count,
+            'next': replace_query_param(url, 'page', page + 1) if start + page_size < count else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': LeaderboardEntrySerializer(page_entries, many=True).data,
+        }
+        return response.Response(status=status.HTTP_200_OK, data=data, headers=self.etag_headers(etag))
 
 
 class PublishFinalResults(BaseView):
@@ -508,6 +611,7 @@ class PublishImortalsResults(BaseView):
         self.check_object_permissions(request, event)
         event.is_imortal_results_published = True
         event.save()
+        publish_results_update(event)
         return response.Response(status=status.HTTP_200_OK, data='Resultados de imortais publicados com sucesso!')
 
 
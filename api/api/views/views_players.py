@@ -1,26 +1,22 @@
-from django.http import HttpResponse
-from io import BytesIO, StringIO
-from typing import Optional
+from django.db.models import Q, QuerySet
 from django.forms import ValidationError
 from django.contrib.auth.models import Group
-from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import validate_email
 from rest_framework import status, request, response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import BasePermission
+from asgiref.sync import sync_to_async
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from ..views.base_views import BaseView
+from ..views.base_views import BaseView, BaseImportView
 from api.models import Event, Player, Results
 from ..utils import handle_400_error
-from ..serializers import PlayerSerializer, UploadFileSerializer, PlayerResultsSerializer, PlayerLoginSerializer
+from ..serializers import PlayerSerializer, PlayerSearchSerializer, UploadFileSerializer, PlayerResultsSerializer, PlayerLoginSerializer
+from ..search import SEARCH_MAX_LIMIT, parse_search_params, search
 from ..swagger import Errors, manual_parameter_event_id
+from ..exports import XLSX_CONTENT_TYPE, axlsx_response, export_csv_response, iter_rows
 from ..permissions import assign_permissions
-import pandas as pd
-import chardet
-import os
 
 
 class PlayersPermission(BasePermission):
@@ -36,34 +32,118 @@ class PlayersPermission(BasePermission):
         return True
 
 
+class PlayersSearchPermission(BasePermission):
+    # A busca retorna o email de inscrição, então exige a permissão usada no check-in
+    def has_object_permission(self, request, view, obj):
+        return request.user.has_perm('api.change_player_event', obj)
+
+
+PLAYERS_PAGE_SIZE = 100
+PLAYERS_MAX_PAGE_SIZE = 500
+PLAYER_FIELDS = PlayerSerializer.Meta.fields
+BOOLEAN_VALUES = {'true': True, 'false': False}
+
+
 class PlayersView(BaseView):
 
     permission_classes = [IsAuthenticated, PlayersPermission]
+    query_budget = {'GET': 5}
 
     @ swagger_auto_schema(security=[{'Bearer': []}],
                           tags=['player'],
-                          operation_description='Retorna todos os jogadores de um evento.',
-                          operation_summary='Retorna todos os jogadores de um evento.',
-                          manual_parameters=manual_parameter_event_id,
+                          operation_description=f"""Retorna os jogadores de um evento.
+
+                          Filtros opcionais:
+                          - **is_present** e **is_imortal**: true ou false
+                          - **name**: início do nome completo ou do nome social (sem diferenciar maiúsculas)
+                          - **fields**: campos retornados, separados por vírgula ({', '.join(PLAYER_FIELDS)}). O id é sempre retornado.
+
+                          Paginação: com **limit** (máximo {PLAYERS_MAX_PAGE_SIZE}) ou **cursor** a resposta é paginada pelo id
+                          no formato {{"results": [...], "next_cursor": id}}. Para a próxima página, envie next_cursor em **cursor**.
+                          Sem esses parâmetros todos os jogadores são retornados em uma lista.
+                          """,
+                          operation_summary='Retorna os jogadores de um evento.',
+                          manual_parameters=manual_parameter_event_id + [
+                              openapi.Parameter('is_present', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+                              openapi.Parameter('is_imortal', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+                              openapi.Parameter('name', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+                              openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+                              openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+                              openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+                          ],
                           responses={200: openapi.Response(200, PlayerSerializer), **Errors([400]).retrieve_erros()})
-    def get(self, request: request.Request, *args, **kwargs) -> response.Response:
-        """ Retorna todos os jogadores de um evento."""
+    async def get(self, request: request.Request, *args, **kwargs) -> response.Response:
+        """ Retorna os jogadores de um evento.
+        Os jogadores são lidos já filtrados, ordenados pelo id e apenas com os campos pedidos,
+        sem instanciar os modelos.
+        """
         try:
-            event = self.get_event()
+            event = await self.aget_event()
         except Exception as e:
             return handle_400_error(str(e))
-        self.check_object_permissions(request, event)
+        await self.acheck_object_permissions(request, event)
 
-        players = Player.objects.filter(event=event)
-        if not players:
-            return response.Response(status=status.HTTP_200_OK, data=['Nenhum jogador encontrado!'])
-        players_list = []
-        for player in players:
-            players_list.append(player)
-
-        data = PlayerSerializer(players_list, many=True).data
+        params = request.query_params
+        try:
+            players = self.filter_players(
+                Player.objects.filter(event=event), params).order_by('id')
+            fields = self.get_fields(params)
+            paginated = 'limit' in params or 'cursor' in params
+            if paginated:
+                players, limit = self.paginate_players(players, params)
+        except ValueError as e:
+            return handle_400_error(str(e))
+        players_list = [player async for player in players.values(*fields)]
+
+        if not paginated:
+            if not players_list:
+                return response.Response(status=status.HTTP_200_OK, data=['Nenhum jogador encontrado!'])
+            return response.Response(status=status.HTTP_200_OK, data=players_list)
+
+        # Uma linha a mais indica que existe a próxima página
+        next_cursor = players_list[limit - 1]['id'] if len(players_list) > limit else None
+        return response.Response(status=status.HTTP_200_OK, data={
+            'results': players_list[:limit],
+            'next_cursor': next_cursor,
+        })
+
+    def filter_players(self, players: QuerySet[Player], params) -> QuerySet[Player]:
+        """Aplica os filtros de presença, imortal e início do nome."""
+        for field in ['is_present', 'is_imortal']:
+            if field in params:
+                value = BOOLEAN_VALUES.get(params[field].lower())
+                if value is None:
+                    raise ValueError(f'{field} deve ser true ou false.')
+                players = players.filter(**{field: value})
+        name = params.get('name', '').strip()
+        if name:
+            players = players.filter(
+                Q(full_name__istartswith=name) | Q(social_name__istartswith=name))
+        return players
+
+    def get_fields(self, params) -> list[str]:
+        """Campos pedidos em fields=, sempre com o id."""
+        if not params.get('fields'):
+            return list(PLAYER_FIELDS)
+        fields = [field.strip() for field in params['fields'].split(',') if field.strip()]
+        invalid = [field for field in fields if field not in PLAYER_FIELDS]
+        if invalid:
+            raise ValueError(
+                f"Campos inválidos: {', '.join(invalid)}. Campos disponíveis: {', '.join(PLAYER_FIELDS)}.")
+        return ['id'] + [field for field in fields if field != 'id']
 
-        return response.Response(status=status.HTTP_200_OK, data=data)
+    def paginate_players(self, players: QuerySet[Player], params) -> tuple[QuerySet[Player], int]:
+        """Paginação por keyset: a página seguinte começa depois do id do cursor."""
+        try:
+            limit = int(params.get('limit', PLAYERS_PAGE_SIZE))
+            cursor = int(params['cursor']) if params.get('cursor') else None
+        except ValueError:
+            raise ValueError('limit e cursor devem ser números inteiros.')
+        if not 1 <= limit <= PLAYERS_MAX_PAGE_SIZE:
+            raise ValueError(f'limit deve estar entre 1 e {PLAYERS_MAX_PAGE_SIZE}.')
+        if cursor is not None:
+            players = players.filter(id__gt=cursor)
+        return players[:limit + 1], limit
 
     @swagger_auto_schema(
         security=[{'Bearer': []}],
@@ -223,8 +303,50 @@ class PlayersView(BaseView):
         return response.Response(status=status.HTTP_200_OK, data='Jogador editado com sucesso!')
 
 
+class PlayersSearchView(BaseView):
+
+    permission_classes = [IsAuthenticated, PlayersSearchPermission]
+    # Inclui a verificação da busca por trigramas no banco, feita na primeira busca do processo
+    query_budget = {'GET': 6}
+
+    @ swagger_auto_schema(security=[{'Bearer': []}],
+                          tags=['player'],
+                          operation_description=f"""Busca jogadores de um evento pelo nome completo, nome social ou email.
+
+                          A busca é aproximada (trigramas) e não diferencia acentos nem maiúsculas, então "joao silv"
+                          encontra "João Silva". Os jogadores são ordenados pela similaridade com **q**.
+                          Em bancos sem as extensões pg_trgm e unaccent, a busca é por trechos contidos nos campos
+                          e similarity é nula.
+                          Retorna no máximo **limit** jogadores (padrão 20, máximo {SEARCH_MAX_LIMIT}).
+                          """,
+                          operation_summary='Busca jogadores de um evento.',
+                          manual_parameters=manual_parameter_event_id + [
+                              openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+                              openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+                          ],
+                          responses={200: openapi.Response(200, PlayerSearchSerializer(many=True)),
+                                     **Errors([400]).retrieve_erros()})
+    async def get(self, request: request.Request, *args, **kwargs) -> response.Response:
+        """Busca jogadores do evento por similaridade, usando os índices GIN de trigramas."""
+        try:
+            event = await self.aget_event()
+        except Exception as e:
+            return handle_400_error(str(e))
+        await self.acheck_object_permissions(request, event)
+        try:
+            query, limit = parse_search_params(request.query_params)
+        except ValueError as e:
+            return handle_400_error(str(e))
+        players = await sync_to_async(search)(Player.objects.filter(event=event),
+                                              ['full_name', 'social_name', 'registration_email'], query)
+        fields = PlayerSearchSerializer.Meta.fields
+        data = [player async for player in players.values(*fields)[:limit]]
+        return response.Response(status=status.HTTP_200_OK, data=data)
+
+
 class GetPlayerResults(BaseView):
     permission_classes = [IsAuthenticated, PlayersPermission]
+    query_budget = {'GET': 5}
 
     @swagger_auto_schema(
         tags=['results'],
@@ -254,9 +376,15 @@ class GetPlayerResults(BaseView):
         return response.Response(status=status.HTTP_200_OK, data=data)
 
 
-class AddPlayersExcel(BaseView):
+class AddPlayersExcel(BaseImportView):
     permission_classes = [IsAuthenticated, PlayersPermission]
-    parser_classes = [MultiPartParser]
+    import_model = Player
+    # Jogadores importados já são marcados como presentes, inclusive os que já estavam cadastrados
+    import_update_fields = ['full_name', 'is_present']
+    import_defaults = {'is_present': True}
+    success_message = 'Jogadores adicionados com sucesso!'
+    partial_errors_message = '{} jogadores não foram adicionados devido a e-mail inválido. Verfique os e-mails dos jogadores e tente novamente.'
+    no_rows_imported_message = 'Nenhum jogador adicionado! Verifique os e-mails do arquivo!'
 
     @swagger_auto_schema(
         tags=['player'],
@@ -275,83 +403,7 @@ class AddPlayersExcel(BaseView):
             return handle_400_error(str(e))
 
         self.check_object_permissions(self.request, event)
-
-        try:
-            excel_file = self.get_excel_file()
-        except ValidationError as e:
-            return handle_400_error(str(e))
-
-        # Obtém a última extensão do arquivo
-        extension = os.path.splitext(excel_file.name)[-1].lower().strip('.')
-        # Cria o DataFrame usando a extensão correta
-        df = self.createData(extension=extension, file=excel_file)
-        if df is None:
-            return handle_400_error('Arquivo inválido!')
-        try:
-            errors_count, players_count = self.create_players(
-                df=df, event=event)
-        except Exception as e:
-            return handle_400_error(str(e))
-        if errors_count > 0 and errors_count < players_count:
-            return response.Response(status=status.HTTP_201_CREATED, data={
-                'message': 'Jogadores adicionados com sucesso!',
-                'errors': f'{errors_count} jogadores não foram adicionados devido a e-mail inválido. Verfique os e-mails dos jogadores e tente novamente.'
-            })
-        elif errors_count >= players_count:
-            return handle_400_error('Nenhum jogador adicionado! Verifique os e-mails do arquivo!')
-        return response.Response(status=status.HTTP_201_CREATED, data='Jogadores adicionados com sucesso!')
-
-    def create_players(self, df: pd.DataFrame, event: Event) -> tuple[int, int]:
-        process_data = ['nome completo', 'e-mail']
-        df.columns = df.columns.str.strip().str.lower()
-        # Verificar se as colunas necessárias estão presentes
-        missing_columns = [
-            col for col in process_data if col not in df.columns]
-        if missing_columns:
-            raise ValueError(
-                f"ERRO - Colunas ausentes no arquivo: {', '.join(missing_columns)}")
-        df_needed = df[process_data]
-
-        players_count = 0
-        errors_count = 0
-        for i, line in df_needed.iterrows():
-            name = line['nome completo']
-            email = line['e-mail']
-            name, email = self.treat_name_and_email_excel(name, email)
-            players_count += 1
-            try:
-                validate_email(email)
-            except ValidationError:
-                errors_count += 1
-                continue
-            player, created = Player.objects.get_or_create(
-                registration_email=email, event=event)
-            player.full_name = name
-            player.is_present = True
-            player.save()
-        return errors_count, players_count
-
-    def createData(self, extension, file) -> Optional[pd.DataFrame]:
-        data = None
-        if extension == 'csv':
-            csv_data, encoding = self.treat_csv(file)
-            delimiter = self.get_delimiter(csv_data)
-            data = pd.read_csv(csv_data, header=0,
-                               encoding=encoding, delimiter=delimiter)
-
-        elif extension == 'xlsx' or extension == 'xls':
-            data = pd.read_excel(file)
-        return data
-
-    def get_excel_file(self):
-        excel_file = self.request.data['file']
-        if not isinstance(excel_file, UploadedFile):
-            raise ValidationError('Arquivo inválido!')
-        if not excel_file:
-            raise ValidationError('Arquivo não encontrado!')
-        if not excel_file.name:
-            raise ValidationError('Arquivo inválido!')
-        return excel_file
+        return self.import_file(event)
 
 
 class AddSinglePlayer(BaseView):
@@ -445,6 +497,7 @@ class DeleteAllPlayers(BaseView):
 
 class GetNotImortalPlayers(BaseView):
     permission_classes = [IsAuthenticated, PlayersPermission]
+    query_budget = {'GET': 5}
 
     @swagger_auto_schema(
         tags=['player'],
@@ -472,59 +525,48 @@ class GetNotImortalPlayers(BaseView):
         return response.Response(status=status.HTTP_200_OK, data=data)
 
 
+EXPORT_PLAYERS_HEADER = ['Nome Completo', 'Email', 'Nome Social']
+EXPORT_PLAYERS_FIELDS = ['full_name', 'registration_email', 'social_name']
+EXPORT_PLAYERS_EXTENSIONS = ['xlsx', 'csv']
+
+
 class ExportPlayersView(BaseView):
     permission_classes = [IsAuthenticated, PlayersPermission]
+    query_budget = {'GET': 6}
 
     @swagger_auto_schema(
         tags=['player'],
-        operation_description="""Exporta os jogadores classificados nas chaves do evento em um arquivo Excel.
-        O arquivo Excel contém as informações de **Nome Completo, Email e Nome Social** dos jogadores classificados nas chaves.
+        operation_description="""Exporta os jogadores classificados nas chaves do evento em um arquivo Excel ou CSV.
+        O arquivo contém as informações de **Nome Completo, Email e Nome Social** dos jogadores classificados nas chaves.
+        O formato é escolhido em **extension**: xlsx (padrão) ou csv. O arquivo é gerado e enviado em partes,
+        sem carregar todos os jogadores em memória.
         """,
-        operation_summary='Exporta os jogadores classificados nas chaves do evento em um arquivo Excel.',
-        manual_parameters=manual_parameter_event_id,
+        operation_summary='Exporta os jogadores classificados nas chaves do evento em um arquivo Excel ou CSV.',
+        manual_parameters=manual_parameter_event_id + [
+            openapi.Parameter('extension', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=EXPORT_PLAYERS_EXTENSIONS),
+        ],
         responses={200: openapi.Response(
-            description='Arquivo Excel gerado com sucesso',
-            content={'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': {}}), **Errors([400]).retrieve_erros()})
-    def get(self, request, *args, **kwargs):
+            description='Arquivo gerado com sucesso',
+            content={XLSX_CONTENT_TYPE: {}, 'text/csv': {}}), **Errors([400]).retrieve_erros()})
+    async def get(self, request, *args, **kwargs):
         try:
-            event = self.get_event()
+            event = await self.aget_event()
         except Exception as e:
             return handle_400_error(str(e))
 
-        self.check_object_permissions(request, event)
+        await self.acheck_object_permissions(request, event)
+
+        extension = request.query_params.get('extension', 'xlsx').lower()
+        if extension not in EXPORT_PLAYERS_EXTENSIONS:
+            return handle_400_error(f"extension deve ser {' ou '.join(EXPORT_PLAYERS_EXTENSIONS)}.")
 
         players = Player.objects.filter(
-            event=event, is_imortal=False, total_score__gt=0)
-        print(players)
-        if not players:
+            event=event, is_imortal=False, total_score__gt=0).order_by('id')
+        if not await players.aexists():
             return handle_400_error('Nenhum jogador encontrado!')
 
-        # Gera o arquivo Excel
-        excel_file = self.generate_excel(players=players)
-
-        # Cria a resposta HTTP com o arquivo Excel
-        response = HttpResponse(
-            excel_file, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename=jogadores_classificados.xlsx'
-
-        return response
-
-    def generate_excel(self, players):
-        # Cria um DataFrame com os dados dos jogadores
-        data = {
-            'Nome Completo': [player.full_name for player in players],
-            'Email': [player.registration_email for player in players],
-            'Nome Social': [player.social_name for player in players],
-        }
-        df = pd.DataFrame(data)
-
-        # Salva o DataFrame em um buffer de memória
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False,
-                        sheet_name='Jogadores Classificados')
-
-        # Move o ponteiro do buffer para o início
-        buffer.seek(0)
-
-        return buffer
+        if extension == 'csv':
+            return export_csv_response(request, EXPORT_PLAYERS_HEADER, players, EXPORT_PLAYERS_FIELDS,
+                                       'jogadores_classificados.csv')
+        return await axlsx_response(request, EXPORT_PLAYERS_HEADER, iter_rows(players, EXPORT_PLAYERS_FIELDS),
+                                    'Jogadores Classificados', 'jogadores_classificados.xlsx')
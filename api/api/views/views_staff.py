@@ -1,8 +1,3 @@
-from io import StringIO
-import os
-import pandas as pd
-from typing import Optional
-from django.forms import ValidationError
 from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
@@ -10,20 +5,20 @@ from rest_framework import status, request, response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import BasePermission
-from rest_framework.parsers import MultiPartParser
 
-from ..views.base_views import BaseView
+from ..views.base_views import BaseView, BaseImportView
 from api.models import Token, Event, Staff
 from users.models import User
-from ..serializers import EventSerializer, StaffSerializer, UploadFileSerializer, StaffLoginSerializer
+from ..serializers import EventSerializer, StaffSerializer, StaffSearchSerializer, UploadFileSerializer, StaffLoginSerializer
+from ..search import SEARCH_MAX_LIMIT, parse_search_params, search
 from .views_event import TOKEN_NOT_PROVIDED_ERROR_MESSAGE, TOKEN_NOT_FOUND_ERROR_MESSAGE, EVENT_NOT_FOUND_ERROR_MESSAGE
 from ..utils import handle_400_error
 from ..swagger import Errors, manual_parameter_event_id
 from ..permissions import assign_permissions
 
+from asgiref.sync import sync_to_async
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from django.core.files.uploadedfile import UploadedFile
 
 
 class StaffPermissions(BasePermission):
@@ -212,6 +207,44 @@ class StaffView(BaseView):
         return response.Response(status=status.HTTP_200_OK, data='Monitor deletado com sucesso!')
 
 
+class StaffSearchView(BaseView):
+    permission_classes = [IsAuthenticated, StaffPermissions]
+    # Inclui a verificação da busca por trigramas no banco, feita na primeira busca do processo
+    query_budget = {'GET': 6}
+
+    @ swagger_auto_schema(
+        tags=['staff'],
+        operation_description=f"""Busca os monitores de um evento pelo nome completo.
+        A busca é aproximada (trigramas) e não diferencia acentos nem maiúsculas.
+        Os monitores são ordenados pela similaridade com **q**.
+        Em bancos sem as extensões pg_trgm e unaccent, a busca é por trechos contidos no nome.
+        Retorna no máximo **limit** monitores (padrão 20, máximo {SEARCH_MAX_LIMIT}).
+        """,
+        operation_summary="Busca os monitores de um evento.",
+        manual_parameters=manual_parameter_event_id + [
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: openapi.Response(
+            'OK', StaffSearchSerializer(many=True)), **Errors([400]).retrieve_erros()}
+    )
+    async def get(self, request: request.Request, *args, **kwargs) -> response.Response:
+        """Busca os monitores do evento por similaridade, usando o índice GIN de trigramas."""
+        try:
+            event = await self.aget_event()
+        except Exception as e:
+            return handle_400_error(str(e))
+        await self.acheck_object_permissions(request, event)
+        try:
+            query, limit = parse_search_params(request.query_params)
+        except ValueError as e:
+            return handle_400_error(str(e))
+        staffs = await sync_to_async(search)(Staff.objects.filter(event=event), ['full_name'], query)
+        fields = StaffSearchSerializer.Meta.fields
+        data = [staff async for staff in staffs.values(*fields)[:limit]]
+        return response.Response(status=status.HTTP_200_OK, data=data)
+
+
 class AddStaffManagerPermissions(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method == 'POST':
@@ -270,9 +303,13 @@ class AddStaffPermissions(BasePermission):
         return False
 
 
-class AddStaffMembers(BaseView):
+class AddStaffMembers(BaseImportView):
     permission_classes = [IsAuthenticated, AddStaffPermissions]
-    parser_classes = [MultiPartParser]
+    import_model = Staff
+    import_update_fields = ['full_name']
+    success_message = 'Monitores adicionados com sucesso!'
+    partial_errors_message = '{} monitores não foram adicionados devido a e-mail inválido. Verfique os e-mails dos monitores e tente novamente.'
+    no_rows_imported_message = 'Nenhum monitor foi adicionado! Verifique os dados de e-mail dos monitores e tente novamente'
 
     @ swagger_auto_schema(
         tags=['staff'],
@@ -289,79 +326,7 @@ class AddStaffMembers(BaseView):
             return handle_400_error(str(e))
 
         self.check_object_permissions(self.request, event)
-
-        try:
-            excel_file = self.get_excel_file()
-        except ValidationError as e:
-            return handle_400_error(str(e))
-        extension = os.path.splitext(excel_file.name)[-1].lower().strip('.')
-        df = self.createData(extension=extension, file=excel_file)
-        if df is None:
-            return handle_400_error('Arquivo inválido!')
-
-        try:
-            errors_count, staff_count = self.create_staff(df, event)
-        except Exception as e:
-            return handle_400_error(str(e))
-        if errors_count > 0 and errors_count < staff_count:
-            return response.Response(status=status.HTTP_201_CREATED, data={
-                'message': 'Monitores adicionados com sucesso!',
-                'errors': f'{errors_count} monitores não foram adicionados devido a e-mail inválido. Verfique os e-mails dos monitores e tente novamente.'
-            })
-        elif errors_count == staff_count:
-            return handle_400_error('Nenhum monitor foi adicionado! Verifique os dados de e-mail dos monitores e tente novamente')
-
-        return response.Response(status=status.HTTP_201_CREATED, data='Monitores adicionados com sucesso!')
-
-    def create_staff(self, df: pd.DataFrame, event: Event) -> tuple:
-        process_data = ['nome completo', 'e-mail']
-        df.columns = df.columns.str.strip().str.lower()
-        # Verificar se as colunas necessárias estão presentes
-        missing_columns = [
-            col for col in process_data if col not in df.columns]
-        if missing_columns:
-            raise ValueError(
-                f"ERRO - Colunas ausentes no arquivo: {', '.join(missing_columns)}")
-
-        df_needed = df[process_data]
-        errors_count = 0
-        staff_count = 0
-        for i, line in df_needed.iterrows():
-            name = line['nome completo']
-            email = line['e-mail']
-            name, email = self.treat_name_and_email_excel(name, email)
-            staff_count += 1
-            try:
-                validate_email(email)
-            except:
-                errors_count += 1
-                continue
-            staff, created = Staff.objects.get_or_create(
-                registration_email=email, event=event)
-            staff.full_name = name
-            staff.save()
-        return errors_count, staff_count
-
-    def createData(self, extension, file) -> Optional[pd.DataFrame]:
-        data = None
-        if extension == 'csv':
-            csv_data, encoding = self.treat_csv(file)
-            delimiter = self.get_delimiter(csv_data)
-            data = pd.read_csv(csv_data, header=0,
-                               encoding=encoding, delimiter=delimiter)
-        elif extension == 'xlsx' or extension == 'xls':
-            data = pd.read_excel(file)
-        return data
-
-    def get_excel_file(self):
-        excel_file = self.request.data['file']
-        if not isinstance(excel_file, UploadedFile):
-            raise ValidationError('Arquivo inválido!')
-        if not excel_file:
-            raise ValidationError('Arquivo não encontrado!')
-        if not excel_file.name:
-            raise ValidationError('Arquivo inválido!')
-        return excel_file
+        return self.import_file(event)
 
 
 class AddSingleStaff(BaseView):
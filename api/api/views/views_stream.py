@@ -0,0 +1,93 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from api.models import Event
+from users.models import User
+from ..live import broker, format_sse
+from .base_views import EVENT_ID_NOT_PROVIDED_ERROR_MESSAGE, EVENT_NOT_FOUND_ERROR_MESSAGE
+
+HEARTBEAT_INTERVAL = 15  # Segundos entre os comentários que mantêm a conexão aberta em proxies
+RETRY_INTERVAL = 5000  # Milissegundos que o navegador espera antes de reconectar
+NOT_AUTHENTICATED_ERROR_MESSAGE = 'As credenciais de autenticação não foram fornecidas.'
+PERMISSION_DENIED_ERROR_MESSAGE = 'Você não tem permissão para acessar este evento.'
+ASGI_REQUIRED_ERROR_MESSAGE = 'O stream de eventos só é servido pelos workers ASGI (SERVER_MODE=asgi).'
+
+
+class EventStreamView(View):
+    """Stream de Server-Sent Events com as atualizações de um evento.
+
+    Mensagens enviadas (campo event):
+    - ready: conexão aberta, o cliente deve carregar o estado atual pelos endpoints de leitura
+    - sumula_created, sumula_closed, sumula_updated, sumula_deleted: dados da sumula (e pontuações salvas)
+    - sumulas_generated: sumulas classificatorias geradas para o evento
+    - results_updated: flags de publicação dos resultados do evento
+    - resync: mensagens foram descartadas, o cliente deve recarregar o estado atual
+
+    A view é assíncrona: cada conexão ociosa é apenas uma fila no loop do worker ASGI (SERVER_MODE=asgi).
+    No WSGI o Django consumiria o stream inteiro antes de enviá-lo e, como ele não termina, o worker
+    ficaria preso até o timeout; a requisição é recusada com 503 (o EventSource não reconecta).
+    Como o EventSource do navegador não envia cabeçalhos, o token de acesso JWT pode ser
+    enviado no parâmetro access_token, além do cabeçalho Authorization ou da sessão.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request: HttpRequest, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'errors': ASGI_REQUIRED_ERROR_MESSAGE}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        user = await self.authenticate(request)
+        if user is None:
+            return JsonResponse({'errors': NOT_AUTHENTICATED_ERROR_MESSAGE}, status=status.HTTP_401_UNAUTHORIZED)
+        event_id = request.GET.get('event_id')
+        if not event_id:
+            return JsonResponse({'errors': EVENT_ID_NOT_PROVIDED_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        event = await Event.objects.filter(id=event_id).afirst() if event_id.isdigit() else None
+        if not event:
+            return JsonResponse({'errors': EVENT_NOT_FOUND_ERROR_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
+        if not await sync_to_async(user.has_perm)('api.view_event', event):
+            return JsonResponse({'errors': PERMISSION_DENIED_ERROR_MESSAGE}, status=status.HTTP_403_FORBIDDEN)
+        return StreamingHttpResponse(self.stream(event.id), content_type='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+    async def authenticate(self, request: HttpRequest) -> Optional[User]:
+        """Autentica pelo token JWT (cabeçalho Authorization ou parâmetro access_token) ou pela sessão."""
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        try:
+            raw_token = authentication.get_raw_token(
+                header) if header else request.GET.get('access_token')
+        except AuthenticationFailed:
+            return None
+        if raw_token:
+            try:
+                validated_token = authentication.get_validated_token(raw_token)
+                return await sync_to_async(authentication.get_user)(validated_token)
+            except (AuthenticationFailed, InvalidToken, TokenError):
+                return None
+        user = await request.auser()
+        return user if user.is_authenticated else None
+
+    async def stream(self, event_id: int) -> AsyncIterator[str]:
+        queue = broker.subscribe(event_id)
+        try:
+            yield f'retry: {RETRY_INTERVAL}\n\n'
+            yield format_sse({'type': 'ready', 'data': {'event_id': event_id}})
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(message)
+        finally:
+            broker.unsubscribe(event_id, queue)
@@ -3,18 +3,22 @@ from rest_framework import status, request, response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.permissions import BasePermission
 from .base_views import BaseSumulaView, SUMULA_NOT_FOUND_ERROR_MESSAGE, SUMULA_ID_NOT_PROVIDED_ERROR_MESSAGE
-from api.models import Staff, SumulaClassificatoria, SumulaImortal, PlayerScore, Player
-from ..serializers import PlayerScoreSerializer, SumulaSerializer, SumulaForPlayerSerializer, SumulaImortalSerializer, SumulaClassificatoriaSerializer, SumulaClassificatoriaForPlayerSerializer, SumulaImortalForPlayerSerializer
+from api.models import LeaderboardEntry, Match, Staff, SumulaClassificatoria, SumulaImortal, PlayerScore, Player
+from ..serializers import PlayerScoreSerializer, SumulaForPlayerSerializer, SumulaImortalSerializer, SumulaClassificatoriaSerializer, SumulaClassificatoriaForPlayerSerializer, SumulaImortalForPlayerSerializer
 from rest_framework.permissions import BasePermission
 from ..utils import handle_400_error
+from ..brackets import MIN_PLAYERS, plan_bracket_sizes, partition, bracket_name
+from ..querysets import with_sumula_relations
+from ..live import publish_event_update
+from ..cache import get_event_etag, invalidate_event_cache, ACTIVE_SUMULAS_PAYLOAD
 from ..swagger import Errors, sumula_imortal_api_put_schema, sumula_classicatoria_api_put_schema, sumulas_response_schema, manual_parameter_event_id, sumulas_response_for_player_schema, array_of_sumulas_response_schema
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 import random
-import string
 import logging
 from django.core.exceptions import ValidationError
 SUMULA_IS_CLOSED_ERROR_MESSAGE = "Súmula já encerrada só pode ser editada por um gerente ou adminstrador!"
+PLAYER_SUMULAS_ETAG = 'sumulas-player'
 
 
 class HasSumulaPermission(BasePermission):
@@ -34,6 +38,7 @@ class HasSumulaPermission(BasePermission):
 class SumulasView(BaseSumulaView):
     """Lida com os requests relacionados a sumulas."""
     permission_classes = [IsAuthenticated, HasSumulaPermission]
+    query_budget = {'GET': 14}
 
     @ swagger_auto_schema(
         tags=['sumula'],
@@ -42,17 +47,14 @@ class SumulasView(BaseSumulaView):
         security=[{'Bearer': []}],
         manual_parameters=manual_parameter_event_id,
         responses={200: openapi.Response('OK', sumulas_response_schema), **Errors([400]).retrieve_erros()})
-    def get(self, request: request.Request, *args, **kwargs) -> response.Response:
+    async def get(self, request: request.Request, *args, **kwargs) -> response.Response:
         """Retorna todas as sumulas associadas a um evento."""
         try:
-            event = self.get_event()
+            event = await self.aget_event()
         except Exception as e:
             return handle_400_error(str(e))
-        self.check_object_permissions(self.request, event)
-        sumulas_imortal, sumulas_classificatoria = self.get_sumulas(
-            event=event)
-        data = SumulaSerializer(
-            {'sumulas_classificatoria': sumulas_classificatoria, 'sumulas_imortal': sumulas_imortal}).data
+        await self.acheck_object_permissions(self.request, event)
+        data = await self.aget_sumulas_data(event=event)
         return response.Response(status=status.HTTP_200_OK, data=data)
 
     @swagger_auto_schema(
@@ -154,11 +156,12 @@ class SumulaClassificatoriaView(BaseSumulaView):
         referees = request.data['referees']
         self.add_referees(sumula=sumula, event=event, referees=referees)
         try:
-            sumula.rounds = self.round_robin_tournament(
-                len(players_score), players_score)
+            Match.objects.bulk_create(self.round_robin_tournament(
+                len(players_score), players_score, sumula))
         except Exception as e:
             return handle_400_error(str(e))
-        sumula.save()
+        # bulk_create não dispara post_save
+        invalidate_event_cache(event.id)
         data = SumulaClassificatoriaSerializer(sumula).data
         return response.Response(status=status.HTTP_201_CREATED, data=data)
 
@@ -300,11 +303,12 @@ class SumulaImortalView(BaseSumulaView):
         referees = request.data['referees']
         self.add_referees(sumula=sumula, event=event, referees=referees)
         try:
-            sumula.rounds = self.round_robin_tournament(
-                len(players_score), players_score)
+            Match.objects.bulk_create(self.round_robin_tournament(
+                len(players_score), players_score, sumula))
         except Exception as e:
             return handle_400_error(str(e))
-        sumula.save()
+        # bulk_create não dispara post_save
+        invalidate_event_cache(event.id)
         data = SumulaImortalSerializer(sumula).data
         return response.Response(status=status.HTTP_201_CREATED, data=data)
 
@@ -366,6 +370,7 @@ class SumulaImortalView(BaseSumulaView):
 
 class ActiveSumulaView(BaseSumulaView):
     permission_classes = [IsAuthenticated, HasSumulaPermission]
+    query_budget = {'GET': 14}
 
     @ swagger_auto_schema(
         tags=['sumula'],
@@ -382,15 +387,17 @@ class ActiveSumulaView(BaseSumulaView):
         except Exception as e:
             return handle_400_error(str(e))
         self.check_object_permissions(self.request, event)
-        sumula_imortal, sumula_classificatoria = self.get_sumulas(
-            event=event, active=True)
-        data = SumulaSerializer(
-            {'sumulas_classificatoria': sumula_classificatoria, 'sumulas_imortal': sumula_imortal}).data
-        return response.Response(status=status.HTTP_200_OK, data=data)
+        etag = get_event_etag(event.id, ACTIVE_SUMULAS_PAYLOAD)
+        not_modified = self.not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        data = self.get_sumulas_data(event=event, active=True)
+        return response.Response(status=status.HTTP_200_OK, data=data, headers=self.etag_headers(etag))
 
 
 class FinishedSumulaView(BaseSumulaView):
     permission_classes = [IsAuthenticated, HasSumulaPermission]
+    query_budget = {'GET': 14}
 
     @ swagger_auto_schema(
         tags=['sumula'],
@@ -407,10 +414,7 @@ class FinishedSumulaView(BaseSumulaView):
         except Exception as e:
             return handle_400_error(str(e))
         self.check_object_permissions(self.request, event)
-        sumula_imortal, sumula_classificatoria = self.get_sumulas(
-            event=event, active=False)
-        data = SumulaSerializer(
-            {'sumulas_classificatoria': sumula_classificatoria, 'sumulas_imortal': sumula_imortal}).data
+        data = self.get_sumulas_data(event=event, active=False)
         return response.Response(status=status.HTTP_200_OK, data=data)
 
 
@@ -423,6 +427,7 @@ class GetSumulaForPlayerPermission(BasePermission):
 
 class GetSumulaForPlayer(BaseSumulaView):
     permission_classes = [IsAuthenticated, GetSumulaForPlayerPermission]
+    query_budget = {'GET': 10}
 
     @ swagger_auto_schema(
         tags=['sumula'],
@@ -444,10 +449,14 @@ class GetSumulaForPlayer(BaseSumulaView):
         player = Player.objects.filter(user=request.user, event=event).first()
         if not player:
             return handle_400_error("Jogador não encontrado!")
+        etag = get_event_etag(event.id, PLAYER_SUMULAS_ETAG, player.id)
+        not_modified = self.not_modified(etag)
+        if not_modified is not None:
+            return not_modified
 
         if player.is_imortal:
-            player_scores = PlayerScore.objects.filter(
-                player=player, sumula_imortal__active=True)
+            player_scores = with_sumula_relations(PlayerScore.objects.filter(
+                player=player, sumula_imortal__active=True).select_related('sumula_imortal'), prefix='sumula_imortal__')
             if not player_scores:
                 return handle_400_error("Jogador não possui nenhuma sumula associada!")
             sumulas = [
@@ -455,8 +464,8 @@ class GetSumulaForPlayer(BaseSumulaView):
             data = SumulaImortalForPlayerSerializer(
                 sumulas, many=True).data
         else:
-            player_scores = PlayerScore.objects.filter(
-                player=player, sumula_classificatoria__active=True)
+            player_scores = with_sumula_relations(PlayerScore.objects.filter(
+                player=player, sumula_classificatoria__active=True).select_related('sumula_classificatoria'), prefix='sumula_classificatoria__')
             if not player_scores:
                 return handle_400_error("Jogador não possui nenhuma sumula associada!")
             sumulas = [
@@ -464,7 +473,7 @@ class GetSumulaForPlayer(BaseSumulaView):
             data = SumulaClassificatoriaForPlayerSerializer(
                 sumulas, many=True).data
 
-        return response.Response(status=status.HTTP_200_OK, data=data)
+        return response.Response(status=status.HTTP_200_OK, data=data, headers=self.etag_headers(etag))
 
 
 class AddRefereeToSumulaView(BaseSumulaView):
@@ -561,82 +570,55 @@ class GenerateSumulas(BaseSumulaView):
         return response.Response(status=status.HTTP_201_CREATED, data="Sumulas geradas com sucesso!")
 
     def generate_sumulas(self, event) -> list[SumulaClassificatoria] | Exception:
-        logger = logging.getLogger(__name__)
         """Gera sumulas classificatorias para iniciar um evento.
         Uma sumula possui no maximo 8 e no mínimo 6 jogadores.
-        """
-        MIN_PLAYERS = 6  # A DECIDIR
-        MAX_PLAYERS = 8
-        letters = string.ascii_uppercase  # Alfabeto para nomear as chaves
-        letters_count = 0
 
-        try:
-            with transaction.atomic():
-                players = Player.objects.filter(
-                    event=event, is_present=True, is_imortal=False).select_for_update()
-                if players.count() < MIN_PLAYERS:
-                    logger.error(f"O evento precisa de pelo menos {MIN_PLAYERS} jogadores presentes para iniciar.")
-                    raise ValidationError(f"O evento precisa de pelo menos {MIN_PLAYERS} jogadores presentes para iniciar.")
-
-                players = list(players)
-                random.shuffle(players)
-                N = len(players)
-                resto = N % MAX_PLAYERS
-                n_sumulas = N // MAX_PLAYERS
-                sumulas: list[SumulaClassificatoria] = []
-
-                if resto > 0:
-                    n_sumulas += 1
-
-                for i in range(n_sumulas):
-                    if letters_count % 26 == 0:
-                        letters_count = 0
-                    if i < 26:
-                        sumula = SumulaClassificatoria.objects.create(
-                            event=event, name=f"Chave {letters[letters_count]}")
-                    else:
-                        name = f"{letters[letters_count]}" * (i // 26 + 1)
-                        sumula = SumulaClassificatoria.objects.create(
-                            event=event, name=f"Chave {name}")
-                    letters_count += 1
-                    sumulas.append(sumula)
-                    players_to_add = players[i *
-                                             MAX_PLAYERS:(i + 1) * MAX_PLAYERS]
-                    for j in range(len(players_to_add)):
-                        player = players_to_add[j]
-                        PlayerScore.objects.create(
-                            event=event, player=player, sumula_classificatoria=sumulas[i])
-
-                if resto > 0 and resto < MIN_PLAYERS:
-                    index_of_complete_sumulas = n_sumulas - 2
-                    last_sumula = sumulas[n_sumulas - 1]
-                    while last_sumula.scores.count() < MIN_PLAYERS:
-                        scores = sumulas[index_of_complete_sumulas].scores.all()
-                        for i in range(2):
-                            player = scores[i].player
-                            scores[i].delete()
-                            PlayerScore.objects.create(
-                                event=event, player=player, sumula_classificatoria=last_sumula)
-                            last_sumula.refresh_from_db(fields=['scores'])
-                            if last_sumula.scores.count() == MIN_PLAYERS:
-                                break
-                        index_of_complete_sumulas -= 1
-
-                for sumula in sumulas:
-                    players_list = [player for player in sumula.scores.all()]
-                    sumula.rounds = self.round_robin_tournament(
-                        n=len(players_list), players_score=players_list)
-                    sumula.save()
-
-            logger.info(
-                f"{len(sumulas)} sumulas classificatorias geradas para o evento {event.id}")
-        except ValidationError as e:
-            logger.error(f"Erro de validação ao gerar sumulas: {e}")
-            return handle_400_error(f"Erro de validação ao gerar sumulas: {e}")
-        except Exception as e:
-            logger.error(f"Erro ao gerar sumulas: {e}")
-            return handle_400_error(f"Erro ao gerar sumulas: {e}")
+        A divisão das chaves é planejada em memória e gravada com bulk_create,
+        mantendo o número de queries constante independente do número de jogadores.
+        """
+        logger = logging.getLogger(__name__)
 
+        with transaction.atomic():
+            players = list(Player.objects.filter(
+                event=event, is_present=True, is_imortal=False).select_for_update())
+            if len(players) < MIN_PLAYERS:
+                logger.error(
+                    f"O evento precisa de pelo menos {MIN_PLAYERS} jogadores presentes para iniciar.")
+                raise ValidationError(
+                    f"O evento precisa de pelo menos {MIN_PLAYERS} jogadores presentes para iniciar.")
+
+            random.shuffle(players)
+            brackets = partition(players, plan_bracket_sizes(len(players)))
+
+            sumulas = SumulaClassificatoria.objects.bulk_create([
+                SumulaClassificatoria(event=event, name=bracket_name(i))
+                for i in range(len(brackets))
+            ])
+
+            # O número da rodada de cada jogador é a sua posição na chave
+            scores_by_sumula: list[list[PlayerScore]] = []
+            for sumula, bracket in zip(sumulas, brackets):
+                scores_by_sumula.append([
+                    PlayerScore(event=event, player=player, sumula_classificatoria=sumula,
+                                rounds_number=seat)
+                    for seat, player in enumerate(bracket, start=1)
+                ])
+            PlayerScore.objects.bulk_create(
+                [score for scores in scores_by_sumula for score in scores])
+
+            matches = []
+            for sumula, scores in zip(sumulas, scores_by_sumula):
+                matches.extend(self.round_robin_tournament(
+                    n=len(scores), players_score=list(scores), sumula=sumula))
+            Match.objects.bulk_create(matches)
+            # bulk_create não dispara post_save
+            invalidate_event_cache(event.id)
+            LeaderboardEntry.refresh(event.id)
+            publish_event_update(event.id, 'sumulas_generated', {
+                                 'sumulas': len(sumulas)})
+
+        logger.info(
+            f"{len(sumulas)} sumulas classificatorias geradas para o evento {event.id}")
         return sumulas
 
 
@@ -3,14 +3,17 @@ ASGI config for api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Em produção, é servido pelo gunicorn com workers do uvicorn quando SERVER_MODE=asgi
+(ver gunicorn.conf.py):
+    SERVER_MODE=asgi gunicorn
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
-from decouple import config
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', config('SETTINGS_FILE_PATH'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.prod')
 
 application = get_asgi_application()
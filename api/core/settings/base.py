@@ -13,7 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from datetime import timedelta
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,6 +55,8 @@ AUTH_USER_MODEL = 'users.User'
 
 
 MIDDLEWARE = [
+    # Primeiro da lista, para medir a latência de toda a requisição
+    'api.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,6 +70,14 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+# Métricas (api.metrics): com METRICS_TOKEN, /api/metrics/ exige Authorization: Bearer <token>.
+# Sem o token o endpoint fica aberto, a não ser com METRICS_REQUIRE_TOKEN (produção), em que responde 404
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_REQUIRE_TOKEN = False
+# Os orçamentos de queries das views (query_budget) falham os testes; fora deles geram apenas um aviso no log
+QUERY_BUDGETS_ENFORCED = False
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -98,6 +108,31 @@ WSGI_APPLICATION = 'core.wsgi.application'
 } """
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# O cache 'events' guarda as leituras de resultados e sumulas de cada evento (ver api/cache.py).
+# Em produção, REDIS_URL aponta para um Redis (ou servidor compatível) compartilhado entre os workers
+# e é obrigatória (prod.py); o LocMemCache só é coerente com um único processo (runserver e testes).
+
+REDIS_URL = config("REDIS_URL", default="")
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'events': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'events',
+    },
+}
+EVENT_CACHE_TIMEOUT = config("EVENT_CACHE_TIMEOUT", default=300, cast=int)
+# Com o LocMemCache, as ETags das leituras (api.cache.get_event_etag) só são enviadas se a API roda em um
+# único processo; caso contrário a versão de um processo não acompanha as alterações feitas nos outros
+EVENT_CACHE_SINGLE_PROCESS = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -177,6 +212,12 @@ AUTHENTICATION_BACKENDS = (
     'guardian.backends.ObjectPermissionBackend',
 )
 
+# Login com o Google (users/backends/google.py): com GOOGLE_OAUTH2_CLIENT_IDS, os ID tokens emitidos para
+# esses clientes são verificados localmente com as chaves públicas do Google; os access tokens continuam
+# sendo validados no endpoint userinfo. GOOGLE_OAUTH2_TIMEOUT limita, em segundos, as chamadas ao Google.
+GOOGLE_OAUTH2_CLIENT_IDS = config("GOOGLE_OAUTH2_CLIENT_IDS", default="", cast=Csv())
+GOOGLE_OAUTH2_TIMEOUT = config("GOOGLE_OAUTH2_TIMEOUT", default=5, cast=float)
+
 FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.MemoryFileUploadHandler",
                         "django.core.files.uploadhandler.TemporaryFileUploadHandler",
                         ]
@@ -36,4 +36,7 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
- """
\ No newline at end of file
+ """
+
+# O runserver atende em um único processo: a versão dos eventos no LocMemCache vale para as ETags
+EVENT_CACHE_SINGLE_PROCESS = True
@@ -2,6 +2,7 @@ from .base import *
 
 import dj_database_url
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -34,8 +35,20 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
 ]
 
+# Cache das leituras por evento: com vários workers ou instâncias, um LocMemCache por processo não
+# veria as invalidações feitas pelos outros e continuaria servindo resultados e sumulas antigos
+if not REDIS_URL:
+    raise ImproperlyConfigured("REDIS_URL é obrigatória em produção (cache das leituras por evento).")
+
+# O endpoint de métricas expõe a latência e as queries de cada rota: sem METRICS_TOKEN fica desativado
+METRICS_REQUIRE_TOKEN = True
+
+# Permite que o front leia a ETag das leituras (sumulas ativas, sumulas do jogador e resultados)
+CORS_EXPOSE_HEADERS = ['etag']
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -68,13 +81,17 @@ MIDDLEWARE.insert(2, "whitenoise.middleware.WhiteNoiseMiddleware")
 
 # Configuração de banco de dados para produção
 DATABASE_URL = config("DATABASE_URL", default=None)
+# Modo do servidor: "wsgi" (padrão) ou "asgi" (ver gunicorn.conf.py)
+SERVER_MODE = config("SERVER_MODE", default="wsgi")
 
 if DATABASE_URL:
     print("🌐 Usando DATABASE_URL padrão (qualquer caminho de socket ou TCP)")
     DATABASES = {
         "default": dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600,
+            # No ASGI as conexões persistentes não são reaproveitadas entre requisições
+            # (cada uma roda em uma thread diferente), por isso o padrão é 0 nesse modo
+            conn_max_age=config("DB_CONN_MAX_AGE", default=0 if SERVER_MODE == "asgi" else 600, cast=int),
             conn_health_checks=True,
             ssl_require=True,
         ),
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Runner dos testes: faz as views que passam do seu query_budget falharem (api.metrics).
+    Os testes rodam em um único processo, então o LocMemCache vale para as ETags (api.cache).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGETS_ENFORCED = True
+        settings.EVENT_CACHE_SINGLE_PROCESS = True
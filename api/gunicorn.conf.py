@@ -0,0 +1,16 @@
+"""Configuração do gunicorn em produção, carregada automaticamente do diretório da API.
+
+Por padrão a API é servida pelo WSGI (core.wsgi) com workers síncronos, o modo mais rápido para os
+endpoints de leitura. Com SERVER_MODE=asgi são usados workers do uvicorn (core.asgi), em que cada
+conexão do stream de eventos (SSE) é apenas uma fila no loop do worker em vez de ocupar uma thread.
+Os dois modos podem rodar lado a lado, com o ASGI atendendo apenas /api/event/stream/.
+"""
+import os
+
+bind = '0.0.0.0:8000'
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'core.wsgi:application'
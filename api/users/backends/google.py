@@ -1,28 +1,154 @@
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+import jwt
 import requests
-from users.models import User
+from django.conf import settings
 from django.db import transaction, IntegrityError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+# Tolerância, em segundos, para a diferença entre o relógio do servidor e o do Google
+ID_TOKEN_LEEWAY = 10
+# Validade das chaves quando a resposta não traz Cache-Control: max-age
+KEYS_DEFAULT_MAX_AGE = 3600
+# Faltando menos que isso para as chaves expirarem, elas são renovadas em segundo plano
+KEYS_REFRESH_MARGIN = 300
+# Intervalo mínimo entre buscas das chaves motivadas por um kid desconhecido ou por uma falha
+KEYS_MIN_REFRESH_INTERVAL = 60
+
+
+def create_session() -> requests.Session:
+    """Sessão compartilhada pelos logins: as conexões com o Google são reaproveitadas e as falhas
+    de conexão são repetidas uma vez. O timeout é passado em cada requisição (GOOGLE_OAUTH2_TIMEOUT).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=32, max_retries=Retry(total=1, read=0, status=0, backoff_factor=0.1))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class GoogleKeySet:
+    """Chaves públicas (JWKS) com que o Google assina os ID tokens, guardadas em memória pelo tempo
+    indicado no Cache-Control da resposta.
+
+    Perto de expirar, as chaves são renovadas em segundo plano sem bloquear os logins. Um kid
+    desconhecido (rotação das chaves) força uma nova busca, no máximo uma a cada
+    KEYS_MIN_REFRESH_INTERVAL segundos. Se a busca falhar, as chaves anteriores continuam em uso.
+    """
+
+    def __init__(self, url: str, session: requests.Session):
+        self.url = url
+        self.session = session
+        self.keys: dict[str, jwt.PyJWK] = {}
+        self.expires_at = 0.0
+        self.fetched_at = float('-inf')
+        self.lock = threading.Lock()
+        self.refresh_thread: Optional[threading.Thread] = None
+
+    def get_key(self, kid: str) -> Optional[jwt.PyJWK]:
+        now = time.monotonic()
+        if (kid not in self.keys or now >= self.expires_at) and \
+                (not self.keys or now - self.fetched_at >= KEYS_MIN_REFRESH_INTERVAL):
+            self.refresh()
+        elif self.expires_at - now < KEYS_REFRESH_MARGIN:
+            self.refresh_in_background()
+        return self.keys.get(kid)
+
+    def refresh(self) -> None:
+        requested_at = time.monotonic()
+        with self.lock:
+            # Outra thread pode ter buscado as chaves enquanto esta esperava
+            if self.fetched_at >= requested_at:
+                return
+            try:
+                response = self.session.get(self.url, timeout=settings.GOOGLE_OAUTH2_TIMEOUT)
+                response.raise_for_status()
+                keys = {key['kid']: jwt.PyJWK(key) for key in response.json()['keys']}
+            except (requests.RequestException, ValueError, KeyError, jwt.PyJWKError) as e:
+                logger.warning('Não foi possível buscar as chaves públicas do Google: %s', e)
+                self.fetched_at = time.monotonic()
+                return
+            max_age = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+            self.keys = keys
+            self.fetched_at = time.monotonic()
+            self.expires_at = self.fetched_at + (int(max_age.group(1)) if max_age else KEYS_DEFAULT_MAX_AGE)
+
+    def refresh_in_background(self) -> None:
+        if time.monotonic() - self.fetched_at < KEYS_MIN_REFRESH_INTERVAL:
+            return
+        if self.refresh_thread is None or not self.refresh_thread.is_alive():
+            self.refresh_thread = threading.Thread(target=self.refresh, name='google-keys-refresh', daemon=True)
+            self.refresh_thread.start()
 
 
 class GoogleOAuth2:
     GOOGLE_OAUTH2_PROVIDER = 'https://www.googleapis.com/oauth2/v3'
+    session = create_session()
+    key_set = GoogleKeySet(GOOGLE_OAUTH2_PROVIDER + '/certs', session)
 
     @classmethod
     def get_user_data(cls, access_token: str) -> dict | None:
+        """O token enviado pode ser um ID token (JWT) ou um access token do Google.
+        Com GOOGLE_OAUTH2_CLIENT_IDS configurado, os ID tokens são verificados localmente com as chaves
+        públicas do Google, sem chamadas externas durante o login; os demais tokens são validados no
+        endpoint userinfo.
+        """
         if not access_token:
             return None
+        if settings.GOOGLE_OAUTH2_CLIENT_IDS and cls.is_id_token(access_token):
+            return cls.verify_id_token(access_token)
+        return cls.get_user_info(access_token)
+
+    @staticmethod
+    def is_id_token(token: str) -> bool:
+        try:
+            jwt.get_unverified_header(token)
+        except jwt.DecodeError:
+            return False
+        return True
+
+    @classmethod
+    def verify_id_token(cls, id_token: str) -> dict | None:
+        """Valida a assinatura, a validade, o emissor e o destinatário (aud) do ID token e retorna as
+        suas claims, que têm os mesmos campos do userinfo (email, given_name, family_name, picture).
+        """
+        try:
+            kid = jwt.get_unverified_header(id_token).get('kid')
+            key = cls.key_set.get_key(kid) if kid else None
+            if key is None:
+                return None
+            claims = jwt.decode(
+                id_token, key.key, algorithms=['RS256'], audience=settings.GOOGLE_OAUTH2_CLIENT_IDS,
+                issuer=GOOGLE_ISSUERS, leeway=ID_TOKEN_LEEWAY, options={'require': ['exp', 'iat', 'sub']})
+        except jwt.InvalidTokenError:
+            return None
+        if not claims.get('email') or not claims.get('email_verified'):
+            return None
+        return claims
 
+    @classmethod
+    def get_user_info(cls, access_token: str) -> dict | None:
         user_info_url = cls.GOOGLE_OAUTH2_PROVIDER + '/userinfo'
         params = {'access_token': access_token}
 
         try:
-            response = requests.get(user_info_url, params=params)
+            response = cls.session.get(user_info_url, params=params, timeout=settings.GOOGLE_OAUTH2_TIMEOUT)
 
             if response.status_code == 200:
                 user_data = response.json()
                 return user_data
             else:
                 return None
-        except requests.exceptions.RequestException as e:  # pragma: no cover
+        except requests.exceptions.RequestException:
             return None
 
     @staticmethod
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from unittest.mock import patch
+from users.backends.google import GoogleKeySet, GoogleOAuth2
+from users.models import User
+
+CLIENT_ID = 'client-id.apps.googleusercontent.com'
+USER_INFO = {'email': 'user@email.com', 'given_name': 'given_name', 'family_name': 'family_name',
+             'picture': 'https://photo.aqui.com'}
+
+
+class KeyServer(ThreadingHTTPServer):
+    """Servidor local no lugar do Google: publica as chaves em /certs e responde o /userinfo."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), KeyServerHandler)
+        self.keys: dict[str, rsa.RSAPrivateKey] = {}
+        self.certs_requests = 0
+        self.max_age = 3600
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def handle_error(self, request, client_address):
+        # O teste de timeout fecha a conexão antes da resposta
+        pass
+
+    def add_key(self, kid: str) -> rsa.RSAPrivateKey:
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return self.keys[kid]
+
+
+class KeyServerHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/certs':
+            self.server.certs_requests += 1
+            keys = [{**jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key(), as_dict=True), 'kid': kid, 'alg': 'RS256'}
+                    for kid, key in self.server.keys.items()]
+            self.respond(200, {'keys': keys}, {'Cache-Control': f'public, max-age={self.server.max_age}'})
+        elif url.path == '/userinfo':
+            token = parse_qs(url.query).get('access_token', [''])[0]
+            if token == 'slow':
+                time.sleep(1)
+            self.respond(200, USER_INFO) if token == 'valid-access-token' else self.respond(401, {})
+        else:
+            self.respond(404, {})
+
+    def respond(self, status_code: int, data: dict, headers: dict = {}):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        for name, value in {'Content-Type': 'application/json', **headers}.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(GOOGLE_OAUTH2_CLIENT_IDS=[CLIENT_ID], GOOGLE_OAUTH2_TIMEOUT=0.5)
+class GoogleOAuth2TestCase(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = KeyServer()
+        cls.private_key = cls.server.add_key('key-1')
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.certs_requests = 0
+        self.key_set = GoogleKeySet(f'{self.server.url}/certs', GoogleOAuth2.session)
+        for name, value in [('key_set', self.key_set), ('GOOGLE_OAUTH2_PROVIDER', self.server.url)]:
+            patcher = patch.object(GoogleOAuth2, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def id_token(self, kid: str = 'key-1', private_key=None, **claims) -> str:
+        now = int(time.time())
+        payload = {'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1234', 'iat': now,
+                   'exp': now + 3600, 'email_verified': True, **USER_INFO, **claims}
+        return jwt.encode(payload, private_key or self.server.keys[kid], algorithm='RS256', headers={'kid': kid})
+
+    def register(self, token: str):
+        return self.client.post(reverse('users:register', kwargs={'oauth2': 'google'}),
+                                {'access_token': token}, format='json')
+
+    def test_register_with_id_token(self):
+        response = self.register(self.id_token())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user = User.objects.get(email='user@email.com')
+        self.assertEqual((user.first_name, user.last_name), ('given_name', 'family_name'))
+        # As chaves ficam em memória: o segundo login não consulta o servidor
+        self.assertEqual(self.register(self.id_token()).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.server.certs_requests, 1)
+
+    def test_invalid_id_tokens(self):
+        other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        tokens = {
+            'audience': self.id_token(aud='outro-cliente'),
+            'issuer': self.id_token(iss='https://example.com'),
+            'expired': self.id_token(exp=int(time.time()) - 60),
+            'signature': self.id_token(private_key=other_key),
+            'email_verified': self.id_token(email_verified=False),
+        }
+        for name, token in tokens.items():
+            with self.subTest(name):
+                self.assertIsNone(GoogleOAuth2.get_user_data(token))
+        self.assertEqual(self.register(tokens['audience']).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_key_rotation(self):
+        self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token()))
+        self.server.add_key('key-2')
+        self.addCleanup(self.server.keys.pop, 'key-2')
+        # Um kid desconhecido busca as chaves novamente, passado o intervalo mínimo entre as buscas
+        self.key_set.fetched_at -= 120
+        self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token('key-2')))
+        self.assertEqual(self.server.certs_requests, 2)
+        # Mas não a cada token com kid desconhecido
+        self.assertIsNone(GoogleOAuth2.get_user_data(
+            self.id_token('key-3', private_key=self.private_key)))
+        self.assertEqual(self.server.certs_requests, 2)
+
+    def test_background_refresh(self):
+        self.server.max_age = 60
+        self.addCleanup(setattr, self.server, 'max_age', 3600)
+        self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token()))
+        # Perto de expirar, as chaves em memória são usadas e renovadas em segundo plano
+        self.key_set.fetched_at -= 120
+        self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token()))
+        self.key_set.refresh_thread.join(timeout=5)
+        self.assertEqual(self.server.certs_requests, 2)
+
+    def test_keeps_keys_when_refresh_fails(self):
+        self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token()))
+        self.key_set.url = f'{self.server.url}/inexistente'
+        self.key_set.expires_at = self.key_set.fetched_at = time.monotonic() - 120
+        with self.assertLogs('users.backends.google', 'WARNING'):
+            self.assertIsNotNone(GoogleOAuth2.get_user_data(self.id_token()))
+
+    def test_access_token_uses_userinfo(self):
+        self.assertEqual(GoogleOAuth2.get_user_data('valid-access-token'), USER_INFO)
+        self.assertIsNone(GoogleOAuth2.get_user_data('wrong_token'))
+        self.assertEqual(self.server.certs_requests, 0)
+
+    @override_settings(GOOGLE_OAUTH2_CLIENT_IDS=[])
+    def test_id_token_without_client_ids_uses_userinfo(self):
+        self.assertIsNone(GoogleOAuth2.get_user_data(self.id_token()))
+        self.assertEqual(self.server.certs_requests, 0)
+
+    def test_userinfo_timeout(self):
+        start = time.monotonic()
+        self.assertIsNone(GoogleOAuth2.get_user_data('slow'))
+        self.assertLess(time.monotonic() - start, 1)
@@ -28,7 +28,7 @@ class Register(TokenObtainPairView):
             properties={
                 'access_token': openapi.Schema(
                     type=openapi.TYPE_STRING,
-                    description=f"""Token de acesso provido pelo provedor \n de autenticação Google.
+                    description=f"""Token de acesso ou ID token provido pelo provedor \n de autenticação Google.
                     Os passos para obter o token podem ser encontrados [aqui]({GOOGLE_HELP_URL})"""
                 ),
             }
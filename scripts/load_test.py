@@ -0,0 +1,69 @@
+"""Teste de carga simples dos endpoints de leitura da API.
+
+Usado para comparar o modo WSGI (gunicorn com workers síncronos) e o modo ASGI
+(gunicorn com workers do uvicorn) rodando com os mesmos dados:
+
+    gunicorn core.wsgi:application --workers 2
+    gunicorn core.asgi:application --workers 2 -k uvicorn_worker.UvicornWorker
+
+    python3 scripts/load_test.py --url http://localhost:8000 --token <access token> --event-id 1
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ENDPOINTS = ['api/players/', 'api/sumula/', 'api/results/', 'api/event/']
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--url', default='http://localhost:8000')
+parser.add_argument('--token', required=True, help='Token de acesso JWT')
+parser.add_argument('--event-id', type=int, required=True)
+parser.add_argument('--concurrency', type=int, default=32)
+parser.add_argument('--requests', type=int, default=500,
+                    help='Requisições por endpoint')
+parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS)
+
+local = threading.local()
+
+
+def get_session(token: str) -> requests.Session:
+    if not hasattr(local, 'session'):
+        local.session = requests.Session()
+        local.session.headers['Authorization'] = f'Bearer {token}'
+    return local.session
+
+
+def request(url: str, token: str) -> tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        ok = get_session(token).get(url, timeout=30).status_code < 500
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values: list[float], p: int) -> float:
+    return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else values[0]
+
+
+def run(args) -> None:
+    print(f"{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}")
+    for endpoint in args.endpoints:
+        url = f"{args.url.rstrip('/')}/{endpoint}?event_id={args.event_id}"
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(
+                lambda _: request(url, args.token), range(args.requests)))
+            elapsed = time.perf_counter() - start
+        latencies = [latency * 1000 for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        print(f"{endpoint:<16}{len(results) / elapsed:>10.1f}{percentile(latencies, 50):>10.1f}"
+              f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}{errors:>8}")
+
+
+if __name__ == '__main__':
+    run(parser.parse_args())